@@ -1,8 +1,10 @@
+import re
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from models import Base
+import vector_indexes
 from alembic import context
 
 # this is the Alembic Config object, which provides
@@ -20,6 +22,18 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# Indexes built outside the migrations, which autogenerate must not drop: the
+# optional compact indexes (vector_indexes.py) and each embedding version's
+# partial index (embedding_versions.py).
+UNMANAGED_INDEXES = {vector_indexes.INDEXES[quantization][0] for quantization in vector_indexes.COMPACT}
+VERSION_INDEX = re.compile(r'^ix_article_embeddings_.+_hnsw$')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'index' and reflected and compare_to is None:
+        return name not in UNMANAGED_INDEXES and not VERSION_INDEX.match(name)
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -42,6 +56,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -65,7 +80,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,41 @@
+"""Add HNSW index on article embeddings
+
+Revision ID: 537e678789a5
+Revises: 54076d64706b
+Create Date: 2025-08-02 11:20:41.512877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '537e678789a5'
+down_revision: Union[str, Sequence[str], None] = '54076d64706b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so workers can keep inserting while the graph is built,
+    # which has to happen outside the migration's transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_articles_embedding_hnsw',
+            'articles',
+            ['embedding'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_articles_embedding_hnsw', table_name='articles', postgresql_concurrently=True)
@@ -0,0 +1,53 @@
+"""Add article_chunks table
+
+Revision ID: a3f1c9d27b64
+Revises: 537e678789a5
+Create Date: 2025-08-09 15:02:18.374210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d27b64'
+down_revision: Union[str, Sequence[str], None] = '537e678789a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'article_chunks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('start_char', sa.Integer(), nullable=False),
+        sa.Column('end_char', sa.Integer(), nullable=False),
+        sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(dim=384), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('article_id', 'chunk_index'),
+    )
+    op.create_index(op.f('ix_article_chunks_article_id'), 'article_chunks', ['article_id'], unique=False)
+    # The table is new and empty, so the HNSW index can be built inside the transaction.
+    op.create_index(
+        'ix_article_chunks_embedding_hnsw',
+        'article_chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_article_chunks_embedding_hnsw', table_name='article_chunks')
+    op.drop_index(op.f('ix_article_chunks_article_id'), table_name='article_chunks')
+    op.drop_table('article_chunks')
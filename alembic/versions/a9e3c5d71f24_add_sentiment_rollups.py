@@ -0,0 +1,51 @@
+"""Add sentiment rollups
+
+Revision ID: a9e3c5d71f24
+Revises: f2c8a6e4b17d
+Create Date: 2025-09-20 14:27:53.806112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e3c5d71f24'
+down_revision: Union[str, Sequence[str], None] = 'f2c8a6e4b17d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sentiment_rollups',
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('hour', sa.DateTime(), nullable=False),
+        sa.Column('articles', sa.Integer(), nullable=False),
+        sa.Column('positive', sa.Integer(), nullable=False),
+        sa.Column('negative', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('source', 'hour'),
+    )
+    op.create_index('ix_sentiment_rollups_hour', 'sentiment_rollups', ['hour'], unique=False)
+    # Count the articles already stored. Saves wait until this commits, so
+    # none is counted both here and by persist.
+    op.execute("LOCK TABLE articles IN SHARE MODE")
+    op.execute("""
+        INSERT INTO sentiment_rollups (source, hour, articles, positive, negative)
+        SELECT coalesce(source, ''),
+               date_trunc('hour', coalesce(publication_date, scraped_at)),
+               count(*),
+               count(*) FILTER (WHERE sentiment = 'POSITIVE'),
+               count(*) FILTER (WHERE sentiment = 'NEGATIVE')
+        FROM articles
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sentiment_rollups_hour', table_name='sentiment_rollups')
+    op.drop_table('sentiment_rollups')
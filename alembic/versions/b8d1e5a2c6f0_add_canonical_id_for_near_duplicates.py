@@ -0,0 +1,54 @@
+"""Add canonical_id for near-duplicates
+
+Revision ID: b8d1e5a2c6f0
+Revises: e7b2d4f9a813
+Create Date: 2025-08-30 14:26:03.118472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d1e5a2c6f0'
+down_revision: Union[str, Sequence[str], None] = 'e7b2d4f9a813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A nullable column without a default is a catalog-only change.
+    op.add_column('articles', sa.Column('canonical_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'articles_canonical_id_fkey', 'articles', 'articles',
+        ['canonical_id'], ['id'], ondelete='SET NULL',
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_articles_canonical_id'),
+            'articles',
+            ['canonical_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_articles_canonical_feed',
+            'articles',
+            [sa.text('publication_date DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_include=['title', 'url', 'sentiment', 'source'],
+            postgresql_where=sa.text('publication_date IS NOT NULL AND canonical_id IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_articles_canonical_feed', table_name='articles', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_articles_canonical_id'), table_name='articles', postgresql_concurrently=True)
+    op.drop_constraint('articles_canonical_id_fkey', 'articles', type_='foreignkey')
+    op.drop_column('articles', 'canonical_id')
@@ -0,0 +1,71 @@
+"""Add embedding versions
+
+Revision ID: d4a7f3c19e52
+Revises: b8d1e5a2c6f0
+Create Date: 2025-09-06 11:02:47.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7f3c19e52'
+down_revision: Union[str, Sequence[str], None] = 'b8d1e5a2c6f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    versions = op.create_table(
+        'embedding_versions',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('pooling', sa.String(), nullable=False),
+        sa.Column('dimensions', sa.Integer(), nullable=False),
+        sa.Column('inline', sa.Boolean(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('backfilled_to_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('activated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.create_index(
+        'ix_embedding_versions_active',
+        'embedding_versions',
+        ['active'],
+        unique=True,
+        postgresql_where=sa.text('active'),
+    )
+    op.create_table(
+        'article_embeddings',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.String(), nullable=False),
+        sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['version'], ['embedding_versions.name'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'version'),
+    )
+    # The vectors already in articles.embedding are the first version, and the active one.
+    op.bulk_insert(versions, [{
+        'name': 'minilm-l6-v2',
+        'model': 'sentence-transformers/all-MiniLM-L6-v2',
+        'pooling': 'mean',
+        'dimensions': 384,
+        'inline': True,
+        'active': True,
+        'backfilled_to_id': 0,
+        'created_at': None,
+        'activated_at': None,
+    }])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('article_embeddings')
+    op.drop_index('ix_embedding_versions_active', table_name='embedding_versions')
+    op.drop_table('embedding_versions')
@@ -0,0 +1,35 @@
+"""Add compact embedding indexes
+
+Revision ID: f2c8a6e4b17d
+Revises: d4a7f3c19e52
+Create Date: 2025-09-13 10:41:09.218364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a6e4b17d'
+down_revision: Union[str, Sequence[str], None] = 'd4a7f3c19e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = ['ix_articles_embedding_halfvec_hnsw', 'ix_articles_embedding_bit_hnsw']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nothing to do: the compact indexes are optional, and built or dropped
+    # with vector_indexes.py, so the schema doesn't depend on the environment
+    # the migrations run in.
+    pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Drop whichever compact index vector_indexes.py built.
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name='articles', postgresql_concurrently=True, if_exists=True)
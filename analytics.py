@@ -0,0 +1,151 @@
+# analytics.py
+"""
+Sentiment analytics from the sentiment_rollups table: article, positive and
+negative counts per source and hour. persist.insert_batch adds every batch's
+new articles to it in the same transaction, so the rollups always match the
+articles table, and an /analytics query reads at most one row per source and
+hour of its range, however many articles there are.
+
+Deleted articles aren't subtracted. After deleting articles by hand, recount
+the hours they were in:
+
+    python analytics.py rebuild --since 2025-01-01 --until 2025-02-01
+"""
+import argparse
+import datetime
+from sqlalchemy import bindparam, delete, func, insert, null, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models import engine, Article, SentimentRollup
+
+COUNTS = ['articles', 'positive', 'negative']
+GRANULARITIES = {'hour': datetime.timedelta(hours=1), 'day': datetime.timedelta(days=1)}
+
+# --- Rollups ---
+def hour_of(row):
+    """The hour an article row is counted in, as rebuild() computes it in SQL."""
+    when = row['publication_date'] or row['scraped_at']
+    if when.tzinfo is not None:
+        # Stored as UTC (see persist._encode).
+        when = when.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return when.replace(minute=0, second=0, microsecond=0)
+
+def rollup_rows(rows):
+    """Counts article rows (dicts with source, publication_date, scraped_at and sentiment) per source and hour."""
+    counts = {}
+    for row in rows:
+        key = (row['source'] or '', hour_of(row))
+        count = counts.setdefault(key, {'source': key[0], 'hour': key[1], 'articles': 0, 'positive': 0, 'negative': 0})
+        count['articles'] += 1
+        if row['sentiment'] == 'POSITIVE':
+            count['positive'] += 1
+        elif row['sentiment'] == 'NEGATIVE':
+            count['negative'] += 1
+    # Sorted, so concurrent batches lock the rollup rows they share in the same order.
+    return [counts[key] for key in sorted(counts)]
+
+def add(connection, rows):
+    """Adds newly saved article rows to the rollups, in the caller's transaction."""
+    counts = rollup_rows(rows)
+    if not counts:
+        return
+    table = SentimentRollup.__table__
+    statement = pg_insert(table).values(counts)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=['source', 'hour'],
+        set_={column: table.c[column] + statement.excluded[column] for column in COUNTS},
+    ))
+
+def rebuild(connection, since=None, until=None):
+    """
+    Recounts the rollups of the hours in [since, until) (by default all of
+    them) from articles. Returns the number of rollup rows written.
+    """
+    # Saves wait until this transaction commits, so none is counted twice or missed.
+    connection.execute(text("LOCK TABLE sentiment_rollups IN SHARE ROW EXCLUSIVE MODE"))
+    source = func.coalesce(Article.source, '')
+    hour = func.date_trunc('hour', func.coalesce(Article.publication_date, Article.scraped_at))
+    stale = delete(SentimentRollup)
+    counted = select(
+        source, hour, func.count(),
+        func.count().filter(Article.sentiment == 'POSITIVE'),
+        func.count().filter(Article.sentiment == 'NEGATIVE'),
+    ).group_by(source, hour)
+    if since is not None:
+        since = floor(since, 'hour')
+        stale = stale.where(SentimentRollup.hour >= since)
+        counted = counted.where(hour >= since)
+    if until is not None:
+        until = floor(until, 'hour')
+        stale = stale.where(SentimentRollup.hour < until)
+        counted = counted.where(hour < until)
+    connection.execute(stale)
+    result = connection.execute(insert(SentimentRollup.__table__).from_select(['source', 'hour', *COUNTS], counted))
+    return result.rowcount
+
+# --- Queries ---
+def floor(value, granularity):
+    if granularity == 'day':
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def ceil(value, granularity):
+    floored = floor(value, granularity)
+    return floored if floored == value else floored + GRANULARITIES[granularity]
+
+def _sums():
+    return [func.sum(getattr(SentimentRollup, column)).label(column) for column in COUNTS]
+
+def series(granularity, start, end, source=None, by_source=False):
+    """
+    Counts per hour or day of [start, end), oldest first, as a select of
+    (bucket, source, articles, positive, negative). source is NULL unless
+    by_source, which gives every source its own series.
+    """
+    # Written into the SQL, so the GROUP BY expression is the selected one.
+    bucket = func.date_trunc(bindparam('granularity', granularity, literal_execute=True), SentimentRollup.hour).label('bucket')
+    source_column = SentimentRollup.source if by_source else null()
+    query = (
+        select(bucket, source_column.label('source'), *_sums())
+        .where(SentimentRollup.hour >= start, SentimentRollup.hour < end)
+        .group_by(bucket, *([SentimentRollup.source] if by_source else []))
+        .order_by(bucket, *([SentimentRollup.source] if by_source else []))
+    )
+    if source is not None:
+        query = query.where(SentimentRollup.source == source)
+    return query
+
+def totals(start, end, source=None):
+    """Counts per source over [start, end), as a select of (source, articles, positive, negative)."""
+    query = (
+        select(SentimentRollup.source, *_sums())
+        .where(SentimentRollup.hour >= start, SentimentRollup.hour < end)
+        .group_by(SentimentRollup.source).order_by(SentimentRollup.source)
+    )
+    if source is not None:
+        query = query.where(SentimentRollup.source == source)
+    return query
+
+def counts(articles, positive, negative):
+    """Counts and the positive / negative share of the articles (None when there are none)."""
+    return {
+        'articles': articles,
+        'positive': positive,
+        'negative': negative,
+        'positive_ratio': round(positive / articles, 4) if articles else None,
+        'negative_ratio': round(negative / articles, 4) if articles else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    rebuild_parser = commands.add_parser('rebuild', help="Recount the rollups of a date range from articles.")
+    rebuild_parser.add_argument('--since', type=datetime.datetime.fromisoformat, default=None)
+    rebuild_parser.add_argument('--until', type=datetime.datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        written = rebuild(connection, args.since, args.until)
+    print(f"Rebuilt {written} sentiment rollup row(s).")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,26 @@
 # api.py
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from models import SessionLocal, Article
-from typing import List
-from pydantic import BaseModel, ConfigDict
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, cast, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import load_only
+from models import Article, ArticleChunk, ArticleEmbedding, EmbeddingVersion, as_halfvec, binary_quantized, create_async_db_engine
+import db_pool
+from typing import List, Literal
+from pydantic import BaseModel, ConfigDict, Field
+import base64
 import datetime
-from tasks import get_embedding # <-- Import the embedding function
+import os
+import time
+from inference import get_embeddings, version_embedder # <-- Only the embedding model; the API never runs sentiment analysis
+from model_registry import warm_up, names_from_env
+from query_embedder import QueryEmbedder
+import metrics
+import analytics
+import export
+import vector_indexes
+from contextlib import asynccontextmanager
 
 # --- Pydantic Models for Data Validation ---
 class ArticleSchema(BaseModel):
@@ -14,51 +29,502 @@ class ArticleSchema(BaseModel):
     id: int
     title: str
     url: str
+    source: str | None = None
     sentiment: str | None = None
     publication_date: datetime.datetime | None = None
 
 # Add a model for the search query
 class SearchQuery(BaseModel):
     query: str
+    # Size of the HNSW candidate list. Higher is slower but closer to an exact search.
+    ef_search: int | None = Field(default=None, ge=1, le=1000)
+    # 'article' compares the query to whole-article vectors, 'chunk' ranks
+    # articles by their best-matching passage.
+    rank_by: Literal['article', 'chunk'] = 'article'
+    # 'hybrid' also runs a full-text search over title and body, and fuses
+    # the two rankings, so exact names and rare keywords aren't missed.
+    mode: Literal['vector', 'hybrid'] = 'vector'
+    # Which HNSW index article vectors are searched on: 'none' is the
+    # full-precision one, 'halfvec' and 'binary' the compact ones, whose
+    # candidates are re-ranked by full-precision distance. By default
+    # SEARCH_QUANTIZATION. A compact index that isn't built (see
+    # vector_indexes.py) falls back to 'none'.
+    quantization: Literal['none', 'halfvec', 'binary'] | None = None
+    # 'rrf' is reciprocal rank fusion; 'weighted' mixes cosine similarity and
+    # normalized text rank, vector_weight : 1 - vector_weight.
+    fusion: Literal['rrf', 'weighted'] = 'rrf'
+    vector_weight: float = Field(default=0.5, ge=0, le=1)
+    # Same filters as /articles.
+    source: str | None = None
+    sentiment: Literal['POSITIVE', 'NEGATIVE'] | None = None
+    published_after: datetime.datetime | None = None
+    published_before: datetime.datetime | None = None
+    collapse_duplicates: bool = False
+
+# Default HNSW candidate list size when a request doesn't set one (pgvector's default is 40).
+DEFAULT_EF_SEARCH = int(os.getenv('SEARCH_EF_SEARCH', '40'))
+# The index rank_by=article searches on by default (see SearchQuery.quantization),
+# and how many of its nearest candidates are re-ranked by their full vectors.
+# Binary codes need more candidates than halfvec for the same recall.
+QUANTIZATION = os.getenv('SEARCH_QUANTIZATION', 'none')
+RERANK_CANDIDATES = int(os.getenv('SEARCH_RERANK_CANDIDATES', '100'))
+# How many nearest chunks are grouped into articles when ranking by chunk.
+CHUNK_CANDIDATES = int(os.getenv('SEARCH_CHUNK_CANDIDATES', '50'))
+# How many candidates each side of a hybrid search contributes, and the
+# reciprocal rank fusion constant (60 in the original RRF paper).
+HYBRID_CANDIDATES = int(os.getenv('SEARCH_HYBRID_CANDIDATES', '50'))
+RRF_K = int(os.getenv('SEARCH_RRF_K', '60'))
+# How long a process keeps searching the embedding version it last saw as
+# active, and the compact indexes it last saw built, so a switch
+# (embedding_versions.py activate, vector_indexes.py enable) reaches every
+# API process within this many seconds.
+ACTIVE_VERSION_TTL = float(os.getenv('SEARCH_ACTIVE_VERSION_TTL', '5'))
+
+class SentimentCounts(BaseModel):
+    articles: int
+    positive: int
+    negative: int
+    positive_ratio: float | None = None
+    negative_ratio: float | None = None
+
+class SentimentBucket(SentimentCounts):
+    bucket: datetime.datetime
+    source: str | None = None
+
+class SourceSentiment(SentimentCounts):
+    source: str | None = None
+
+class SentimentSummary(BaseModel):
+    start: datetime.datetime
+    end: datetime.datetime
+    total: SentimentCounts
+    sources: List[SourceSentiment]
+
+# Range of the analytics endpoints when a request doesn't give a start, and
+# the most hours or days one request may return.
+ANALYTICS_DEFAULT_DAYS = int(os.getenv('ANALYTICS_DEFAULT_DAYS', '7'))
+ANALYTICS_MAX_BUCKETS = int(os.getenv('ANALYTICS_MAX_BUCKETS', '5000'))
 
 # --- FastAPI App ---
-app = FastAPI(title="Project Titan API")
+@asynccontextmanager
+async def lifespan(app):
+    # Load the embedding model before serving, so the first /search doesn't wait for it.
+    await run_in_threadpool(warm_up, names_from_env('API_WARMUP_MODELS', 'embedding'))
+    yield
+    await async_engine.dispose()
+
+app = FastAPI(title="Project Titan API", lifespan=lifespan)
+
+# Caches query embeddings and batches concurrent ones into a single model call.
+query_embedder = QueryEmbedder(get_embeddings)
+# The same, for each embedding version other than the inline one.
+version_query_embedders = {}
 
 # --- Dependency for Database Session ---
-def get_db():
-    db = SessionLocal()
-    try:
+# Endpoints await Postgres on the event loop (asyncpg), so a slow query holds
+# a pooled connection but not a threadpool slot.
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Only the columns ArticleSchema returns; body text and embeddings stay in the database.
+ARTICLE_FIELDS = load_only(Article.id, Article.title, Article.url, Article.source, Article.sentiment, Article.publication_date)
 
 # --- API Endpoints ---
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the News Analysis Engine API"}
 
+# --- Feed Pagination ---
+# Pages are keyset-paginated on (publication_date, id): the cursor is the last
+# row of the previous page, so the next page is an index range scan that
+# costs the same at any depth (see the ix_articles_*feed indexes).
+def encode_cursor(article):
+    return base64.urlsafe_b64encode(f"{article.publication_date.isoformat()}|{article.id}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        date, article_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(date), int(article_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+def as_stored(value):
+    """publication_date is stored without a time zone; compare aware datetimes in UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+def article_filters(source=None, sentiment=None, published_after=None, published_before=None, collapse_duplicates=False):
+    """
+    WHERE conditions for the filters /articles and /search share. With
+    collapse_duplicates, near-duplicates are left out and only their
+    canonical article is returned.
+    """
+    filters = []
+    if source:
+        filters.append(Article.source == source)
+    if sentiment:
+        filters.append(Article.sentiment == sentiment)
+    if published_after:
+        filters.append(Article.publication_date >= as_stored(published_after))
+    if published_before:
+        filters.append(Article.publication_date < as_stored(published_before))
+    if collapse_duplicates:
+        filters.append(Article.canonical_id.is_(None))
+    return filters
+
 @app.get("/articles", response_model=List[ArticleSchema])
-def get_articles(db: Session = Depends(get_db)):
+async def get_articles(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = None,
+    source: str | None = None,
+    sentiment: Literal['POSITIVE', 'NEGATIVE'] | None = None,
+    published_after: datetime.datetime | None = None,
+    published_before: datetime.datetime | None = None,
+    collapse_duplicates: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
     """
-    Retrieves the 10 most recent articles from the database.
+    Retrieves the most recent articles, newest first, optionally filtered by
+    source domain, sentiment and publication date range. collapse_duplicates
+    leaves out near-duplicates (e.g. syndicated copies) of other articles.
+    When there are more, the X-Next-Cursor header holds the cursor for the
+    next page.
     """
-    articles = db.query(Article).order_by(Article.publication_date.desc()).limit(10).all()
+    query = (
+        select(Article).options(ARTICLE_FIELDS)
+        .where(
+            Article.publication_date.isnot(None),
+            *article_filters(source, sentiment, published_after, published_before, collapse_duplicates),
+        )
+    )
+    if cursor:
+        query = query.where(tuple_(Article.publication_date, Article.id) < tuple_(*decode_cursor(cursor)))
+
+    # One extra row tells us whether there is a next page.
+    result = await db.execute(query.order_by(Article.publication_date.desc(), Article.id.desc()).limit(limit + 1))
+    articles = result.scalars().all()
+    if len(articles) > limit:
+        articles = articles[:limit]
+        response.headers['X-Next-Cursor'] = encode_cursor(articles[-1])
     return articles
 
+# --- Embedding Versions ---
+_active_version = {'version': None, 'expires': 0.0}
+
+async def active_version(db):
+    """
+    The embedding version /search queries (None before any is registered),
+    re-read every ACTIVE_VERSION_TTL seconds. A newly active version's model
+    is loaded before the switch, while other requests keep using the old one.
+    """
+    if time.monotonic() >= _active_version['expires']:
+        _active_version['expires'] = time.monotonic() + ACTIVE_VERSION_TTL
+        result = await db.execute(select(EmbeddingVersion).where(EmbeddingVersion.active))
+        version = result.scalar_one_or_none()
+        current = _active_version['version']
+        if version is not None and not version.inline and (current is None or current.name != version.name):
+            await run_in_threadpool(embedder_for(version).batcher.embed_batch, ["Warm-up text."])
+        _active_version['version'] = version
+    return _active_version['version']
+
+_compact_indexes = {'quantizations': set(), 'expires': 0.0}
+
+async def built_quantizations(db):
+    """The quantizations whose HNSW index is built, re-read every ACTIVE_VERSION_TTL seconds."""
+    if time.monotonic() >= _compact_indexes['expires']:
+        _compact_indexes['expires'] = time.monotonic() + ACTIVE_VERSION_TTL
+        result = await db.execute(vector_indexes.VALID_INDEXES)
+        _compact_indexes['quantizations'] = vector_indexes.available(result.scalars().all())
+    return _compact_indexes['quantizations']
+
+def embedder_for(version):
+    """The QueryEmbedder that embeds queries with a version's model."""
+    if version is None or version.inline:
+        return query_embedder
+    embedder = version_query_embedders.get(version.name)
+    if embedder is None:
+        embedder = version_query_embedders[version.name] = QueryEmbedder(
+            # Other models may be cased, so their cache keys keep the case.
+            version_embedder(version.model, version.pooling), namespace=version.name, lowercase=False,
+        )
+    return embedder
+
+# --- Search ---
+def compact_distance(query_embedding, quantization):
+    """The distance that a compact index on articles.embedding is ordered by."""
+    if quantization == 'halfvec':
+        return as_halfvec(Article.embedding).cosine_distance(query_embedding)
+    query_bits = binary_quantized(cast(query_embedding, Article.embedding.type))
+    return binary_quantized(Article.embedding).hamming_distance(query_bits)
+
+def vector_candidates(query_embedding, rank_by, filters, limit, version=None, quantization='none'):
+    """
+    The `limit` nearest articles as an (id, distance) subquery, by article
+    vector or by best chunk, under the given embedding version (by default
+    the inline one). Article vectors of the inline version can be searched on
+    a compact index (quantization 'halfvec' or 'binary').
+    """
+    # The cosine_distance operator (<=>) is served by the HNSW indexes on the embedding columns.
+    if version is not None and not version.inline:
+        # The version is written into the SQL rather than bound, so the
+        # planner can match the version's partial index even in a cached plan.
+        distance = version.vector().cosine_distance(query_embedding)
+        return (
+            select(Article.id, distance.label('distance'))
+            .join(ArticleEmbedding, ArticleEmbedding.article_id == Article.id)
+            .where(ArticleEmbedding.version == bindparam('version', version.name, literal_execute=True), *filters)
+            .order_by(distance).limit(limit).subquery()
+        )
+
+    if rank_by == 'article' and quantization != 'none':
+        # Take the nearest candidates from the compact index, then re-rank them
+        # by exact distance, which reads only their full vectors.
+        distance = Article.embedding.cosine_distance(query_embedding)
+        nearest = (
+            select(Article.id).where(*filters)
+            .order_by(compact_distance(query_embedding, quantization))
+            .limit(max(limit, RERANK_CANDIDATES)).subquery()
+        )
+        return (
+            select(Article.id, distance.label('distance'))
+            .join(nearest, Article.id == nearest.c.id)
+            .order_by(distance).limit(limit).subquery()
+        )
+
+    if rank_by == 'article':
+        distance = Article.embedding.cosine_distance(query_embedding)
+        return (
+            select(Article.id, distance.label('distance'))
+            .where(*filters).order_by(distance).limit(limit).subquery()
+        )
+
+    # Take the nearest chunks of articles that pass the filters from the index,
+    # then rank their articles by the best one.
+    distance = ArticleChunk.embedding.cosine_distance(query_embedding).label('distance')
+    nearest = (
+        select(ArticleChunk.article_id, distance)
+        .join(Article, Article.id == ArticleChunk.article_id)
+        .where(*filters).order_by(distance).limit(CHUNK_CANDIDATES).subquery()
+    )
+    best = func.min(nearest.c.distance)
+    return (
+        select(nearest.c.article_id.label('id'), best.label('distance'))
+        .group_by(nearest.c.article_id).order_by(best).limit(limit).subquery()
+    )
+
+def text_candidates(query, filters, limit):
+    """The `limit` best full-text matches as an (id, score) subquery, served by the GIN index."""
+    tsquery = func.websearch_to_tsquery('english', query)
+    score = func.ts_rank_cd(Article.search_vector, tsquery)
+    return (
+        select(Article.id, score.label('score'))
+        .where(Article.search_vector.op('@@')(tsquery), *filters)
+        .order_by(score.desc()).limit(limit).subquery()
+    )
+
+def fuse(vector, text, fusion, vector_weight):
+    """Full-outer-joins both candidate sets and scores each article, as an (id, score) subquery."""
+    vector_ranked = select(
+        vector.c.id, vector.c.distance,
+        func.row_number().over(order_by=vector.c.distance).label('rank'),
+    ).cte('vector_ranked')
+    text_ranked = select(
+        text.c.id,
+        func.row_number().over(order_by=text.c.score.desc()).label('rank'),
+        (text.c.score / func.nullif(func.max(text.c.score).over(), 0)).label('normalized'),
+    ).cte('text_ranked')
+
+    if fusion == 'rrf':
+        score = (func.coalesce(1.0 / (RRF_K + vector_ranked.c.rank), 0)
+                 + func.coalesce(1.0 / (RRF_K + text_ranked.c.rank), 0))
+    else:
+        score = (vector_weight * func.coalesce(1 - vector_ranked.c.distance, 0)
+                 + (1 - vector_weight) * func.coalesce(text_ranked.c.normalized, 0))
+    return (
+        select(func.coalesce(vector_ranked.c.id, text_ranked.c.id).label('id'), score.label('score'))
+        .select_from(vector_ranked.join(text_ranked, vector_ranked.c.id == text_ranked.c.id, full=True))
+        .subquery()
+    )
+
+async def find_similar_articles(db, query_embedding, search, version=None):
+    """Returns the 5 articles that best match a SearchQuery, using one query for the search itself."""
+    filters = article_filters(
+        search.source, search.sentiment, search.published_after, search.published_before, search.collapse_duplicates,
+    )
+    quantization = search.quantization or QUANTIZATION
+    if search.rank_by == 'chunk' or (version is not None and not version.inline):
+        quantization = 'none' # Only the inline article vectors have compact indexes.
+    elif quantization != 'none' and quantization not in await built_quantizations(db):
+        quantization = 'none' # Its index isn't built, and a scan of every article would be slower.
+    ef_search = search.ef_search or DEFAULT_EF_SEARCH
+    if quantization != 'none':
+        # An HNSW scan returns at most ef_search rows, and all the candidates are needed.
+        ef_search = max(ef_search, RERANK_CANDIDATES)
+    # set_config(..., true) only lasts for this request's transaction.
+    settings = [func.set_config('hnsw.ef_search', str(ef_search), True)]
+    if filters:
+        # Keep scanning the index until enough rows pass the filters (pgvector 0.8+).
+        settings.append(func.set_config('hnsw.iterative_scan', 'relaxed_order', True))
+    await db.execute(select(*settings))
+
+    if search.mode == 'hybrid':
+        ranked = fuse(
+            vector_candidates(query_embedding, search.rank_by, filters, HYBRID_CANDIDATES, version, quantization),
+            text_candidates(search.query, filters, HYBRID_CANDIDATES),
+            search.fusion, search.vector_weight,
+        )
+        order = ranked.c.score.desc()
+    else:
+        ranked = vector_candidates(query_embedding, search.rank_by, filters, 5, version, quantization)
+        order = ranked.c.distance
+
+    result = await db.execute(
+        select(Article).options(ARTICLE_FIELDS).join(ranked, Article.id == ranked.c.id).order_by(order).limit(5)
+    )
+    return result.scalars().all()
+
 #Endpoint for user's query
 @app.post("/search", response_model=List[ArticleSchema])
-def search_articles(search: SearchQuery, db: Session = Depends(get_db)):
+async def search_articles(search: SearchQuery, db: AsyncSession = Depends(get_db)):
     """
-    Performs a semantic search for articles based on the query.
+    Performs a semantic search for articles based on the query, with the
+    active embedding version.
     """
-    # 1. Create an embedding for the user's query
-    query_embedding = get_embedding(search.query)
-    
-    # 2. Find the 5 most similar articles in the database
-    # The l2_distance operator (<->) is provided by pgvector
-    similar_articles = db.query(Article).order_by(Article.embedding.l2_distance(query_embedding)).limit(5).all()
-    
+    version = await active_version(db)
+    if search.rank_by == 'chunk' and version is not None and not version.inline:
+        raise HTTPException(status_code=400, detail=f"rank_by=chunk needs the inline embedding version; {version.name} is active.")
+
+    with metrics.SEARCH_SECONDS.labels(search.mode).time():
+        # 1. Create an embedding for the user's query (cached, and batched with concurrent queries)
+        query_embedding = await embedder_for(version).embed(search.query)
+
+        # 2. Find the 5 most similar articles in the database
+        similar_articles = await find_similar_articles(db, query_embedding, search, version)
+
     if not similar_articles:
         raise HTTPException(status_code=404, detail="No similar articles found.")
-        
+
     return similar_articles
+
+# --- Sentiment Analytics ---
+# Served from the hourly sentiment_rollups (see analytics.py), so a request
+# costs the same however many articles are stored. Ranges are widened to
+# whole hours (or days), in UTC.
+def analytics_range(start, end, granularity, max_buckets=ANALYTICS_MAX_BUCKETS):
+    end = as_stored(end) if end else datetime.datetime.utcnow()
+    start = as_stored(start) if start else end - datetime.timedelta(days=ANALYTICS_DEFAULT_DAYS)
+    start, end = analytics.floor(start, granularity), analytics.ceil(end, granularity)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end.")
+    if max_buckets and (end - start) / analytics.GRANULARITIES[granularity] > max_buckets:
+        raise HTTPException(status_code=400, detail=f"The range spans more than {max_buckets} {granularity}s.")
+    return start, end
+
+@app.get("/analytics/sentiment/timeseries", response_model=List[SentimentBucket])
+async def sentiment_timeseries(
+    granularity: Literal['hour', 'day'] = 'day',
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    source: str | None = None,
+    by_source: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Article and sentiment counts per hour or day between start and end (by
+    default the last ANALYTICS_DEFAULT_DAYS days), oldest first. Hours and
+    days without articles are left out. by_source gives each source its own
+    series.
+    """
+    start, end = analytics_range(start, end, granularity)
+    result = await db.execute(analytics.series(granularity, start, end, source, by_source))
+    return [
+        {'bucket': row.bucket, 'source': row.source or None, **analytics.counts(row.articles, row.positive, row.negative)}
+        for row in result
+    ]
+
+@app.get("/analytics/sentiment/summary", response_model=SentimentSummary)
+async def sentiment_summary(
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    source: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Article and sentiment counts per source and in total between start and end."""
+    start, end = analytics_range(start, end, 'hour', max_buckets=None)
+    rows = (await db.execute(analytics.totals(start, end, source))).all()
+    return {
+        'start': start,
+        'end': end,
+        'total': analytics.counts(*(sum(getattr(row, column) for row in rows) for column in analytics.COUNTS)),
+        'sources': [
+            {'source': row.source or None, **analytics.counts(row.articles, row.positive, row.negative)}
+            for row in rows
+        ],
+    }
+
+# --- Bulk Export ---
+@app.get("/export")
+async def export_articles(
+    format: Literal['ndjson', 'arrow', 'parquet'] = 'ndjson',
+    source: str | None = None,
+    published_after: datetime.datetime | None = None,
+    published_before: datetime.datetime | None = None,
+    min_id: int | None = None,
+    max_id: int | None = None,
+    include_body: bool = True,
+):
+    """
+    Streams every matching article with its embedding, in id order, as
+    NDJSON, an Arrow IPC stream or Parquet (see export.py). Rows come
+    from a server-side cursor a batch at a time, so an export of any size
+    holds one batch in memory.
+    """
+    try:
+        encoder = export.Encoder(format, include_body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = export.export_query(
+        source,
+        as_stored(published_after) if published_after else None,
+        as_stored(published_before) if published_before else None,
+        min_id, max_id, include_body,
+    )
+
+    async def stream():
+        # Its own session: the cursor has to stay open for as long as the response streams.
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=export.BATCH_SIZE))
+            async for rows in result.partitions():
+                # Encoding a batch takes a while, so it runs off the event loop.
+                yield await run_in_threadpool(encoder.batch, rows)
+        yield encoder.finish()
+
+    return StreamingResponse(stream(), media_type=export.FORMATS[format])
+
+@app.get("/stats/embeddings")
+def embedding_stats():
+    """
+    Query embedding cache hit rate, plus batch size and queue wait
+    histograms for the embedding micro-batcher.
+    """
+    return query_embedder.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Pipeline and search metrics in the Prometheus text format (see metrics.py)."""
+    body, content_type = metrics.latest()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/stats/db")
+def db_stats():
+    """
+    Connection checkouts, new connections and pool wait time histograms for
+    this process's database pools, plus current pool usage.
+    """
+    return db_pool.stats()
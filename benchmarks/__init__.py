@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Performance benchmarks for the pipeline. Run each one as a module from the
+# project root, e.g. `python -m benchmarks.inference_throughput`.
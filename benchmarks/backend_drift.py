@@ -0,0 +1,61 @@
+# benchmarks/backend_drift.py
+"""
+Compares the inference backends against the fp32 PyTorch models: embedding
+cosine similarity, sentiment label agreement, and throughput for each.
+
+    python -m benchmarks.backend_drift --articles 256 --output drift.json
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.common import sample_bodies, write_results
+from inference import get_embeddings, get_sentiments
+
+BACKENDS = ['torch', 'onnx', 'onnx-int8']
+
+def run(bodies, backend, batch_size):
+    """Analyzes all bodies with one backend and returns (labels, vectors, seconds)."""
+    # Warm up so model loading and export aren't timed.
+    get_sentiments(bodies[:2], backend=backend)
+    get_embeddings(bodies[:2], backend=backend)
+    labels, vectors = [], []
+    started = time.perf_counter()
+    for start in range(0, len(bodies), batch_size):
+        batch = bodies[start:start + batch_size]
+        labels.extend(get_sentiments(batch, backend=backend))
+        vectors.extend(get_embeddings(batch, backend=backend))
+    return labels, np.array(vectors), time.perf_counter() - started
+
+def cosine(a, b):
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--backends', nargs='+', default=BACKENDS)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    bodies = sample_bodies(args.articles)
+    reference_labels, reference_vectors, _ = run(bodies, 'torch', args.batch_size)
+
+    results = []
+    for backend in args.backends:
+        labels, vectors, elapsed = run(bodies, backend, args.batch_size)
+        similarity = cosine(vectors, reference_vectors)
+        results.append({
+            'backend': backend,
+            'articles': len(bodies),
+            'batch_size': args.batch_size,
+            'seconds': round(elapsed, 3),
+            'articles_per_second': round(len(bodies) / elapsed, 2),
+            'label_agreement': sum(a == b for a, b in zip(labels, reference_labels)) / len(bodies),
+            'embedding_cosine_mean': round(float(similarity.mean()), 6),
+            'embedding_cosine_min': round(float(similarity.min()), 6),
+        })
+
+    write_results('backend_drift', results, args.output)
+
+if __name__ == "__main__":
+    main()
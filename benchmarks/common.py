@@ -0,0 +1,52 @@
+# benchmarks/common.py
+import json
+import math
+import platform
+import random
+import datetime
+
+WORDS = (
+    "government economy market election climate energy technology company "
+    "minister report growth inflation police court health school research "
+    "officials said on tuesday that the new policy would affect thousands of "
+    "people across the country while critics warned about rising costs and delays"
+).split()
+
+def sample_bodies(count, seed=0, min_words=80, max_words=900):
+    """Builds deterministic article-like bodies of varied length for offline runs."""
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        paragraphs = []
+        remaining = rng.randint(min_words, max_words)
+        while remaining > 0:
+            size = min(remaining, rng.randint(20, 60))
+            paragraphs.append(' '.join(rng.choice(WORDS) for _ in range(size)).capitalize() + '.')
+            remaining -= size
+        bodies.append('\n\n'.join(paragraphs))
+    return bodies
+
+def percentile(values, pct):
+    """Returns the pct-th percentile of values using nearest-rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def write_results(name, results, output=None, quiet=False):
+    """Prints results (unless quiet) and, if an output path is given, writes them as JSON."""
+    report = {
+        'benchmark': name,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if not quiet:
+        print(json.dumps(report, indent=2, default=str))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Results written to {output}")
+    return report
@@ -0,0 +1,69 @@
+# benchmarks/compare.py
+"""
+Compares two benchmark reports (one benchmark's --output, or a suite.json
+from benchmarks/suite.py): every number found in both, old -> new, with the
+change in percent. Rows of a list are matched by their text fields (e.g.
+config, pages, endpoint), so reordering them doesn't matter.
+
+    python -m benchmarks.compare results/before/suite.json results/after/suite.json --min-change 5
+"""
+import argparse
+import json
+from benchmarks.common import write_results
+
+# Fields that describe the run rather than measure it.
+SKIPPED = {'timestamp', 'python', 'machine', 'seconds'}
+
+def _row_key(index, row):
+    labels = [f"{key}={value}" for key, value in row.items()
+              if isinstance(value, str) or (isinstance(value, int) and key in ('rows', 'page', 'days', 'batch_size', 'size', 'depth', 'ef_search', 'concurrency'))]
+    return '[' + (','.join(labels) or str(index)) + ']'
+
+def flatten(value, prefix=''):
+    """Returns {path: number} for every number in a report."""
+    numbers = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key not in SKIPPED:
+                numbers.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            key = _row_key(index, item) if isinstance(item, dict) else f'[{index}]'
+            numbers.update(flatten(item, prefix + key))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        numbers[prefix] = value
+    return numbers
+
+def compare(old, new):
+    old, new = flatten(old), flatten(new)
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        before, after = old[path], new[path]
+        change = round((after - before) / abs(before) * 100, 1) if before else None
+        rows.append({'metric': path, 'old': before, 'new': after, 'change_percent': change})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--min-change', type=float, default=0, help="Only show metrics that changed by at least this many percent.")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = [
+        row for row in compare(old, new)
+        if row['change_percent'] is None or abs(row['change_percent']) >= args.min_change
+    ]
+    for row in rows:
+        change = 'n/a' if row['change_percent'] is None else f"{row['change_percent']:+.1f}%"
+        print(f"{row['metric']}: {row['old']} -> {row['new']} ({change})")
+    if args.output:
+        write_results('compare', rows, args.output, quiet=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# benchmarks/end_to_end.py
+"""
+End-to-end load test against a running stack: real Celery workers, Redis,
+Postgres with pgvector and the API, with the news sites replaced by
+benchmarks/fixture_server.py. Start the stack with the benchmark overrides,
+which add the fixture server and point the workers at it:
+
+    docker-compose -f docker-compose.yml -f docker-compose.bench.yml up -d
+    python -m benchmarks.end_to_end --articles 500 --mode batch --batch-size 16 --output e2e.json
+
+Synthetic article links (new ones every run) are dispatched the way main.py
+dispatches links in the chosen mode, and the harness waits until they are
+saved: ingest throughput and the time from dispatch to each row. Then
+/search and /articles are load-tested with --concurrency clients for
+--duration seconds each. The run's articles are deleted afterwards unless
+--keep is given.
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import random
+import time
+import httpx
+from sqlalchemy import delete, func
+from benchmarks.common import WORDS, percentile, write_results
+from models import SessionLocal, Article
+from scrapers import ALL_SOURCES
+from scrapers.fetcher import host_of
+import main as dispatcher
+import analytics
+
+def synthetic_links(count, run):
+    """count links spread over the sources, under a path no earlier run used."""
+    return [
+        {'title': f"Benchmark article {i}",
+         'url': f"https://{host_of(ALL_SOURCES[i % len(ALL_SOURCES)].homepage_url)}/bench/{run}/{i}"}
+        for i in range(count)
+    ]
+
+def run_filter(run):
+    return Article.url.like(f'%/bench/{run}/%')
+
+def saved_times(run):
+    db = SessionLocal()
+    try:
+        return [row[0] for row in db.query(Article.scraped_at).filter(run_filter(run))]
+    finally:
+        db.close()
+
+def ingest(args, run):
+    """Dispatches the run's links and waits for them to be saved. Returns the ingest results."""
+    links = synthetic_links(args.articles, run)
+    dispatched_at = datetime.datetime.utcnow()
+    started = time.perf_counter()
+    dispatcher.dispatch(
+        links,
+        batch_size=args.batch_size if args.mode == 'batch' else None,
+        staged=args.mode == 'staged',
+        frontier_workers=args.frontier_workers if args.mode == 'frontier' else None,
+    )
+
+    # Done when every article is saved, or when nothing new was saved for --idle-timeout seconds.
+    saved, last_progress = 0, time.perf_counter()
+    while saved < len(links) and time.perf_counter() - last_progress < args.idle_timeout:
+        time.sleep(1)
+        count = len(saved_times(run))
+        if count > saved:
+            saved, last_progress = count, time.perf_counter()
+            print(f"  -> {saved}/{len(links)} articles saved")
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted((scraped_at - dispatched_at).total_seconds() for scraped_at in saved_times(run))
+    finished = latencies[-1] if latencies else elapsed
+    return {
+        'mode': args.mode,
+        'articles_dispatched': len(links),
+        'articles_saved': len(latencies),
+        'seconds': round(finished, 2),
+        'articles_per_second': round(len(latencies) / finished, 2) if finished else None,
+        'latency_p50_s': percentile(latencies, 50),
+        'latency_p95_s': percentile(latencies, 95),
+        'latency_p99_s': percentile(latencies, 99),
+    }
+
+# --- Load Test ---
+def search_request(args):
+    async def request(client, rng):
+        query = ' '.join(rng.choice(WORDS) for _ in range(3))
+        return await client.post('/search', json={'query': query, 'mode': args.search_mode})
+    return request
+
+def articles_request(args):
+    async def request(client, rng):
+        params = {'limit': 20}
+        if rng.random() < 0.5:
+            params['source'] = rng.choice(ALL_SOURCES).domain
+        return await client.get('/articles', params=params)
+    return request
+
+async def load(client, request, concurrency, duration):
+    """Runs `concurrency` clients back to back for `duration` seconds; returns latency and status stats."""
+    latencies, statuses = [], collections.Counter()
+    deadline = time.perf_counter() + duration
+
+    async def user(rng):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await request(client, rng)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(random.Random(i)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'requests': sum(statuses.values()),
+        'errors': sum(count for status, count in statuses.items() if not status.startswith('2')),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) or 0, 2),
+        'p95_ms': round(percentile(latencies, 95) or 0, 2),
+        'p99_ms': round(percentile(latencies, 99) or 0, 2),
+        'statuses': dict(statuses),
+    }
+
+async def load_test(args):
+    results = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.api, timeout=30, limits=limits) as client:
+        for endpoint, request in (('/search', search_request(args)), ('/articles', articles_request(args))):
+            print(f"Load-testing {endpoint} for {args.duration}s with {args.concurrency} clients...")
+            results.append({'endpoint': endpoint, **await load(client, request, args.concurrency, args.duration)})
+    return results
+
+def cleanup(run):
+    """Deletes the run's articles and recounts the sentiment rollups of the hours they were in."""
+    db = SessionLocal()
+    try:
+        when = func.coalesce(Article.publication_date, Article.scraped_at)
+        first, last = db.query(func.min(when), func.max(when)).filter(run_filter(run)).one()
+        db.execute(delete(Article).where(run_filter(run)))
+        if first is not None:
+            analytics.rebuild(db.connection(), first, last + datetime.timedelta(hours=1))
+        db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=500)
+    parser.add_argument('--mode', choices=['article', 'batch', 'staged', 'frontier'], default='batch')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--frontier-workers', type=int, default=4)
+    parser.add_argument('--idle-timeout', type=float, default=60, help="Stop waiting after this long without a new row.")
+    parser.add_argument('--api', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--search-mode', choices=['vector', 'hybrid'], default='vector')
+    parser.add_argument('--skip-ingest', action='store_true', help="Only load-test the API, on the articles already stored.")
+    parser.add_argument('--serve-fixtures', type=int, default=None, metavar='PORT',
+                        help="Run the fixture server in this process, for workers on this machine.")
+    parser.add_argument('--keep', action='store_true', help="Keep the run's articles.")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    if args.serve_fixtures:
+        from benchmarks.fixture_server import serve
+        serve(port=args.serve_fixtures)
+
+    run = int(time.time())
+    results = {}
+    try:
+        if not args.skip_ingest:
+            results['ingest'] = ingest(args, run)
+        results['load'] = asyncio.run(load_test(args))
+    finally:
+        if not args.keep and not args.skip_ingest:
+            cleanup(run)
+    write_results('end_to_end', results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/feed_pagination.py
+"""
+Compares OFFSET and keyset pagination of the /articles feed on a scratch
+table shaped like articles, with the same covering feed index: p50/p99
+latency of fetching one page at increasing depths. The articles table is
+not touched.
+
+    python -m benchmarks.feed_pagination --rows 1000000 --depths 1 100 1000 10000 --output feed.json
+"""
+import argparse
+import time
+from benchmarks.common import percentile, write_results
+from models import engine
+
+TABLE = 'bench_feed'
+SOURCES = ['bbc.com', 'apnews.com', 'theguardian.com', 'techcrunch.com', 'npr.org']
+
+def load_table(cursor, rows):
+    """(Re)creates the scratch table with generate_series and builds the feed index."""
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"""
+        CREATE TABLE {TABLE} AS
+        SELECT n AS id,
+               'Article ' || n AS title,
+               'https://bench.invalid/feed/' || n AS url,
+               (ARRAY{SOURCES})[1 + mod(n, {len(SOURCES)})] AS source,
+               CASE WHEN mod(n, 3) = 0 THEN 'NEGATIVE' ELSE 'POSITIVE' END AS sentiment,
+               timestamp '2020-01-01' + mod(n, 100000) * interval '1 minute' AS publication_date
+        FROM generate_series(1, %s) AS n
+    """, (rows,))
+    cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+    cursor.execute(f"CREATE INDEX ON {TABLE} (publication_date DESC, id DESC) INCLUDE (title, url, sentiment, source)")
+    cursor.execute(f"VACUUM ANALYZE {TABLE}")
+
+def page_by_offset(cursor, depth, page_size):
+    cursor.execute(
+        f"SELECT id, title, url, source, sentiment, publication_date FROM {TABLE} "
+        "ORDER BY publication_date DESC, id DESC LIMIT %s OFFSET %s",
+        (page_size, depth * page_size),
+    )
+    return cursor.fetchall()
+
+def page_by_keyset(cursor, last, page_size):
+    cursor.execute(
+        f"SELECT id, title, url, source, sentiment, publication_date FROM {TABLE} "
+        "WHERE (publication_date, id) < (%s, %s) ORDER BY publication_date DESC, id DESC LIMIT %s",
+        (last[1], last[0], page_size),
+    )
+    return cursor.fetchall()
+
+def keyset_cursor_at(cursor, depth, page_size):
+    """The (id, publication_date) of the last row before page `depth`, as a client would hold it."""
+    cursor.execute(
+        f"SELECT id, publication_date FROM {TABLE} ORDER BY publication_date DESC, id DESC LIMIT 1 OFFSET %s",
+        (depth * page_size - 1,),
+    )
+    return cursor.fetchone()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 100, 1000, 10000])
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    results = []
+    connection = engine.raw_connection()
+    try:
+        connection.autocommit = True
+        cursor = connection.cursor()
+        print(f"Loading {args.rows} rows...")
+        load_table(cursor, args.rows)
+
+        for depth in args.depths:
+            if depth * args.page_size >= args.rows:
+                continue
+            last = keyset_cursor_at(cursor, depth, args.page_size)
+            for method in ('offset', 'keyset'):
+                latencies = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    if method == 'offset':
+                        page_by_offset(cursor, depth, args.page_size)
+                    else:
+                        page_by_keyset(cursor, last, args.page_size)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                results.append({
+                    'rows': args.rows,
+                    'page': depth,
+                    'method': method,
+                    'p50_ms': round(percentile(latencies, 50), 3), #type:ignore
+                    'p99_ms': round(percentile(latencies, 99), 3), #type:ignore
+                })
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    finally:
+        connection.close()
+
+    write_results('feed_pagination', results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/fixture_server.py
+"""
+A local stand-in for the five news sites, serving benchmarks/fixtures/ so
+the whole pipeline can run offline. Point the workers at it with
+FETCH_BASE_URL=http://<host>:<port> (see scrapers/fetcher.py); a request for
+https://www.bbc.com/news then arrives here as /www.bbc.com/news.
+
+    python -m benchmarks.fixture_server --port 8080 --latency-ms 50
+
+Each source's homepage is its home fixture, its feed lists the same links,
+robots.txt allows everything, and any other path on the source's host is an
+article page. Article pages are the article fixture with the body paragraphs
+rewritten from the URL, so every URL gets its own text and no two articles
+look like near-duplicates.
+"""
+import argparse
+import random
+import re
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape
+from benchmarks.common import WORDS
+from benchmarks.parse_throughput import fixture_path
+from scrapers import SOURCES, engine, find_source, parsing
+
+PLACEHOLDER = re.compile(r'@@P(\d+)@@')
+
+def article_template(spec):
+    """The article fixture with each body paragraph replaced by a numbered placeholder."""
+    with open(fixture_path(spec.domain, 'article'), 'rb') as f:
+        soup = parsing.make_soup(f.read())
+    container = spec.body_container.select_one(soup) if spec.body_container else soup
+    paragraphs = spec.body.select(container) if container is not None else []
+    for index, paragraph in enumerate(paragraphs):
+        paragraph.clear()
+        paragraph.append(f'@@P{index}@@')
+    return str(soup)
+
+def article_page(template, url):
+    """Fills a template's paragraphs with text generated from the URL."""
+    rng = random.Random(zlib.crc32(url.encode()))
+    def paragraph(match):
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))).capitalize() + '.'
+    return PLACEHOLDER.sub(paragraph, template)
+
+def feed(spec, links):
+    """An RSS 2.0 feed of the homepage's links."""
+    now = formatdate(usegmt=True)
+    items = ''.join(
+        f"<item><title>{escape(link['title'])}</title><link>{escape(link['url'])}</link><pubDate>{now}</pubDate></item>"
+        for link in links
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{escape(spec.name)}</title>{items}</channel></rss>'
+
+class FixtureSite:
+    """Every page the stand-in serves, keyed by real URL, plus the article templates."""
+
+    def __init__(self):
+        self.pages = {}
+        self.templates = {}
+        for spec in SOURCES.values():
+            with open(fixture_path(spec.domain, 'home'), 'rb') as f:
+                home = f.read()
+            self.pages[spec.homepage_url] = ('text/html; charset=utf-8', home)
+            if spec.feed_url:
+                links = engine.parse_links(spec, home)
+                self.pages[spec.feed_url] = ('application/rss+xml', feed(spec, links).encode())
+            self.templates[spec.domain] = article_template(spec)
+
+    def get(self, url):
+        """Returns (status, content type, body) for a real URL."""
+        if url in self.pages:
+            return (200, *self.pages[url])
+        if urlsplit(url).path == '/robots.txt':
+            return 200, 'text/plain', b"User-agent: *\nAllow: /\n"
+        spec = find_source(url)
+        if spec is None:
+            return 404, 'text/plain', b"Not a fixture site\n"
+        return 200, 'text/html; charset=utf-8', article_page(self.templates[spec.domain], url).encode()
+
+def make_handler(site, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            # /<host><path> -> https://<host><path>
+            host, _, path = self.path.lstrip('/').partition('/')
+            status, content_type, body = site.get(f"https://{host}/{path}")
+            if latency:
+                time.sleep(latency)
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(host='0.0.0.0', port=8080, latency_ms=0):
+    """Starts the stand-in on a background thread and returns the server (call shutdown() to stop it)."""
+    server = ThreadingHTTPServer((host, port), make_handler(FixtureSite(), latency_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response, like a real network.")
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency_ms)
+    print(f"Serving the fixture sites on http://{args.host}:{args.port} (set FETCH_BASE_URL to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
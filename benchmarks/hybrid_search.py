@@ -0,0 +1,97 @@
+# benchmarks/hybrid_search.py
+"""
+Compares pure vector search with hybrid (full-text + vector) search on the
+stored articles: p50/p99 latency of the database query and known-item
+retrieval quality. Each sampled article becomes two queries, its title and a
+few distinctive words from its body, and a query is a hit when /search
+returns that article. Query embeddings are computed up front and not timed.
+
+    python -m benchmarks.hybrid_search --queries 200 --output hybrid.json
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+from sqlalchemy import func, select
+from benchmarks.common import percentile, write_results
+from inference import get_embeddings
+from models import SessionLocal, Article
+import api
+
+CONFIGS = [
+    ('vector', {'mode': 'vector'}),
+    ('hybrid rrf', {'mode': 'hybrid', 'fusion': 'rrf'}),
+    ('hybrid weighted', {'mode': 'hybrid', 'fusion': 'weighted'}),
+]
+
+def known_item_queries(count, rng):
+    """Returns (query_type, query, article_id) for a random sample of articles."""
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(Article.id, Article.title, Article.body_text)
+            .where(Article.body_text.isnot(None)).order_by(func.random()).limit(count)
+        ).all()
+    finally:
+        db.close()
+
+    queries = []
+    for article_id, title, body in rows:
+        queries.append(('title', title, article_id))
+        # Long words are the closest thing to names and rare keywords without a corpus-wide IDF.
+        words = sorted(set(re.findall(r"[A-Za-z][A-Za-z'-]{7,}", body)))
+        if len(words) >= 3:
+            queries.append(('keywords', ' '.join(rng.sample(words, 3)), article_id))
+    return queries
+
+async def run(queries, embeddings, options):
+    latencies, ranks = [], []
+    for (_, query, article_id), embedding in zip(queries, embeddings):
+        search = api.SearchQuery(query=query, **options)
+        async with api.AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            articles = await api.find_similar_articles(db, embedding, search)
+            latencies.append((time.perf_counter() - started) * 1000)
+        ids = [article.id for article in articles]
+        ranks.append(ids.index(article_id) + 1 if article_id in ids else None)
+    return latencies, ranks
+
+def summarize(label, query_type, latencies, ranks):
+    return {
+        'method': label,
+        'queries': query_type,
+        'count': len(ranks),
+        'p50_ms': round(percentile(latencies, 50), 3), #type:ignore
+        'p99_ms': round(percentile(latencies, 99), 3), #type:ignore
+        'hit@5': round(sum(rank is not None for rank in ranks) / len(ranks), 4),
+        'mrr@5': round(sum(1 / rank for rank in ranks if rank) / len(ranks), 4),
+    }
+
+async def main_async(args):
+    queries = known_item_queries(args.queries, random.Random(0))
+    if not queries:
+        raise SystemExit("No articles to sample queries from.")
+    embeddings = get_embeddings([query for _, query, _ in queries])
+
+    results = []
+    for label, options in CONFIGS:
+        # One untimed pass so the first measured queries don't pay for connecting.
+        await run(queries[:5], embeddings[:5], options)
+        latencies, ranks = await run(queries, embeddings, options)
+        for query_type in ('title', 'keywords'):
+            picked = [i for i, (kind, _, _) in enumerate(queries) if kind == query_type]
+            if picked:
+                results.append(summarize(label, query_type, [latencies[i] for i in picked], [ranks[i] for i in picked]))
+    await api.async_engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=200, help="Articles to sample; each gives up to two queries.")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+    write_results('hybrid_search', asyncio.run(main_async(args)), args.output)
+
+if __name__ == "__main__":
+    main()
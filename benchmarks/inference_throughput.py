@@ -0,0 +1,60 @@
+# benchmarks/inference_throughput.py
+"""
+Measures sentiment + embedding throughput (articles/second) for different
+batch sizes, and checks that batched results match the single-article path.
+
+    python -m benchmarks.inference_throughput --articles 256 --output bench.json
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.common import sample_bodies, write_results
+from inference import get_embedding, get_embeddings, get_sentiments
+
+BATCH_SIZES = [1, 8, 32, 64]
+
+def run_batched(bodies, batch_size):
+    """Analyzes all bodies in groups of batch_size and returns (labels, vectors, seconds)."""
+    labels, vectors = [], []
+    started = time.perf_counter()
+    for start in range(0, len(bodies), batch_size):
+        batch = bodies[start:start + batch_size]
+        labels.extend(get_sentiments(batch))
+        vectors.extend(get_embeddings(batch))
+    return labels, np.array(vectors), time.perf_counter() - started
+
+def run_single(bodies):
+    """Analyzes bodies one at a time, exactly like tasks.process_article."""
+    labels = [get_sentiments([body])[0] for body in bodies]
+    vectors = np.array([get_embedding(body) for body in bodies])
+    return labels, vectors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=256)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    bodies = sample_bodies(args.articles)
+    # Warm up so the first measured batch doesn't pay for lazy initialisation.
+    run_batched(bodies[:2], 2)
+
+    reference_labels, reference_vectors = run_single(bodies)
+
+    results = []
+    for batch_size in args.batch_sizes:
+        labels, vectors, elapsed = run_batched(bodies, batch_size)
+        results.append({
+            'batch_size': batch_size,
+            'articles': len(bodies),
+            'seconds': round(elapsed, 3),
+            'articles_per_second': round(len(bodies) / elapsed, 2),
+            'label_agreement': sum(a == b for a, b in zip(labels, reference_labels)) / len(bodies),
+            'max_embedding_abs_diff': float(np.abs(vectors - reference_vectors).max()),
+        })
+
+    write_results('inference_throughput', results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/parse_throughput.py
+"""
+Compares HTML parser engines and strained (partial) parsing on the pages
+of the five sources in benchmarks/fixtures/: pages per second and peak
+memory of the engine's article and homepage parsing. The full html.parser tree is the
+reference, and every other configuration must extract exactly the same
+body, date and links from every page.
+
+    python -m benchmarks.parse_throughput --repeat 20 --output parse.json
+
+The fixtures are synthetic pages built to each source's selectors (see
+benchmarks/README.md); --record replaces them with the current live
+homepages and one article page per source.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import os
+import time
+import tracemalloc
+from benchmarks.common import write_results
+from scrapers import SOURCES, engine, fetcher, parsing
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# (label, engine, strain); the first is the reference.
+CONFIGS = [
+    ('html.parser full', 'html.parser', False),
+    ('html.parser strained', 'html.parser', True),
+    ('lxml full', 'lxml', False),
+    ('lxml strained', 'lxml', True),
+]
+
+def fixture_path(domain, kind):
+    return os.path.join(FIXTURES, f"{domain}-{kind}.html")
+
+def record():
+    """Saves each source's live homepage and its first article page as fixtures."""
+    for domain, spec in SOURCES.items():
+        try:
+            homepage = fetcher.fetch(spec.homepage_url).content
+            links = engine.parse_links(spec, homepage)
+            if not links:
+                print(f"No article links found for {domain}, keeping its fixtures.")
+                continue
+            article = fetcher.fetch(links[0]['url']).content
+        except fetcher.FetchError as e:
+            print(f"Error fetching {domain}: {e}")
+            continue
+        for kind, content in (('home', homepage), ('article', article)):
+            with open(fixture_path(domain, kind), 'wb') as f:
+                f.write(content)
+        print(f"Recorded {domain}: {links[0]['url']}")
+
+def load_pages():
+    """Returns (domain, kind, parse function, raw bytes) for every fixture."""
+    pages = []
+    for domain, spec in SOURCES.items():
+        for kind, parse in (('article', engine.parse_article), ('home', engine.parse_links)):
+            with open(fixture_path(domain, kind), 'rb') as f:
+                pages.append((domain, kind, functools.partial(parse, spec), f.read()))
+    return pages
+
+def run(pages, repeat):
+    # parse_links prints how many links it found; keep that out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return measure(pages, repeat)
+
+def measure(pages, repeat):
+    outputs = [parse(content) for _, _, parse, content in pages]
+
+    tracemalloc.start()
+    peaks = []
+    for _, _, parse, content in pages:
+        tracemalloc.reset_peak()
+        parse(content)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    seconds = []
+    for _, _, parse, content in pages:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            parse(content)
+        seconds.append(time.perf_counter() - started)
+    return outputs, peaks, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--record', action='store_true', help="Replace the fixtures with live pages first.")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    if args.record:
+        record()
+    pages = load_pages()
+
+    try:
+        import lxml  # noqa: F401
+        engines = {'html.parser', 'lxml'}
+    except ImportError:
+        engines = {'html.parser'}
+
+    results = []
+    reference = None
+    for label, parser_engine, strain in CONFIGS:
+        if parser_engine not in engines:
+            print(f"Skipping {label}: lxml is not installed.")
+            continue
+        parsing.ENGINE, parsing.STRAIN = parser_engine, strain
+        outputs, peaks, seconds = run(pages, args.repeat)
+        if reference is None:
+            reference = outputs
+        mismatches = [f"{domain} {kind}" for (domain, kind, _, _), output, expected in zip(pages, outputs, reference) if output != expected]
+        for kind in ('article', 'home'):
+            picked = [i for i, page in enumerate(pages) if page[1] == kind]
+            results.append({
+                'config': label,
+                'pages': kind,
+                'pages_per_second': round(len(picked) * args.repeat / sum(seconds[i] for i in picked), 1),
+                'peak_memory_kb': round(max(peaks[i] for i in picked) / 1024, 1),
+                'mismatches': [name for name in mismatches if name.endswith(kind)],
+            })
+    write_results('parse_throughput', results, args.output)
+
+if __name__ == "__main__":
+    main()
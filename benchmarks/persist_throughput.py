@@ -0,0 +1,106 @@
+# benchmarks/persist_throughput.py
+"""
+Compares the old one-session-per-article save (SELECT for the URL, INSERT,
+commit) with persist.py's bulk INSERT ... ON CONFLICT and binary COPY paths:
+rows/second and commit latency per transaction. Synthetic articles are
+written under https://bench.invalid/ and deleted afterwards.
+
+    python -m benchmarks.persist_throughput --articles 2000 --output persist.json
+"""
+import argparse
+import datetime
+import time
+import numpy as np
+from sqlalchemy import delete
+from benchmarks.common import sample_bodies, percentile, write_results
+from models import SessionLocal, Article, ArticleChunk
+import persist
+
+URL_PREFIX = 'https://bench.invalid/persist/'
+
+def synthetic_articles(count, run, chunks_per_article, rng):
+    bodies = sample_bodies(count)
+    now = datetime.datetime.utcnow()
+    articles = []
+    for i, body in enumerate(bodies):
+        vectors = rng.standard_normal((chunks_per_article + 1, 384)).astype(np.float32)
+        articles.append({
+            'title': f"Benchmark article {i}",
+            'url': f"{URL_PREFIX}{run}/{i}",
+            'body_text': body,
+            'publication_date': now,
+            'sentiment': 'POSITIVE',
+            'embedding': vectors[0],
+            'chunks': [
+                {'chunk_index': index, 'start_char': 0, 'end_char': len(body), 'embedding': vector}
+                for index, vector in enumerate(vectors[1:])
+            ],
+        })
+    return articles
+
+def save_one_by_one(article):
+    """The old save path: its own session, an existence check, one INSERT and one commit."""
+    db = SessionLocal()
+    try:
+        if db.query(Article).filter_by(url=article['url']).first():
+            return
+        chunks = [ArticleChunk(**chunk) for chunk in article['chunks']]
+        db.add(Article(**{**article, 'chunks': chunks}))
+        db.commit()
+    finally:
+        db.close()
+
+def timed(label, batches, write, articles):
+    latencies = []
+    started = time.perf_counter()
+    for batch in batches:
+        batch_started = time.perf_counter()
+        write(batch)
+        latencies.append((time.perf_counter() - batch_started) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        'method': label,
+        'articles': len(articles),
+        'chunks': sum(len(article['chunks']) for article in articles),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(len(articles) / elapsed, 1),
+        'commit_p50_ms': round(percentile(latencies, 50), 3), #type:ignore
+        'commit_p99_ms': round(percentile(latencies, 99), 3), #type:ignore
+    }
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        db.execute(delete(Article).where(Article.url.startswith(URL_PREFIX)))
+        db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--chunks-per-article', type=int, default=4)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    cleanup()
+    try:
+        articles = synthetic_articles(args.articles, 'single', args.chunks_per_article, rng)
+        results.append(timed('per-article session', [[a] for a in articles], lambda b: save_one_by_one(b[0]), articles))
+        for method in ('insert', 'copy'):
+            for batch_size in args.batch_sizes:
+                articles = synthetic_articles(args.articles, f"{method}-{batch_size}", args.chunks_per_article, rng)
+                batches = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
+                row = timed(method, batches, lambda b: persist.insert_batch(b, method), articles)
+                row['batch_size'] = batch_size
+                results.append(row)
+    finally:
+        cleanup()
+
+    write_results('persist_throughput', results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# benchmarks/search_latency.py
+"""
+Compares exact (sequential scan) and HNSW nearest-neighbour search on a
+scratch table of synthetic 384-dim vectors: p50/p99 latency, recall@5 and
+the size of each index. Only the database part of /search is timed; the
+query embedding costs the same either way. The articles table is not touched.
+
+Besides the full-precision index, the compact halfvec and binary-quantized
+indexes of SEARCH_QUANTIZATION are measured the way /search uses them:
+--rerank-candidates nearest from the compact index, re-ranked by exact
+distance (with as many candidates as results, nothing is re-ranked). They
+are built next to the full-precision index, as vector_indexes.py enable
+does. Each index's size is its own; the 'footprint' rows add up what a
+deployment keeps for the table: heap, TOAST, primary key and the HNSW
+indexes of each combination (fp32 alone, fp32 with a compact index, or a
+compact index after enable --drop-full). Relation sizes add up exactly, so
+these are sums of the measured sizes. vector_indexes.py status reports the
+same for the real articles table.
+
+    python -m benchmarks.search_latency --sizes 10000 100000 1000000 --output search.json
+"""
+import argparse
+import io
+import time
+import numpy as np
+from benchmarks.common import percentile, write_results
+from models import engine
+
+DIM = 384
+TABLE = 'bench_search_vectors'
+
+def synthetic_vectors(count, rng, clusters=200):
+    """Clustered, unit-length vectors, closer to real embeddings than uniform noise."""
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.35 * rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def to_pgvector(vector):
+    return '[' + ','.join(f'{x:.6f}' for x in vector) + ']'
+
+def load_table(cursor, vectors, chunk=20000):
+    """(Re)creates the scratch table and bulk-loads the vectors with COPY."""
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, embedding vector({DIM}))")
+    for start in range(0, len(vectors), chunk):
+        buffer = io.StringIO()
+        for offset, vector in enumerate(vectors[start:start + chunk]):
+            buffer.write(f"{start + offset}\t{to_pgvector(vector)}\n")
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {TABLE} (id, embedding) FROM STDIN", buffer)
+
+# The compact indexes and the distances they are ordered by, as in vector_indexes.py.
+COMPACT = {
+    'halfvec': (f"(embedding::halfvec({DIM})) halfvec_cosine_ops", f"embedding::halfvec({DIM}) <=> %(query)s::halfvec({DIM})"),
+    'binary': (f"(binary_quantize(embedding)::bit({DIM})) bit_hamming_ops", f"binary_quantize(embedding)::bit({DIM}) <~> binary_quantize(%(query)s::vector)"),
+}
+
+def search_sql(compact=None):
+    """The nearest-k query, or the two-phase one on a compact index."""
+    if compact is None:
+        return f"SELECT id FROM {TABLE} ORDER BY embedding <=> %(query)s::vector LIMIT %(k)s"
+    return (
+        f"SELECT id FROM (SELECT id, embedding FROM {TABLE} ORDER BY {COMPACT[compact][1]} LIMIT %(candidates)s) candidates "
+        f"ORDER BY embedding <=> %(query)s::vector LIMIT %(k)s"
+    )
+
+def relation_bytes(cursor, name, function='pg_relation_size'):
+    cursor.execute(f"SELECT {function}(%s::regclass)", (name,))
+    return cursor.fetchone()[0]
+
+def relation_mb(cursor, name):
+    return round(relation_bytes(cursor, name) / 2**20, 2)
+
+# The index combinations a deployment can run with (see vector_indexes.py).
+FOOTPRINTS = [['fp32'], ['fp32', 'halfvec'], ['fp32', 'binary'], ['halfvec'], ['binary']]
+
+def build_index(connection, cursor, name, definition):
+    """Builds an HNSW index and returns the seconds it took."""
+    started = time.perf_counter()
+    cursor.execute(f"CREATE INDEX {name} ON {TABLE} USING hnsw ({definition}) WITH (m = 16, ef_construction = 64)")
+    connection.commit()
+    return round(time.perf_counter() - started, 2)
+
+def timed_queries(cursor, queries, k, compact=None, candidates=None):
+    """Runs each query and returns (latencies in ms, result id lists)."""
+    sql = search_sql(compact)
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        cursor.execute(sql, {'query': to_pgvector(query), 'k': k, 'candidates': candidates})
+        results.append([row[0] for row in cursor.fetchall()])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, results
+
+def summarize(label, size, latencies, results, exact_results, k):
+    recall = np.mean([len(set(r) & set(e)) / k for r, e in zip(results, exact_results)])
+    return {
+        'rows': size,
+        'method': label,
+        'p50_ms': round(percentile(latencies, 50), 3), #type:ignore
+        'p99_ms': round(percentile(latencies, 99), 3), #type:ignore
+        f'recall@{k}': round(float(recall), 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[40, 100, 200])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--rerank-candidates', type=int, nargs='+', default=[5, 40, 100])
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for size in args.sizes:
+            print(f"Loading {size} vectors...")
+            vectors = synthetic_vectors(size, rng)
+            load_table(cursor, vectors)
+            connection.commit()
+            # Queries are perturbed copies of stored vectors, like a search for a known story.
+            picks = rng.integers(0, size, args.queries)
+            queries = vectors[picks] + 0.1 * rng.standard_normal((args.queries, DIM)).astype(np.float32)
+
+            # Exact baseline: no index exists yet, so this is a sequential scan.
+            latencies, exact_results = timed_queries(cursor, queries, args.k)
+            row = summarize('exact', size, latencies, exact_results, exact_results, args.k)
+            row['table_mb'] = relation_mb(cursor, TABLE)
+            results.append(row)
+            # Heap, TOAST and primary key: everything but the HNSW indexes.
+            base_bytes = relation_bytes(cursor, TABLE, 'pg_total_relation_size')
+            index_bytes = {}
+
+            print(f"Building HNSW index on {size} vectors...")
+            build_seconds = build_index(connection, cursor, f'{TABLE}_hnsw', 'embedding vector_cosine_ops')
+            index_bytes['fp32'] = relation_bytes(cursor, f'{TABLE}_hnsw')
+            for ef_search in args.ef_search:
+                cursor.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(ef_search),))
+                latencies, ann_results = timed_queries(cursor, queries, args.k)
+                row = summarize(f'hnsw ef_search={ef_search}', size, latencies, ann_results, exact_results, args.k)
+                row['index_build_seconds'] = build_seconds
+                row['index_mb'] = relation_mb(cursor, f'{TABLE}_hnsw')
+                results.append(row)
+
+            for compact, (definition, _) in COMPACT.items():
+                print(f"Building {compact} HNSW index on {size} vectors...")
+                build_seconds = build_index(connection, cursor, f'{TABLE}_{compact}', definition)
+                index_bytes[compact] = relation_bytes(cursor, f'{TABLE}_{compact}')
+                for candidates in args.rerank_candidates:
+                    # Like /search: the scan has to return all the candidates.
+                    ef_search = max(args.ef_search[0], candidates)
+                    cursor.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(ef_search),))
+                    latencies, ann_results = timed_queries(cursor, queries, args.k, compact, candidates)
+                    row = summarize(f'{compact} re-rank {candidates} ef_search={ef_search}', size, latencies, ann_results, exact_results, args.k)
+                    row['index_build_seconds'] = build_seconds
+                    row['index_mb'] = relation_mb(cursor, f'{TABLE}_{compact}')
+                    results.append(row)
+
+            for indexes in FOOTPRINTS:
+                results.append({
+                    'rows': size,
+                    'method': 'footprint ' + ' + '.join(indexes),
+                    'indexes_mb': round(sum(index_bytes[index] for index in indexes) / 2**20, 2),
+                    'total_mb': round((base_bytes + sum(index_bytes[index] for index in indexes)) / 2**20, 2),
+                })
+            # All three, as measured: what the schema kept before they were optional.
+            results.append({
+                'rows': size,
+                'method': 'footprint fp32 + halfvec + binary',
+                'indexes_mb': round(sum(index_bytes.values()) / 2**20, 2),
+                'total_mb': round(relation_bytes(cursor, TABLE, 'pg_total_relation_size') / 2**20, 2),
+            })
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        connection.commit()
+    finally:
+        connection.close()
+
+    write_results('search_latency', results, args.output)
+
+if __name__ == "__main__":
+    main()
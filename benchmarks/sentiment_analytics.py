@@ -0,0 +1,108 @@
+# benchmarks/sentiment_analytics.py
+"""
+Compares answering /analytics/sentiment/timeseries with a GROUP BY over the
+articles and with the hourly rollups, on scratch tables shaped like articles
+and sentiment_rollups: p50/p99 latency of a daily series over --days days,
+at increasing table sizes. The articles and sentiment_rollups tables are not
+touched.
+
+    python -m benchmarks.sentiment_analytics --rows 100000 1000000 10000000 --output analytics.json
+"""
+import argparse
+import time
+from benchmarks.common import percentile, write_results
+from benchmarks.feed_pagination import SOURCES
+from models import engine
+
+TABLE = 'bench_analytics_articles'
+ROLLUPS = 'bench_analytics_rollups'
+# Articles are spread evenly over this many days, whatever the table size.
+SPAN_DAYS = 365
+
+def load_tables(cursor, rows):
+    """(Re)creates the scratch articles with generate_series, and their rollups."""
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS {ROLLUPS}")
+    cursor.execute(f"""
+        CREATE TABLE {TABLE} AS
+        SELECT n AS id,
+               (ARRAY{SOURCES})[1 + mod(n, {len(SOURCES)})] AS source,
+               CASE WHEN mod(n, 3) = 0 THEN 'NEGATIVE' ELSE 'POSITIVE' END AS sentiment,
+               timestamp '2024-01-01' + (n::float8 / %s) * interval '{SPAN_DAYS} days' AS publication_date
+        FROM generate_series(1, %s) AS n
+    """, (rows, rows))
+    cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+    # The best a GROUP BY can do: an index-only scan of the range.
+    cursor.execute(f"CREATE INDEX ON {TABLE} (publication_date) INCLUDE (source, sentiment)")
+    cursor.execute(f"""
+        CREATE TABLE {ROLLUPS} AS
+        SELECT source, date_trunc('hour', publication_date) AS hour, count(*) AS articles,
+               count(*) FILTER (WHERE sentiment = 'POSITIVE') AS positive,
+               count(*) FILTER (WHERE sentiment = 'NEGATIVE') AS negative
+        FROM {TABLE} GROUP BY 1, 2
+    """)
+    cursor.execute(f"ALTER TABLE {ROLLUPS} ADD PRIMARY KEY (source, hour)")
+    cursor.execute(f"CREATE INDEX ON {ROLLUPS} (hour)")
+    cursor.execute(f"VACUUM ANALYZE {TABLE}")
+    cursor.execute(f"VACUUM ANALYZE {ROLLUPS}")
+
+def series_from_articles(cursor, start, end):
+    cursor.execute(
+        f"SELECT date_trunc('day', publication_date) AS day, count(*), "
+        "count(*) FILTER (WHERE sentiment = 'POSITIVE'), count(*) FILTER (WHERE sentiment = 'NEGATIVE') "
+        f"FROM {TABLE} WHERE publication_date >= %s AND publication_date < %s GROUP BY 1 ORDER BY 1",
+        (start, end),
+    )
+    return cursor.fetchall()
+
+def series_from_rollups(cursor, start, end):
+    cursor.execute(
+        f"SELECT date_trunc('day', hour) AS day, sum(articles), sum(positive), sum(negative) "
+        f"FROM {ROLLUPS} WHERE hour >= %s AND hour < %s GROUP BY 1 ORDER BY 1",
+        (start, end),
+    )
+    return cursor.fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 10000000])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    results = []
+    connection = engine.raw_connection()
+    try:
+        connection.autocommit = True
+        cursor = connection.cursor()
+        for rows in args.rows:
+            print(f"Loading {rows} rows...")
+            load_tables(cursor, rows)
+            cursor.execute(f"SELECT max(publication_date) FROM {TABLE}")
+            end = cursor.fetchone()[0]
+            cursor.execute("SELECT %s - %s * interval '1 day'", (end, args.days))
+            start = cursor.fetchone()[0]
+
+            for method, query in (('group_by', series_from_articles), ('rollups', series_from_rollups)):
+                latencies = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    query(cursor, start, end)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                results.append({
+                    'rows': rows,
+                    'days': args.days,
+                    'method': method,
+                    'p50_ms': round(percentile(latencies, 50), 3), #type:ignore
+                    'p99_ms': round(percentile(latencies, 99), 3), #type:ignore
+                })
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.execute(f"DROP TABLE IF EXISTS {ROLLUPS}")
+    finally:
+        connection.close()
+
+    write_results('sentiment_analytics', results, args.output)
+
+if __name__ == "__main__":
+    main()
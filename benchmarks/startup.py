@@ -0,0 +1,79 @@
+# benchmarks/startup.py
+"""
+Measures cold-start time and memory of the API and worker processes: each
+target is imported in a fresh interpreter, then its models are warmed up.
+
+    python -m benchmarks.startup --output startup.json
+
+To get "before" numbers for an older revision, check it out in a worktree
+and point --cwd at it (models loaded at import time show up as import cost):
+
+    git worktree add /tmp/before <rev>
+    python -m benchmarks.startup --cwd /tmp/before
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from benchmarks.common import write_results
+
+# (module to import, models the process needs warm)
+TARGETS = {
+    'api': ('api', ['embedding']),
+    'worker': ('tasks', ['sentiment', 'embedding']),
+    'worker-io': ('tasks', []),
+}
+
+CHILD = '''
+import json, resource, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+rss_after_import = rss_mb()
+try:
+    from model_registry import warm_up
+    warm_up({models!r})
+except ImportError:
+    pass  # older trees load every model at import time
+warmed = time.perf_counter()
+print(json.dumps({{
+    'import_seconds': round(imported - started, 3),
+    'warm_up_seconds': round(warmed - imported, 3),
+    'total_seconds': round(warmed - started, 3),
+    'rss_after_import_mb': round(rss_after_import, 1),
+    'rss_after_warm_up_mb': round(rss_mb(), 1),
+    'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+}}))
+'''
+
+def measure(module, models, cwd):
+    code = CHILD.format(module=module, models=models)
+    completed = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True, env=os.environ)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--cwd', default=os.getcwd(), help="Project tree to measure.")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    results = []
+    for target in args.targets:
+        module, models = TARGETS[target]
+        runs = [measure(module, models, args.cwd) for _ in range(args.runs)]
+        # The fastest run has the least noise from the page cache and other processes.
+        best = min(runs, key=lambda run: run['total_seconds'])
+        results.append({'target': target, 'cwd': args.cwd, 'runs': args.runs, **best})
+
+    write_results('startup', results, args.output)
+
+if __name__ == "__main__":
+    main()
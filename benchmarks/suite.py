@@ -0,0 +1,79 @@
+# benchmarks/suite.py
+"""
+Runs groups of benchmarks one after another, each in a fresh process, and
+collects their JSON reports into one file, so two runs (e.g. before and
+after a change) can be compared with benchmarks/compare.py.
+
+    python -m benchmarks.suite --groups offline db --output-dir results/before
+    python -m benchmarks.compare results/before/suite.json results/after/suite.json
+
+offline needs nothing but the models, db needs Postgres (DATABASE_URL), and
+e2e needs the whole stack started with docker-compose.bench.yml (see
+benchmarks/end_to_end.py). --quick runs the slow ones on smaller inputs.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from benchmarks.common import write_results
+
+GROUPS = {
+    'offline': ['parse_throughput', 'inference_throughput', 'backend_drift', 'startup'],
+    'db': ['persist_throughput', 'feed_pagination', 'sentiment_analytics', 'search_latency', 'hybrid_search'],
+    'e2e': ['end_to_end'],
+}
+
+QUICK_ARGS = {
+    'parse_throughput': ['--repeat', '5'],
+    'inference_throughput': ['--articles', '64'],
+    'backend_drift': ['--articles', '64'],
+    'startup': ['--runs', '1'],
+    'persist_throughput': ['--articles', '500'],
+    'feed_pagination': ['--rows', '100000', '--depths', '1', '100', '1000'],
+    'sentiment_analytics': ['--rows', '100000', '1000000'],
+    'search_latency': ['--sizes', '10000', '--queries', '50'],
+    'hybrid_search': ['--queries', '50'],
+    'end_to_end': ['--articles', '100', '--duration', '10'],
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_benchmark(name, output_dir, quick):
+    """Runs one benchmark module; returns its report, or an error entry if it failed."""
+    output = os.path.join(output_dir, f"{name}.json")
+    command = [sys.executable, '-m', f'benchmarks.{name}', *(QUICK_ARGS.get(name, []) if quick else []), '--output', output]
+    print(f"--- Running {name} ---")
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    elapsed = round(time.perf_counter() - started, 1)
+    if completed.returncode != 0 or not os.path.exists(output):
+        print(f"{name} failed (exit code {completed.returncode}):\n{completed.stderr[-2000:]}")
+        return {'error': f"exit code {completed.returncode}", 'seconds': elapsed}
+    with open(output) as f:
+        report = json.load(f)
+    print(f"{name} finished in {elapsed}s")
+    return {**report, 'seconds': elapsed}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', nargs='+', choices=list(GROUPS), default=['offline'])
+    parser.add_argument('--only', nargs='+', default=None, help="Run just these benchmarks of the groups.")
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--output-dir', default='benchmark-results')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    names = [name for group in args.groups for name in GROUPS[group] if not args.only or name in args.only]
+    reports = {name: run_benchmark(name, args.output_dir, args.quick) for name in names}
+    failed = [name for name, report in reports.items() if 'error' in report]
+
+    # Only the summary is printed; each benchmark's report is in its own file too.
+    print(json.dumps({name: report.get('error', 'ok') for name, report in reports.items()}, indent=2))
+    write_results('suite', {'groups': args.groups, 'quick': args.quick, 'benchmarks': reports},
+                  os.path.join(args.output_dir, 'suite.json'), quiet=True)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
 # celery_app.py
 from celery import Celery
+from celery import signals
+import datetime
 import os
+import time
+import metrics
+import tracing
 
 # Get the Redis URL from the environment variable set by Docker Compose.
 # It defaults to 'localhost' if the variable isn't set (for local development).
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# How often buffered articles from the staged pipeline are written out (see persist.py).
+PERSIST_FLUSH_INTERVAL = float(os.getenv('PERSIST_FLUSH_INTERVAL', '5'))
+# How often beat checks which sources are due for a poll (see poller.py).
+CRAWL_POLL_TICK = float(os.getenv('CRAWL_POLL_TICK', '30'))
+# How often embedding versions other than the inline one catch up with new articles (see embedding_versions.py).
+REEMBED_INTERVAL = float(os.getenv('REEMBED_INTERVAL', '60'))
 
 celery = Celery(
     'project_titan',
@@ -19,4 +30,72 @@ celery.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
-)
\ No newline at end of file
+    # Each stage of the staged pipeline gets its own queue, so I/O-bound and
+    # CPU-bound workers can be scaled independently (see docker-compose.yml).
+    # process_article and process_articles_batch stay on the default queue.
+    task_routes={
+        'tasks.fetch_article': {'queue': 'fetch'},
+        'tasks.parse_article': {'queue': 'parse'},
+        'tasks.infer_article': {'queue': 'infer'},
+        'tasks.persist_article': {'queue': 'persist'},
+        'tasks.flush_persist_buffer': {'queue': 'persist'},
+    },
+    # Run with `celery -A celery_app.celery beat` (the beat service in docker-compose.yml).
+    beat_schedule={
+        'flush-persist-buffer': {
+            'task': 'tasks.flush_persist_buffer',
+            'schedule': PERSIST_FLUSH_INTERVAL,
+            # A flush that is still waiting when the next one is due is dropped.
+            'options': {'expires': PERSIST_FLUSH_INTERVAL},
+        },
+        'poll-sources': {
+            'task': 'tasks.poll_sources',
+            'schedule': CRAWL_POLL_TICK,
+            'options': {'expires': CRAWL_POLL_TICK},
+        },
+        'reembed-versions': {
+            'task': 'tasks.reembed_versions',
+            'schedule': REEMBED_INTERVAL,
+            'options': {'expires': REEMBED_INTERVAL},
+        },
+    },
+)
+# --- Metrics and Tracing ---
+# Every process that sends tasks (main.py, beat, workers) stamps them with the
+# time they were sent and the current trace context; workers time each task
+# and its wait in the queue (see metrics.py and tracing.py).
+_task_starts = {}
+
+@signals.before_task_publish.connect
+def stamp_task(headers=None, **kwargs):
+    if headers is None:
+        return
+    # A task with an ETA (e.g. a frontier retry) is due at its ETA, not when it was sent.
+    eta = headers.get('eta')
+    headers['dispatched_at'] = datetime.datetime.fromisoformat(eta).timestamp() if eta else time.time()
+    tracing.inject(headers)
+
+@signals.task_prerun.connect
+def start_task(task_id=None, task=None, **kwargs):
+    dispatched_at = task.request.get('dispatched_at') #type:ignore
+    if dispatched_at:
+        metrics.TASK_QUEUE_WAIT_SECONDS.labels(task.name).observe(max(0.0, time.time() - dispatched_at)) #type:ignore
+    _task_starts[task_id] = time.perf_counter()
+    tracing.start_task(task_id, task.name, { #type:ignore
+        key: task.request.get(key) for key in ('traceparent', 'tracestate') if task.request.get(key) #type:ignore
+    })
+
+@signals.task_postrun.connect
+def finish_task(task_id=None, task=None, state=None, **kwargs):
+    started = _task_starts.pop(task_id, None)
+    if started is not None:
+        metrics.TASK_SECONDS.labels(task.name, state or 'UNKNOWN').observe(time.perf_counter() - started) #type:ignore
+    tracing.end_task(task_id, state)
+
+@signals.worker_init.connect
+def start_metrics_exporter(**kwargs):
+    metrics.start_worker_exporter()
+
+@signals.worker_process_shutdown.connect
+def drop_process_metrics(pid=None, **kwargs):
+    metrics.process_exited(pid)
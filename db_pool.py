@@ -0,0 +1,115 @@
+# db_pool.py
+"""
+Connection pool settings for the sync engine (workers, scripts) and the async
+engine (API), with checkout counts and pool wait times for each pool.
+
+With DB_PGBOUNCER=1 connections are expected to go through PgBouncer in
+transaction mode: the application keeps no pool of its own (PgBouncer is
+the pool) and asyncpg doesn't cache prepared statements, since consecutive
+transactions may run on different server connections.
+"""
+import os
+import sys
+import time
+import uuid
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, NullPool
+import metrics as prometheus
+
+# --- Pool Settings ---
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+# Seconds to wait for a free connection before giving up.
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+# Connections older than this are replaced, before Postgres or a proxy drops them.
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+PGBOUNCER = os.getenv('DB_PGBOUNCER', '0') == '1'
+# --------------------
+
+class PoolMetrics:
+    """Checkouts, new connections and time spent waiting for a connection, for one pool."""
+
+    def __init__(self):
+        self.engine = None
+        self.checkouts = 0
+        self.connects = 0
+        self.wait_ms = prometheus.LocalHistogram([0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000])
+
+    def to_dict(self):
+        pool = self.engine.pool if self.engine is not None else None
+        stats = {
+            'checkouts': self.checkouts,
+            'connects': self.connects,
+            'wait_ms': self.wait_ms.to_dict(),
+            'pool': type(pool).__name__ if pool is not None else None,
+        }
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+metrics = {}
+
+def timed_pool(base, name):
+    """Returns a subclass of a pool class that records checkouts and wait time under `name`."""
+    pool_metrics = metrics.setdefault(name, PoolMetrics())
+    wait_seconds = prometheus.DB_POOL_WAIT_SECONDS.labels(name)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return base.connect(self)
+        finally:
+            waited = time.perf_counter() - started
+            pool_metrics.checkouts += 1
+            pool_metrics.wait_ms.observe(waited * 1000)
+            wait_seconds.observe(waited)
+
+    return type(f"Timed{base.__name__}", (base,), {'connect': connect})
+
+def engine_options(name, is_async=False):
+    """Keyword arguments for create_engine / create_async_engine."""
+    if PGBOUNCER:
+        options = {'poolclass': timed_pool(NullPool, name)}
+    else:
+        options = {
+            'poolclass': timed_pool(AsyncAdaptedQueuePool if is_async else QueuePool, name),
+            'pool_size': POOL_SIZE,
+            'max_overflow': MAX_OVERFLOW,
+            'pool_timeout': POOL_TIMEOUT,
+            'pool_recycle': POOL_RECYCLE,
+        }
+    # Test each connection on checkout so a restarted database costs one reconnect, not a failed request.
+    options['pool_pre_ping'] = True
+    if is_async and PGBOUNCER:
+        options['connect_args'] = {
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return options
+
+def instrument(engine, name):
+    """Counts new database connections for an engine created with engine_options(name)."""
+    pool_metrics = metrics.setdefault(name, PoolMetrics())
+    pool_metrics.engine = engine
+    sync_engine = getattr(engine, 'sync_engine', engine)
+    connects = prometheus.DB_POOL_CONNECTS.labels(name)
+
+    @event.listens_for(sync_engine, 'connect')
+    def count_connect(dbapi_connection, connection_record):
+        pool_metrics.connects += 1
+        connects.inc()
+
+def stats():
+    return {name: pool_metrics.to_dict() for name, pool_metrics in metrics.items()}
+
+def patch_for_eventlet():
+    """
+    Inside `celery worker -P eventlet` sockets are green, but psycopg2 waits
+    on the server in C and would block every green thread in the process.
+    psycogreen makes it yield to the eventlet hub instead.
+    """
+    eventlet = sys.modules.get('eventlet')
+    if eventlet is not None and eventlet.patcher.is_monkey_patched('socket'):
+        from psycogreen.eventlet import patch_psycopg
+        patch_psycopg()
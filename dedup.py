@@ -0,0 +1,142 @@
+# dedup.py
+import os
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import redis
+from celery_app import REDIS_URL
+from models import SessionLocal, Article
+
+# --- Dedup Settings ---
+# Query parameters that only track where a click came from.
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'ocid', 'cmp', 'cmpid',
+    'at_medium', 'at_campaign', 'at_custom1', 'at_custom2', 'at_custom3', 'at_custom4',
+    'ref', 'ref_src', 'taid', 'guccounter', 'xtor', 'smid', 'sh',
+}
+TRACKING_PREFIXES = ('utm_', 'at_')
+# A dispatched URL is not dispatched again for this long, even if its task
+# fails before saving it.
+CLAIM_TTL = int(os.getenv('DEDUP_CLAIM_TTL', '3600'))
+# Use a RedisBloom filter instead of a plain set. Needs the RedisBloom module
+# (redis-stack); trades a small false-positive rate for much less memory.
+USE_BLOOM = os.getenv('DEDUP_BLOOM', '0') == '1'
+BLOOM_CAPACITY = int(os.getenv('DEDUP_BLOOM_CAPACITY', '10000000'))
+BLOOM_ERROR_RATE = float(os.getenv('DEDUP_BLOOM_ERROR_RATE', '0.0001'))
+
+KNOWN_KEY = 'dedup:known'
+WARMED_KEY = 'dedup:warmed'
+CLAIM_KEY = 'dedup:claim:{}'
+STATS_KEY = 'dedup:stats'
+# --------------------
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+def canonicalize_url(url):
+    """
+    Normalizes a URL so the same article always maps to the same string:
+    lowercases the scheme and host, drops default ports, tracking parameters,
+    the fragment and trailing slashes, and sorts the remaining parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/')
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+# --- Known URL Store ---
+def _contains(urls):
+    if USE_BLOOM:
+        return [bool(hit) for hit in redis_client.execute_command('BF.MEXISTS', KNOWN_KEY, *urls)]
+    return [bool(hit) for hit in redis_client.smismember(KNOWN_KEY, urls)]
+
+def mark_known(urls):
+    """Records URLs that are stored in the database."""
+    urls = list(urls)
+    if not urls:
+        return
+    if USE_BLOOM:
+        redis_client.execute_command('BF.MADD', KNOWN_KEY, *urls)
+    else:
+        redis_client.sadd(KNOWN_KEY, *urls)
+
+def warm(chunk_size=10000):
+    """
+    Loads every URL already in the articles table into the known-URL store,
+    once per Redis instance. The table's unique url index stays the source
+    of truth; this only mirrors it so lookups don't need a query each.
+    """
+    if redis_client.exists(WARMED_KEY):
+        return
+    if USE_BLOOM and not redis_client.exists(KNOWN_KEY):
+        redis_client.execute_command('BF.RESERVE', KNOWN_KEY, BLOOM_ERROR_RATE, BLOOM_CAPACITY)
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Article.url).execution_options(yield_per=chunk_size)
+        batch = []
+        for (url,) in rows:
+            batch.append(canonicalize_url(url))
+            if len(batch) >= chunk_size:
+                mark_known(batch)
+                batch = []
+        mark_known(batch)
+    finally:
+        db.close()
+    redis_client.set(WARMED_KEY, 1)
+
+def _count(checked, duplicates):
+    pipe = redis_client.pipeline()
+    pipe.hincrby(STATS_KEY, 'checked', checked)
+    pipe.hincrby(STATS_KEY, 'duplicates', duplicates)
+    pipe.execute()
+
+# --- Lookups ---
+def filter_new(links):
+    """
+    Dispatch-time dedup. Canonicalizes each link's URL and returns only the
+    links that are not stored yet and not already dispatched by someone else,
+    claiming them for CLAIM_TTL seconds.
+    """
+    warm()
+    unique = {}
+    for link in links:
+        url = canonicalize_url(link['url'])
+        unique.setdefault(url, {**link, 'url': url})
+    if not unique:
+        return []
+
+    urls = list(unique)
+    candidates = [url for url, known in zip(urls, _contains(urls)) if not known]
+
+    pipe = redis_client.pipeline()
+    for url in candidates:
+        pipe.set(CLAIM_KEY.format(url), 1, nx=True, ex=CLAIM_TTL)
+    new_links = [unique[url] for url, claimed in zip(candidates, pipe.execute()) if claimed]
+
+    _count(len(links), len(links) - len(new_links))
+    return new_links
+
+def is_known(url):
+    """Task-start dedup: True if the (canonical) URL is already stored."""
+    warm()
+    known = _contains([url])[0]
+    _count(1, int(known))
+    return known
+
+def stats():
+    """Returns how many URLs were checked, how many were duplicates, and the hit rate."""
+    values = {key: int(value) for key, value in redis_client.hgetall(STATS_KEY).items()}
+    checked, duplicates = values.get('checked', 0), values.get('duplicates', 0)
+    return {
+        'checked': checked,
+        'duplicates': duplicates,
+        'hit_rate': round(duplicates / checked, 3) if checked else 0.0,
+    }
+
+if __name__ == "__main__":
+    print(stats())
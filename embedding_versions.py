@@ -0,0 +1,333 @@
+# embedding_versions.py
+"""
+Embedding model versions, so the embedding model can be changed without
+taking /search down.
+
+Every version is a row in embedding_versions. The first one (MiniLM, mean
+pooled) is stored inline, in articles.embedding and article_chunks; other
+versions keep one vector per article in article_embeddings, each with its
+own partial HNSW index. Changing models is:
+
+    python embedding_versions.py register NAME MODEL DIMENSIONS [--pooling mean|cls]
+    python embedding_versions.py reembed NAME
+    python embedding_versions.py activate NAME
+
+reembed goes through the articles in id order, REEMBED_BATCH_SIZE at a time
+and at most REEMBED_RATE articles per second, and commits each batch with its
+checkpoint (backfilled_to_id), so it resumes where it stopped. Beat runs it
+for every non-inline version every REEMBED_INTERVAL seconds, which keeps
+them up to date with new articles. activate switches /search to a version in
+one transaction, once it has caught up and its index is built; switching
+back is the same command with the old name.
+"""
+import contextlib
+import datetime
+import os
+import re
+import sys
+import threading
+import time
+import redis
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from celery_app import REDIS_URL
+from models import engine, SessionLocal, Article, ArticleEmbedding, EmbeddingVersion
+from inference import embed_articles, version_embedder
+
+# --- Re-embedding Settings ---
+BATCH_SIZE = int(os.getenv('REEMBED_BATCH_SIZE', '256'))
+# Articles per second, so a backfill leaves CPU for live ingestion. 0 means no limit.
+RATE = float(os.getenv('REEMBED_RATE', '50'))
+# A run whose batches stop refreshing the lock for this long is assumed to have died.
+LOCK_TTL = 300
+
+LOCK_KEY = 'reembed:lock:{}'
+# --------------------
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+# Names end up in index names and SQL literals.
+NAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+
+def get(name):
+    """Returns an embedding version by name, or raises ValueError."""
+    db = SessionLocal()
+    try:
+        version = db.get(EmbeddingVersion, name)
+    finally:
+        db.close()
+    if version is None:
+        raise ValueError(f"Unknown embedding version: {name}")
+    return version
+
+def all_versions():
+    db = SessionLocal()
+    try:
+        return db.query(EmbeddingVersion).order_by(EmbeddingVersion.created_at).all()
+    finally:
+        db.close()
+
+def register(name, model, dimensions, pooling='mean'):
+    """Adds a version stored in article_embeddings. It has no vectors until reembed runs."""
+    if not NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid version name {name!r}: use lowercase letters, digits, '-' and '_'.")
+    if pooling not in ('mean', 'cls'):
+        raise ValueError(f"Unknown pooling: {pooling}")
+    db = SessionLocal()
+    try:
+        db.add(EmbeddingVersion(name=name, model=model, pooling=pooling, dimensions=int(dimensions)))
+        db.commit()
+    finally:
+        db.close()
+    print(f"REGISTERED embedding version {name}: {model} ({pooling} pooling, {dimensions} dims)")
+
+# --- Per-Version Indexes ---
+# article_embeddings.embedding has no fixed dimension, so each version's index
+# is on the expression embedding::vector(dimensions), limited to its rows.
+# Searches compare EmbeddingVersion.vector() with the query, so the planner
+# can use it.
+def index_name(name):
+    return f"ix_article_embeddings_{name.replace('-', '_')}_hnsw"
+
+def has_index(name):
+    """Whether the version's index exists and finished building."""
+    with engine.connect() as connection:
+        return bool(connection.execute(text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+        ), {'name': index_name(name)}).scalar())
+
+def index_building(name):
+    """Whether a CREATE INDEX of the version's index is running right now."""
+    with engine.connect() as connection:
+        return connection.execute(text(
+            "SELECT 1 FROM pg_stat_progress_create_index p JOIN pg_class c ON c.oid = p.index_relid "
+            "WHERE c.relname = :name"
+        ), {'name': index_name(name)}).first() is not None
+
+def create_index(name):
+    """
+    Builds the version's HNSW index without blocking writes (CREATE INDEX
+    CONCURRENTLY). An index is also invalid while it is being built, so one
+    is only dropped and started over when no build of it is running, i.e.
+    one that failed halfway. Returns whether the index is built.
+    """
+    if has_index(name):
+        return True
+    if index_building(name):
+        print(f"Index {index_name(name)} is still being built by another session.")
+        return False
+    version = get(name)
+    index = index_name(name)
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index}"))
+        print(f"Building index {index}...")
+        connection.execute(text(
+            f"CREATE INDEX CONCURRENTLY {index} ON article_embeddings "
+            f"USING hnsw ((embedding::vector({version.dimensions})) vector_cosine_ops) "
+            f"WITH (m = 16, ef_construction = 64) WHERE version = '{version.name}'"
+        ))
+    print(f"Index {index} built.")
+    return True
+
+# --- Re-embedding ---
+def _embed_batch(db, version, embed, rows):
+    """Returns {article_id: vector} for a batch of (id, body_text, canonical_id) rows."""
+    # Near-duplicates share their canonical article's vector, as they share its
+    # inline embedding. The canonical article has a lower id, so it already has
+    # one from an earlier batch, or gets one earlier in this batch.
+    canonical_ids = {row.canonical_id for row in rows if row.canonical_id}
+    vectors = dict(
+        db.query(ArticleEmbedding.article_id, ArticleEmbedding.embedding)
+        .filter(ArticleEmbedding.version == version.name, ArticleEmbedding.article_id.in_(canonical_ids))
+    ) if canonical_ids else {}
+    batch_ids = {row.id for row in rows if row.body_text and not row.canonical_id}
+    to_embed = [
+        row for row in rows
+        if row.body_text and not (row.canonical_id in vectors or row.canonical_id in batch_ids)
+    ]
+    if to_embed:
+        embedded = embed_articles([row.body_text for row in to_embed], embed=embed)
+        if len(embedded[0][0]) != version.dimensions:
+            raise ValueError(f"{version.model} returns {len(embedded[0][0])} dimensions, not {version.dimensions}")
+        vectors.update((row.id, vector) for row, (vector, _) in zip(to_embed, embedded))
+
+    batch = {}
+    for row in rows:
+        vector = vectors.get(row.id)
+        if vector is None and row.canonical_id:
+            vector = vectors.get(row.canonical_id)
+        if vector is not None:
+            batch[row.id] = vector
+    return batch
+
+@contextlib.contextmanager
+def _lock_refreshed(lock):
+    """Keeps refreshing the lock while the block runs, for steps that take longer than LOCK_TTL."""
+    done = threading.Event()
+    def refresh():
+        while not done.wait(LOCK_TTL / 3):
+            redis_client.expire(lock, LOCK_TTL)
+    thread = threading.Thread(target=refresh, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+def reembed(name, batch_size=BATCH_SIZE, rate=RATE):
+    """
+    Embeds every article after the version's checkpoint with its model, then
+    builds its index if it isn't built yet, both under the version's lock.
+    Each batch and its checkpoint are committed together. Only one run per
+    version at a time; returns how many articles were embedded, or None if
+    another run holds the lock.
+    """
+    version = get(name)
+    if version.inline:
+        raise ValueError(f"{name} is stored inline; its vectors are written by the pipeline.")
+    lock = LOCK_KEY.format(name)
+    if not redis_client.set(lock, 1, nx=True, ex=LOCK_TTL):
+        return None
+    try:
+        embed = version_embedder(version.model, version.pooling)
+        last_id, embedded = version.backfilled_to_id, 0
+        while True:
+            started = time.monotonic()
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(Article.id, Article.body_text, Article.canonical_id)
+                    .filter(Article.id > last_id)
+                    .order_by(Article.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                vectors = _embed_batch(db, version, embed, rows)
+                if vectors:
+                    statement = pg_insert(ArticleEmbedding.__table__).values([
+                        {'article_id': article_id, 'version': name, 'embedding': vector}
+                        for article_id, vector in vectors.items()
+                    ])
+                    db.execute(statement.on_conflict_do_update(
+                        index_elements=['article_id', 'version'],
+                        set_={'embedding': statement.excluded.embedding},
+                    ))
+                last_id = rows[-1].id
+                db.query(EmbeddingVersion).filter(EmbeddingVersion.name == name).update({'backfilled_to_id': last_id})
+                db.commit()
+            finally:
+                db.close()
+            embedded += len(vectors)
+            redis_client.expire(lock, LOCK_TTL)
+            print(f"  -> {name}: embedded up to article {last_id}, {embedded} so far")
+            if rate:
+                time.sleep(max(0.0, len(rows) / rate - (time.monotonic() - started)))
+
+        # Still under the lock, so the next beat run doesn't see the index
+        # being built as a failed build and start it over.
+        with _lock_refreshed(lock):
+            create_index(name)
+    finally:
+        redis_client.delete(lock)
+
+    if embedded:
+        print(f"REEMBED DONE: {name} caught up at article {last_id} ({embedded} embedded)")
+    return embedded
+
+# --- Switching ---
+def activate(name, force=False):
+    """
+    Makes /search query this version. Both flag updates run in one
+    transaction, so every search sees either the old version or the new one.
+    Unless forced, the version has to be re-embedded up to the newest article
+    and have its index built.
+    """
+    db = SessionLocal()
+    try:
+        # Locking every row serializes concurrent activations.
+        versions = {version.name: version for version in db.query(EmbeddingVersion).with_for_update()}
+        version = versions.get(name)
+        if version is None:
+            raise ValueError(f"Unknown embedding version: {name}")
+        if not version.inline and not force:
+            latest = db.query(func.max(Article.id)).scalar() or 0
+            if version.backfilled_to_id < latest:
+                raise ValueError(f"{name} is re-embedded up to article {version.backfilled_to_id} of {latest}; run reembed first.")
+            if not has_index(name):
+                raise ValueError(f"{name} has no index yet; run reembed first.")
+        db.query(EmbeddingVersion).filter(EmbeddingVersion.active, EmbeddingVersion.name != name).update({'active': False})
+        version.active = True
+        version.activated_at = datetime.datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+    print(f"ACTIVATED embedding version {name}")
+
+def drop(name):
+    """Deletes a version that isn't active, with its vectors and index."""
+    version = get(name)
+    if version.active or version.inline:
+        raise ValueError(f"{name} is {'active' if version.active else 'stored inline'} and can't be dropped.")
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(name)}"))
+    db = SessionLocal()
+    try:
+        # Cascades to its rows in article_embeddings.
+        db.query(EmbeddingVersion).filter(EmbeddingVersion.name == name).delete()
+        db.commit()
+    finally:
+        db.close()
+    print(f"DROPPED embedding version {name}")
+
+def stats():
+    """Every version with its checkpoint and whether its index is built."""
+    return [
+        {
+            'name': version.name, 'model': version.model, 'pooling': version.pooling,
+            'dimensions': version.dimensions, 'inline': version.inline, 'active': version.active,
+            'backfilled_to_id': version.backfilled_to_id,
+            'indexed': version.inline or has_index(version.name),
+        }
+        for version in all_versions()
+    ]
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage embedding model versions.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status')
+    command = commands.add_parser('register')
+    command.add_argument('name')
+    command.add_argument('model')
+    command.add_argument('dimensions', type=int)
+    command.add_argument('--pooling', choices=['mean', 'cls'], default='mean')
+    command = commands.add_parser('reembed')
+    command.add_argument('name')
+    command.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    command.add_argument('--rate', type=float, default=RATE)
+    command = commands.add_parser('activate')
+    command.add_argument('name')
+    command.add_argument('--force', action='store_true')
+    command = commands.add_parser('drop')
+    command.add_argument('name')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'status':
+            for row in stats():
+                print(row)
+        elif args.command == 'register':
+            register(args.name, args.model, args.dimensions, args.pooling)
+        elif args.command == 'reembed':
+            if reembed(args.name, args.batch_size, args.rate) is None:
+                print(f"{args.name} is being re-embedded by another process.")
+        elif args.command == 'activate':
+            activate(args.name, args.force)
+        else:
+            drop(args.name)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,200 @@
+# export.py
+"""
+Bulk export of articles with their embeddings, for offline modelling, as
+NDJSON, an Arrow IPC stream or Parquet. Rows are read in id order through a
+server-side cursor, EXPORT_BATCH_SIZE at a time, and each batch is encoded
+and written out before the next is fetched, so memory stays the same
+however many articles are exported. GET /export streams the same output;
+the CLI writes it to a file (or stdout):
+
+    python export.py --format parquet --source bbc.com --published-after 2025-09-01 -o bbc.parquet
+
+Embeddings are written as binary little-endian float32: base64-encoded in
+NDJSON, a fixed-size list of float32 in Arrow and Parquet. Arrow and Parquet
+need the optional pyarrow package.
+"""
+import argparse
+import base64
+import datetime
+import os
+import sys
+import numpy as np
+import orjson
+from sqlalchemy import select
+from models import engine, Article, EMBEDDING_DIMENSIONS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW = True
+except ImportError:
+    ARROW = False
+
+# --- Export Settings ---
+# Rows per cursor fetch, and per Arrow record batch / Parquet row group.
+BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+# --------------------
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def export_query(source=None, published_after=None, published_before=None, min_id=None, max_id=None, include_body=True):
+    """The articles to export, in id order, so an interrupted export can resume from the last id."""
+    columns = [
+        Article.id, Article.url, Article.title, Article.source, Article.sentiment,
+        Article.publication_date, Article.scraped_at, Article.canonical_id,
+        *([Article.body_text] if include_body else []), Article.embedding,
+    ]
+    query = select(*columns).order_by(Article.id)
+    if source:
+        query = query.where(Article.source == source)
+    if published_after:
+        query = query.where(Article.publication_date >= published_after)
+    if published_before:
+        query = query.where(Article.publication_date < published_before)
+    if min_id is not None:
+        query = query.where(Article.id >= min_id)
+    if max_id is not None:
+        query = query.where(Article.id <= max_id)
+    return query
+
+# --- Encoders ---
+def embedding_bytes(vector):
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+def _ndjson_default(value):
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    raise TypeError
+
+class _Chunks:
+    """A write-only file whose bytes are taken out after every batch."""
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+class Encoder:
+    """
+    Turns batches of export rows into the bytes of one format. batch()
+    returns each batch's bytes as soon as it is encoded, and finish() the
+    end of the stream (the Arrow end marker or the Parquet footer).
+    """
+
+    def __init__(self, format, include_body=True):
+        if format != 'ndjson' and not ARROW:
+            raise ValueError(f"The {format} format needs the pyarrow package.")
+        self.format = format
+        self.writer = None
+        if format != 'ndjson':
+            self.sink = _Chunks()
+            self.schema = arrow_schema(include_body)
+            if format == 'arrow':
+                self.writer = pa.ipc.new_stream(self.sink, self.schema)
+            else:
+                self.writer = pq.ParquetWriter(self.sink, self.schema)
+
+    def batch(self, rows):
+        if self.format == 'ndjson':
+            return b''.join(
+                orjson.dumps(
+                    {**row._asdict(), 'embedding': None if row.embedding is None else embedding_bytes(row.embedding)},
+                    default=_ndjson_default,
+                ) + b'\n'
+                for row in rows
+            )
+        if rows:
+            self.writer.write_batch(arrow_batch(rows, self.schema)) #type:ignore
+        return self.sink.take()
+
+    def finish(self):
+        if self.writer is None:
+            return b''
+        self.writer.close()
+        return self.sink.take()
+
+def arrow_schema(include_body=True):
+    return pa.schema([
+        ('id', pa.int32()),
+        ('url', pa.string()),
+        ('title', pa.string()),
+        ('source', pa.string()),
+        ('sentiment', pa.string()),
+        ('publication_date', pa.timestamp('us')),
+        ('scraped_at', pa.timestamp('us')),
+        ('canonical_id', pa.int32()),
+        *([('body_text', pa.string())] if include_body else []),
+        ('embedding', pa.list_(pa.float32(), EMBEDDING_DIMENSIONS)),
+    ])
+
+def arrow_batch(rows, schema):
+    """A record batch of export rows; the embeddings are copied into one float32 buffer."""
+    missing = np.array([row.embedding is None for row in rows])
+    vectors = np.zeros((len(rows), EMBEDDING_DIMENSIONS), dtype=np.float32)
+    for index, row in enumerate(rows):
+        if row.embedding is not None:
+            vectors[index] = row.embedding
+    embedding = pa.FixedSizeListArray.from_arrays(
+        pa.array(vectors.ravel()), EMBEDDING_DIMENSIONS, mask=pa.array(missing) if missing.any() else None,
+    )
+    columns = [pa.array([getattr(row, name) for row in rows], type=schema.field(name).type) for name in schema.names[:-1]]
+    return pa.record_batch([*columns, embedding], schema=schema)
+
+# --- Export ---
+def export(output, format='ndjson', batch_size=None, **filters):
+    """Writes the export to a binary file object. Returns the number of articles."""
+    encoder = Encoder(format, filters.get('include_body', True))
+    exported = 0
+    # stream_results reads through a server-side (named) cursor, yield_per rows at a time.
+    with engine.connect().execution_options(stream_results=True, yield_per=batch_size or BATCH_SIZE) as connection:
+        for rows in connection.execute(export_query(**filters)).partitions():
+            output.write(encoder.batch(rows))
+            exported += len(rows)
+    output.write(encoder.finish())
+    return exported
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+    parser.add_argument('--output', '-o', default=None, help="File to write (default: stdout).")
+    parser.add_argument('--source', default=None)
+    parser.add_argument('--published-after', type=datetime.datetime.fromisoformat, default=None)
+    parser.add_argument('--published-before', type=datetime.datetime.fromisoformat, default=None)
+    parser.add_argument('--min-id', type=int, default=None)
+    parser.add_argument('--max-id', type=int, default=None)
+    parser.add_argument('--no-body', action='store_true', help="Leave out body_text.")
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    filters = dict(
+        source=args.source, published_after=args.published_after, published_before=args.published_before,
+        min_id=args.min_id, max_id=args.max_id, include_body=not args.no_body,
+    )
+    if args.output:
+        with open(args.output, 'wb') as f:
+            exported = export(f, args.format, args.batch_size, **filters)
+    else:
+        exported = export(sys.stdout.buffer, args.format, args.batch_size, **filters)
+    print(f"Exported {exported} article(s).", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
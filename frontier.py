@@ -0,0 +1,199 @@
+# frontier.py
+import os
+import time
+import random
+from urllib import robotparser
+import redis
+from celery_app import REDIS_URL
+from scrapers import SOURCES, find_domain
+from scrapers.fetcher import HEADERS, fetch, host_of, FetchError
+
+# --- Politeness Settings ---
+# Sustained requests per second and burst size allowed for each site.
+DEFAULT_RATE = float(os.getenv('CRAWL_RATE_PER_DOMAIN', '1.0'))
+DEFAULT_BURST = int(os.getenv('CRAWL_BURST_PER_DOMAIN', '2'))
+DOMAIN_RATE_LIMITS = {domain: (DEFAULT_RATE, DEFAULT_BURST) for domain in SOURCES}
+
+# How long a downloaded robots.txt is trusted before it is fetched again.
+ROBOTS_TTL = int(os.getenv('ROBOTS_TTL', str(6 * 3600)))
+# When robots.txt can't be fetched at all, retry sooner than that.
+ROBOTS_ERROR_TTL = 300
+USER_AGENT = HEADERS['User-Agent']
+
+QUEUE_KEY = 'frontier:queue:{}'
+TITLES_KEY = 'frontier:titles'
+BUCKET_KEY = 'frontier:bucket:{}'
+ROBOTS_KEY = 'frontier:robots:{}'
+CRAWLERS_KEY = 'frontier:crawlers'
+# A crawler that hasn't checked in for this long is assumed to have died.
+CRAWLER_TTL = 120
+# --------------------
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+# Token bucket that refills at `rate` tokens/second up to `capacity`. Runs
+# inside Redis so every worker shares the same bucket per domain, and uses the
+# Redis clock so workers with skewed clocks still agree. Returns how many
+# seconds the caller has to wait; 0 means a token was taken.
+TOKEN_BUCKET_SCRIPT = redis_client.register_script("""
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+""")
+
+# --- robots.txt ---
+_robots_cache = {}
+
+def get_robots(url):
+    """
+    Returns the parsed robots.txt for a URL's host. The raw file is shared
+    between workers through Redis and each process keeps a parsed copy.
+    """
+    host = host_of(url)
+    cached = _robots_cache.get(host)
+    if cached and cached[1] > time.time():
+        return cached[0]
+
+    parser = robotparser.RobotFileParser()
+    text = redis_client.get(ROBOTS_KEY.format(host))
+    ttl = ROBOTS_TTL
+    if text is None:
+        try:
+            text = fetch(f"https://{host}/robots.txt").content.decode('utf-8', errors='replace')
+        except FetchError as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            # Same rules as urllib.robotparser: 401/403 means everything is
+            # off-limits, any other failure means nothing is.
+            text = "User-agent: *\nDisallow: /" if status in (401, 403) else ""
+            if status is None or status >= 500:
+                ttl = ROBOTS_ERROR_TTL
+        redis_client.set(ROBOTS_KEY.format(host), text, ex=ttl)
+    parser.parse(text.splitlines())
+
+    _robots_cache[host] = (parser, time.time() + min(ttl, ROBOTS_ERROR_TTL))
+    return parser
+
+def domain_rate(url):
+    """Returns the (rate, burst) for a URL's site, slowed down to honor robots.txt Crawl-delay."""
+    rate, burst = DOMAIN_RATE_LIMITS.get(find_domain(url) or '', (DEFAULT_RATE, DEFAULT_BURST))
+    crawl_delay = get_robots(url).crawl_delay(USER_AGENT)
+    if crawl_delay:
+        rate, burst = min(rate, 1 / float(crawl_delay)), 1
+    return rate, burst
+
+# --- Rate Limiting ---
+def try_acquire(url):
+    """Takes a token for the URL's site if one is free. Returns 0, or the seconds to wait."""
+    domain = find_domain(url) or host_of(url)
+    rate, burst = domain_rate(url)
+    return float(TOKEN_BUCKET_SCRIPT(keys=[BUCKET_KEY.format(domain)], args=[rate, burst]))
+
+def throttle(url):
+    """
+    Blocks until the URL's site may be fetched again. Returns False, without
+    waiting, if robots.txt disallows the URL.
+    """
+    if not get_robots(url).can_fetch(USER_AGENT, url):
+        print(f"SKIPPED: robots.txt disallows {url}")
+        return False
+    while True:
+        wait = try_acquire(url)
+        if not wait:
+            return True
+        time.sleep(wait)
+
+# --- Crawl Frontier ---
+# One sorted set of URLs per site, scored by recency so the newest stories
+# are fetched first. Titles are kept in a hash next to them.
+
+def push(links):
+    """
+    Adds links ({'title', 'url'} dicts, optionally with a 'published' unix
+    timestamp) to the frontier. Links without a date are ranked by the order
+    they were discovered in. Returns how many were new.
+    """
+    now = time.time()
+    added = 0
+    pipe = redis_client.pipeline()
+    for position, link in enumerate(links):
+        domain = find_domain(link['url'])
+        if not domain:
+            print(f"ERROR: No scraper found for URL {link['url']}")
+            continue
+        score = link.get('published') or now - position / 1000
+        pipe.zadd(QUEUE_KEY.format(domain), {link['url']: score}, nx=True)
+        pipe.hset(TITLES_KEY, link['url'], link['title'])
+    for result in pipe.execute()[::2]:
+        added += result
+    return added
+
+def pending():
+    """Returns the number of URLs still waiting in the frontier."""
+    pipe = redis_client.pipeline()
+    for domain in SOURCES:
+        pipe.zcard(QUEUE_KEY.format(domain))
+    return sum(pipe.execute())
+
+def pop():
+    """
+    Returns (link, 0) for the most recent URL on any site whose rate limit
+    allows a fetch right now, or (None, seconds) with the shortest wait until
+    one does. Sites are tried in random order so no site starves the others.
+    """
+    shortest_wait = None
+    domains = list(SOURCES)
+    random.shuffle(domains)
+    for domain in domains:
+        queue = QUEUE_KEY.format(domain)
+        while True:
+            head = redis_client.zrange(queue, 0, 0, desc=True)
+            if not head:
+                break
+            url = head[0]
+            if get_robots(url).can_fetch(USER_AGENT, url):
+                break
+            print(f"SKIPPED: robots.txt disallows {url}")
+            redis_client.zrem(queue, url)
+            redis_client.hdel(TITLES_KEY, url)
+        if not head:
+            continue
+
+        wait = try_acquire(url)
+        if wait:
+            shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+            continue
+        # Another worker may have taken the same URL since we looked.
+        if redis_client.zrem(queue, url):
+            title = redis_client.hget(TITLES_KEY, url)
+            redis_client.hdel(TITLES_KEY, url)
+            return {'title': title, 'url': url}, 0
+    return None, shortest_wait or 0
+
+# --- Crawlers ---
+# Running crawl_frontier tasks check in on every loop, so the poller can tell
+# how many are draining the frontier without counting ones that died.
+
+def heartbeat(crawler_id):
+    redis_client.zadd(CRAWLERS_KEY, {crawler_id: time.time()})
+
+def retire(crawler_id):
+    redis_client.zrem(CRAWLERS_KEY, crawler_id)
+
+def crawlers():
+    """Returns how many crawlers are running."""
+    redis_client.zremrangebyscore(CRAWLERS_KEY, '-inf', time.time() - CRAWLER_TTL)
+    return redis_client.zcard(CRAWLERS_KEY)
@@ -0,0 +1,145 @@
+# inference.py
+import os
+import time
+import numpy as np
+import metrics
+from model_registry import get_sentiment_analyzer, get_embedding_model, get_embedding_tokenizer, EMBEDDING_MODEL
+
+# --- Inference Settings ---
+# Which runtime computes embeddings and sentiment: 'torch', 'onnx', or
+# 'onnx-int8' (ONNX Runtime with dynamically quantized int8 weights).
+BACKEND = os.getenv('INFERENCE_BACKEND', 'torch')
+# Articles are embedded as overlapping windows of CHUNK_TOKENS tokens.
+CHUNK_TOKENS = int(os.getenv('CHUNK_TOKENS', '256'))
+CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '32'))
+# How many chunks go through the embedding model in one forward pass.
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '64'))
+# --------------------
+
+# Each window starts CHUNK_TOKENS - CHUNK_OVERLAP tokens after the previous one.
+if not 0 <= CHUNK_OVERLAP < CHUNK_TOKENS:
+    raise ValueError(f"CHUNK_OVERLAP ({CHUNK_OVERLAP}) must be at least 0 and less than CHUNK_TOKENS ({CHUNK_TOKENS}).")
+
+# --- PyTorch Backend ---
+#Embedding the text
+def _torch_embeddings(texts, model_name=EMBEDDING_MODEL, pooling='mean'):
+    """Generates vector embeddings for a batch of texts in one padded forward pass."""
+    import torch
+    tokenizer, model = get_embedding_model(model_name)
+    #Converts human language to AI language. Shorter texts are padded up to the longest one.
+    inputs = tokenizer(texts, return_tensors='pt', truncation=True, padding=True, max_length=512)
+    #Only reading, not learning.
+    with torch.no_grad():
+        outputs = model(**inputs)
+    if pooling == 'cls':
+        return outputs.last_hidden_state[:, 0].numpy()
+    # Mean pooling over the real tokens only, so the padding added for a batch
+    # leaves every text with the same vector it gets on its own.
+    mask = inputs['attention_mask'].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+    summed = (outputs.last_hidden_state * mask).sum(dim=1)
+    embeddings = summed / mask.sum(dim=1).clamp(min=1)
+    return embeddings.numpy()
+
+def _torch_sentiments(texts):
+    """Runs the sentiment model over a batch of texts and returns their labels."""
+    # The model reads at most 512 tokens, so each text is truncated to its first 512 tokens.
+    results = get_sentiment_analyzer()(list(texts), batch_size=max(len(texts), 1), truncation=True)
+    return [result['label'] for result in results]
+
+# --- Backend Selection ---
+def get_backend(name=None):
+    """Returns the (embeddings, sentiments) functions of a backend, by default the configured one."""
+    name = name or BACKEND
+    if name == 'torch':
+        return _torch_embeddings, _torch_sentiments
+    if name in ('onnx', 'onnx-int8'):
+        import onnx_backend
+        quantized = name == 'onnx-int8'
+        return (lambda texts: onnx_backend.get_embeddings(texts, quantized),
+                lambda texts: onnx_backend.get_sentiments(texts, quantized))
+    raise ValueError(f"Unknown inference backend: {name}")
+
+def _timed(model, backend, function, texts, *args):
+    """Runs one model call and records its latency and batch size (see metrics.py)."""
+    started = time.perf_counter()
+    result = function(texts, *args)
+    metrics.INFERENCE_SECONDS.labels(model, backend).observe(time.perf_counter() - started)
+    metrics.INFERENCE_BATCH_SIZE.labels(model).observe(len(texts))
+    return result
+
+def get_embeddings(texts, backend=None):
+    """Generates 384-dim vector embeddings for a batch of texts."""
+    return _timed('embedding', backend or BACKEND, get_backend(backend)[0], texts)
+
+def get_embedding(text):
+    """Generates a vector embedding for a given text."""
+    return get_embeddings([text])[0]
+
+def version_embedder(model_name, pooling='mean'):
+    """
+    Returns the batch embedding function of an embedding version (see
+    embedding_versions.py). The default model goes through the configured
+    backend; other models run on PyTorch.
+    """
+    if model_name == EMBEDDING_MODEL and pooling == 'mean':
+        return get_embeddings
+    return lambda texts: _timed(model_name, 'torch', _torch_embeddings, texts, model_name, pooling)
+
+def get_sentiments(texts, backend=None):
+    """Returns the POSITIVE/NEGATIVE label of each text."""
+    return _timed('sentiment', backend or BACKEND, get_backend(backend)[1], texts)
+
+# --- Chunked Article Embeddings ---
+def chunk_text(text, size=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """
+    Splits text into windows of `size` tokens, each starting `size - overlap`
+    tokens after the previous one. Returns (start_char, end_char, tokens) spans.
+    """
+    if not 0 <= overlap < size:
+        raise ValueError(f"Chunk overlap ({overlap}) must be at least 0 and less than the chunk size ({size}).")
+    tokenizer = get_embedding_tokenizer()
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)['offset_mapping']
+    spans = []
+    for start in range(0, len(offsets), size - overlap):
+        window = offsets[start:start + size]
+        spans.append((window[0][0], window[-1][1], len(window)))
+        if start + size >= len(offsets):
+            break
+    return spans or [(0, len(text), 0)]
+
+def embed_articles(texts, batch_size=EMBED_BATCH_SIZE, embed=get_embeddings):
+    """
+    Embeds every chunk of every text, batch_size chunks per forward pass.
+    Returns one (article_embedding, chunks) pair per text, where chunks are
+    {'chunk_index', 'start_char', 'end_char', 'embedding'} dicts. embed is
+    the batch embedding function, get_embeddings unless another version's.
+    """
+    spans = [chunk_text(text) for text in texts]
+    flat = [(text[start:end], tokens) for text, text_spans in zip(texts, spans) for start, end, tokens in text_spans]
+    # Batch chunks of similar length together so little of each batch is padding.
+    order = sorted(range(len(flat)), key=lambda i: flat[i][1])
+    vectors = None
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        metrics.INFERENCE_TOKENS.labels('embedding').observe(sum(flat[i][1] + 2 for i in batch))
+        embedded = np.asarray(embed([flat[i][0] for i in batch]))
+        if vectors is None:
+            # 384 for MiniLM; other versions' models can have more dimensions.
+            vectors = np.zeros((len(flat), embedded.shape[1]), dtype=np.float32)
+        vectors[batch] = embedded
+
+    results, position = [], 0
+    for text_spans in spans:
+        chunk_vectors = vectors[position:position + len(text_spans)]
+        position += len(text_spans)
+        # Each chunk vector is a mean over its real tokens (+ [CLS] and [SEP]), so
+        # weighting by those counts gives the attention-mask-weighted mean over
+        # every token of the article.
+        weights = np.array([tokens + 2 for _, _, tokens in text_spans], dtype=np.float32)
+        article_embedding = (chunk_vectors * weights[:, None]).sum(axis=0) / weights.sum()
+        chunks = [
+            {'chunk_index': index, 'start_char': start, 'end_char': end, 'embedding': vector}
+            for index, ((start, end, _), vector) in enumerate(zip(text_spans, chunk_vectors))
+        ]
+        results.append((article_embedding, chunks))
+    return results
@@ -1,31 +1,91 @@
 # main.py
+import argparse
+import asyncio
 import time
 from tqdm import tqdm
-from scrapers import bbc_scraper, apnews_scraper, theguardian_scraper, techcrunch_scraper, npr_scraper
-from tasks import process_article # <-- Import your new task
+from scrapers import ALL_SOURCES, engine
+from scrapers.fetcher import AsyncFetcher
+from scrapers import cache as page_cache
+from tasks import process_article, process_articles_batch, staged_pipeline, crawl_frontier # <-- Import your new tasks
+import frontier
+import dedup
+import tracing
 
-def run_all_scrapers():
-    """Finds article links and dispatches them to Celery workers."""
+async def discover_links(sources):
+    """
+    Runs every source's homepage discovery at the same time over one shared
+    AsyncFetcher, so the total time is that of the slowest source.
+    """
+    async with AsyncFetcher() as fetcher:
+        results = await asyncio.gather(*(engine.find_links_async(source, fetcher) for source in sources))
+    return [link for links in results for link in links]
+
+def dispatch(all_links, batch_size=None, staged=False, frontier_workers=None):
+    """Sends links to the workers in one of run_all_scrapers' modes."""
+    # With OTEL_TRACING=1, every task's trace starts at this span (see tracing.py).
+    mode = 'frontier' if frontier_workers else 'staged' if staged else 'batch' if batch_size else 'article'
+    with tracing.span('dispatch', mode=mode, links=len(all_links)):
+        if frontier_workers:
+            # Queue the links in the frontier and start workers that pull from it
+            added = frontier.push(all_links)
+            print(f"Added {added} new links to the crawl frontier ({frontier.pending()} pending).")
+            for _ in range(frontier_workers):
+                crawl_frontier.delay() #type:ignore
+        elif staged:
+            # Dispatch a fetch -> parse -> infer -> persist chain for each link
+            for link_data in tqdm(all_links, desc="Dispatching Pipelines"):
+                staged_pipeline(link_data['title'], link_data['url']).delay()
+        elif batch_size:
+            # Dispatch one task per group of links
+            for start in tqdm(range(0, len(all_links), batch_size), desc="Dispatching Batches"):
+                process_articles_batch.delay(all_links[start:start + batch_size]) #type:ignore
+        else:
+            # Dispatch a task for each link
+            for link_data in tqdm(all_links, desc="Dispatching Tasks"):
+                # .delay() is how you send a task to the Celery queue
+                process_article.delay(link_data['title'], link_data['url']) #type:ignore
+
+def run_all_scrapers(batch_size=None, staged=False, frontier_workers=None):
+    """
+    Finds article links and dispatches them to Celery workers.
+
+    With a batch_size, links are grouped and sent as process_articles_batch
+    tasks so each worker runs the models once per group instead of once per article.
+    With staged=True, each link goes through the fetch -> parse -> infer -> persist
+    chain, one queue per stage.
+    With frontier_workers, links are queued in the shared crawl frontier and that
+    many crawl_frontier tasks drain it, each site at its own rate limit.
+    """
     print("Starting scraper process...")
-    
-    scrapers_to_run = [bbc_scraper, apnews_scraper, theguardian_scraper, techcrunch_scraper, npr_scraper]
-    
-    all_links = []
-    # Loop through scrapers to find links, but don't scrape pages
-    for scraper in tqdm(scrapers_to_run, desc="Finding Links"):
-        # We need a new, lightweight function in each scraper
-        links = scraper.find_links() 
-        all_links.extend(links)
-        time.sleep(1)
-            
-    print(f"\nFound {len(all_links)} total links. Dispatching tasks to workers...")
-    
-    # Dispatch a task for each link
-    for link_data in tqdm(all_links, desc="Dispatching Tasks"):
-        # .delay() is how you send a task to the Celery queue
-        process_article.delay(link_data['title'], link_data['url']) #type:ignore
+
+    # Find links on all homepages concurrently, but don't scrape pages
+    started = time.perf_counter()
+    all_links = asyncio.run(discover_links(ALL_SOURCES))
+
+    print(f"\nFound {len(all_links)} total links in {time.perf_counter() - started:.1f}s.")
+
+    # Drop links that are already stored or already dispatched before any work is queued
+    found = len(all_links)
+    all_links = dedup.filter_new(all_links)
+    print(f"{found - len(all_links)} links were duplicates (overall dedup hit rate {dedup.stats()['hit_rate']:.1%}). "
+          f"Dispatching {len(all_links)} new links to workers...")
+
+    dispatch(all_links, batch_size, staged, frontier_workers)
 
     print("\nAll tasks dispatched. Workers are now processing in the background.")
 
+    # Cache stats include the article fetches of earlier runs' workers.
+    for site, values in sorted(page_cache.stats().items()):
+        print(f"HTML cache {site}: {values.get('hits', 0)} hits, {values.get('misses', 0)} misses, "
+              f"{values.get('bytes_saved', 0) / 1024:.0f} KiB saved")
+
 if __name__ == "__main__":
-    run_all_scrapers()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find article links and dispatch them to the workers.")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Group links into batches of this size and analyze each batch in one model pass.")
+    parser.add_argument('--staged', action='store_true',
+                        help="Run each link through the separate fetch, parse, infer and persist queues.")
+    parser.add_argument('--frontier', type=int, default=None, metavar='WORKERS',
+                        help="Queue links in the shared crawl frontier and start this many rate-limited crawlers.")
+    args = parser.parse_args()
+    run_all_scrapers(batch_size=args.batch_size, staged=args.staged, frontier_workers=args.frontier)
@@ -0,0 +1,164 @@
+# metrics.py
+"""
+Prometheus metrics for each stage of the pipeline: fetch, parse, inference,
+database writes, and the time tasks wait in the queue, plus query embedding
+and connection pool timings. The API serves them at GET /metrics, and every
+Celery worker runs an exporter on METRICS_PORT.
+
+Prefork workers (and an API with several uvicorn workers) run several
+processes, so they need PROMETHEUS_MULTIPROC_DIR set to a directory each
+process writes its samples to; the exporter adds them up.
+"""
+import glob
+import os
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, start_http_server,
+)
+
+# --- Metrics Settings ---
+WORKER_PORT = int(os.getenv('METRICS_PORT', '9100'))
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+# --------------------
+
+if MULTIPROC_DIR:
+    # Metrics without labels open their sample file as soon as they are defined.
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# Seconds; model calls on a CPU batch can take far longer than a page download.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUEUE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 1e7)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536)
+# Seconds; waits for a batch slot or a pooled connection are usually well under a millisecond.
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30)
+
+# --- Pipeline Metrics ---
+FETCH_SECONDS = Histogram(
+    'titan_fetch_seconds', 'Time to download a page, by site and outcome (ok, not_modified, error).',
+    ['site', 'outcome'], buckets=LATENCY_BUCKETS,
+)
+FETCH_BYTES = Histogram(
+    'titan_fetch_bytes', 'Size of downloaded page bodies, by site.',
+    ['site'], buckets=BYTES_BUCKETS,
+)
+PARSE_SECONDS = Histogram(
+    'titan_parse_seconds', 'Time to parse a page, by source and kind (article, links, feed).',
+    ['source', 'kind'], buckets=LATENCY_BUCKETS,
+)
+INFERENCE_SECONDS = Histogram(
+    'titan_inference_seconds', 'Time of one model call, by model (sentiment, embedding) and backend.',
+    ['model', 'backend'], buckets=LATENCY_BUCKETS,
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    'titan_inference_batch_texts', 'Texts per model call, by model.',
+    ['model'], buckets=BATCH_BUCKETS,
+)
+INFERENCE_TOKENS = Histogram(
+    'titan_inference_tokens', 'Tokens per embedding forward pass, [CLS] and [SEP] included.',
+    ['model'], buckets=TOKEN_BUCKETS,
+)
+DB_WRITE_SECONDS = Histogram(
+    'titan_db_write_seconds', 'Time to write a batch of articles in one transaction, commit included, by method.',
+    ['method'], buckets=LATENCY_BUCKETS,
+)
+ARTICLES_SAVED = Counter('titan_articles_saved', 'New articles written to the database.')
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    'titan_task_queue_wait_seconds', 'Time from a task being sent (or its ETA) until a worker starts it, by task.',
+    ['task'], buckets=QUEUE_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    'titan_task_seconds', 'Time a task ran, by task and final state.',
+    ['task', 'state'], buckets=LATENCY_BUCKETS,
+)
+SEARCH_SECONDS = Histogram(
+    'titan_search_seconds', 'Time to answer a /search request, query embedding included, by mode.',
+    ['mode'], buckets=LATENCY_BUCKETS,
+)
+# --------------------
+
+# --- Query Embedding and Pool Metrics ---
+# The same numbers as /stats/embeddings and /stats/db, which only show the
+# process that answers the request.
+QUERY_EMBEDDING_LOOKUPS = Counter(
+    'titan_query_embedding_lookups', 'Query embedding lookups, by embedding version and the tier that answered (memory, redis, miss).',
+    ['version', 'tier'],
+)
+QUERY_EMBEDDING_BATCH_SIZE = Histogram(
+    'titan_query_embedding_batch_texts', 'Distinct queries per micro-batched forward pass, by embedding version.',
+    ['version'], buckets=BATCH_BUCKETS,
+)
+QUERY_EMBEDDING_QUEUE_WAIT_SECONDS = Histogram(
+    'titan_query_embedding_queue_wait_seconds', 'Time a query waits in the micro-batcher before its batch runs, by embedding version.',
+    ['version'], buckets=WAIT_BUCKETS,
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    'titan_db_pool_wait_seconds', 'Time to check out a database connection, connecting included, by pool (sync, async).',
+    ['pool'], buckets=WAIT_BUCKETS,
+)
+DB_POOL_CONNECTS = Counter('titan_db_pool_connects', 'New database connections opened, by pool.', ['pool'])
+# --------------------
+
+class LocalHistogram:
+    """
+    Cumulative bucket counts of this process only, in the same shape
+    Prometheus uses, for the /stats JSON endpoints.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+def _registry():
+    """The default registry, or one that adds up every process's samples in multiprocess mode."""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def latest():
+    """Returns (body, content type) of the current samples in the Prometheus text format."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+def start_worker_exporter():
+    """
+    Serves the metrics on WORKER_PORT. Called once in the worker's main
+    process, before the pool starts, so the samples of an earlier run are
+    cleared first.
+    """
+    if MULTIPROC_DIR:
+        for path in glob.glob(os.path.join(MULTIPROC_DIR, '*.db')):
+            os.remove(path)
+    try:
+        start_http_server(WORKER_PORT, registry=_registry())
+    except OSError as e:
+        print(f"Metrics exporter could not listen on port {WORKER_PORT}: {e}")
+        return
+    print(f"Metrics exporter listening on port {WORKER_PORT}")
+
+def process_exited(pid):
+    """Drops a finished pool process's live samples (multiprocess mode only)."""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+if __name__ == "__main__":
+    print(latest()[0].decode())
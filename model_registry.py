@@ -0,0 +1,100 @@
+# model_registry.py
+import os
+import threading
+
+# --- Model Settings ---
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+# --------------------
+
+def _load_sentiment():
+    from transformers.pipelines import pipeline
+    return pipeline("sentiment-analysis", model=SENTIMENT_MODEL) #type:ignore
+
+def _load_embedding(model_name=EMBEDDING_MODEL):
+    from transformers import AutoTokenizer, AutoModel
+    tokenizer = AutoTokenizer.from_pretrained(model_name) #Converts human language to language that the AI can understand
+    model = AutoModel.from_pretrained(model_name) #The AI language converted into vector embedding.
+    return tokenizer, model
+
+def _load_embedding_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
+
+class ModelRegistry:
+    """
+    Loads each model the first time it is asked for and keeps it for the life
+    of the process. Nothing heavy (not even torch) is imported until then, so
+    processes only pay for the models they actually use.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._register_lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def get_or_register(self, name, loader):
+        """Like get, registering the loader first if nothing is registered under the name yet."""
+        if name not in self._loaders:
+            with self._register_lock:
+                if name not in self._loaders:
+                    self.register(name, loader)
+        return self.get(name)
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is None:
+            # Concurrent first requests wait for one load instead of each loading a copy.
+            with self._locks[name]:
+                model = self._models.get(name)
+                if model is None:
+                    print(f"Loading {name} model...")
+                    model = self._models[name] = self._loaders[name]()
+                    print(f"{name.capitalize()} model loaded successfully.")
+        return model
+
+    def loaded(self):
+        return list(self._models)
+
+registry = ModelRegistry()
+registry.register('sentiment', _load_sentiment)
+registry.register('embedding', _load_embedding)
+# Just the tokenizer, for chunking text without loading the model (or torch).
+registry.register('embedding-tokenizer', _load_embedding_tokenizer)
+
+def get_sentiment_analyzer():
+    """Returns the sentiment analysis pipeline, loading it on first use."""
+    return registry.get('sentiment')
+
+def get_embedding_model(model_name=EMBEDDING_MODEL):
+    """
+    Returns the (tokenizer, model) pair for embeddings, loading them on first
+    use. Other models than EMBEDDING_MODEL are only asked for by embedding
+    versions being built or served (see embedding_versions.py).
+    """
+    if model_name == EMBEDDING_MODEL:
+        return registry.get('embedding')
+    return registry.get_or_register(f'embedding:{model_name}', lambda: _load_embedding(model_name))
+
+def get_embedding_tokenizer():
+    """Returns the embedding model's tokenizer, loading it on first use."""
+    return registry.get('embedding-tokenizer')
+
+def warm_up(names):
+    """
+    Loads the named models and runs one tiny inference through each, so the
+    first real request doesn't pay for loading or lazy initialisation.
+    """
+    from inference import get_embeddings, get_sentiments
+    warmers = {'sentiment': get_sentiments, 'embedding': get_embeddings}
+    for name in names:
+        warmers[name](["Warm-up text."])
+
+def names_from_env(variable, default=''):
+    """Parses a comma-separated list of model names, e.g. WARMUP_MODELS=sentiment,embedding."""
+    return [name.strip() for name in os.getenv(variable, default).split(',') if name.strip()]
@@ -1,11 +1,14 @@
 # models.py
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, cast, func, Column, Integer, String, Text, DateTime, Boolean, Index, ForeignKey, UniqueConstraint, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.ext.declarative import declarative_base
 import datetime
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+import db_pool
 
 # --- ADD THIS LINE ---
 load_dotenv() # Loads variables from the .env file
@@ -13,6 +16,21 @@ load_dotenv() # Loads variables from the .env file
 # Define the base class for declarative models
 Base = declarative_base()
 
+EMBEDDING_DIMENSIONS = 384
+
+# --- Compact Embeddings ---
+# articles.embedding can have HNSW indexes on two smaller forms of itself:
+# half precision (half the size) and binary-quantized, one bit per dimension
+# (1/32 of the size), built by vector_indexes.py. Searches on them compare
+# these same expressions, then re-rank the candidates by the full vectors
+# (see api.vector_candidates).
+def as_halfvec(vector):
+    return cast(vector, HALFVEC(EMBEDDING_DIMENSIONS))
+
+def binary_quantized(vector):
+    return cast(func.binary_quantize(vector), BIT(EMBEDDING_DIMENSIONS))
+# --------------------
+
 class Article(Base):
     # ... your Article class is perfect, no changes needed ...
     __tablename__ = 'articles'
@@ -21,20 +39,172 @@ class Article(Base):
     body_text = Column(Text)
     publication_date = Column(DateTime)
     url = Column(String, unique=True, nullable=False)
+    source = Column(String) # The scrapers.SOURCES domain, e.g. 'bbc.com'
+    # Set when this article is a near-duplicate (e.g. a syndicated copy) of another one (see neardup.py).
+    canonical_id = Column(Integer, ForeignKey('articles.id', ondelete='SET NULL'), index=True)
     scraped_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     sentiment = Column(String) # Will store 'positive', 'negative', or 'neutral'
-    embedding = Column(Vector(384)) # 384 is the dimension of the embedding model we'll use
+    embedding = Column(Vector(EMBEDDING_DIMENSIONS)) # 384 is the dimension of the embedding model we'll use
+    # (the inline embedding version; other versions' vectors are in article_embeddings)
     # ---------------------------------
+
+    # Full-text search document for hybrid /search, kept up to date by Postgres.
+    # Title matches rank above body matches.
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(body_text, '')), 'B')",
+        persisted=True,
+    ))
+
+    chunks = relationship('ArticleChunk', back_populates='article', cascade='all, delete-orphan', passive_deletes=True)
+
+    __table_args__ = (
+        # Approximate nearest-neighbour index for /search (cosine distance).
+        Index(
+            'ix_articles_embedding_hnsw', 'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+        ),
+        # The compact indexes for SEARCH_QUANTIZATION=halfvec / binary are
+        # optional, and built by vector_indexes.py.
+        Index('ix_articles_search_vector', 'search_vector', postgresql_using='gin'),
+        # The /articles feed pages newest-first on (publication_date, id). These
+        # serve each filter as an index-only range scan, so a page costs the
+        # same at any depth.
+        Index(
+            'ix_articles_feed', publication_date.desc(), id.desc(),
+            postgresql_include=['title', 'url', 'sentiment', 'source'],
+            postgresql_where=publication_date.isnot(None),
+        ),
+        Index(
+            'ix_articles_source_feed', source, publication_date.desc(), id.desc(),
+            postgresql_include=['title', 'url', 'sentiment'],
+            postgresql_where=publication_date.isnot(None),
+        ),
+        Index(
+            'ix_articles_positive_feed', publication_date.desc(), id.desc(),
+            postgresql_include=['title', 'url', 'source'],
+            postgresql_where=(publication_date.isnot(None)) & (sentiment == 'POSITIVE'),
+        ),
+        Index(
+            'ix_articles_negative_feed', publication_date.desc(), id.desc(),
+            postgresql_include=['title', 'url', 'source'],
+            postgresql_where=(publication_date.isnot(None)) & (sentiment == 'NEGATIVE'),
+        ),
+        # The feed with near-duplicates collapsed into their canonical article.
+        Index(
+            'ix_articles_canonical_feed', publication_date.desc(), id.desc(),
+            postgresql_include=['title', 'url', 'sentiment', 'source'],
+            postgresql_where=(publication_date.isnot(None)) & (canonical_id.is_(None)),
+        ),
+    )
    
     def __repr__(self):
         return f"<Article(title='{self.title}')>"
 
+class ArticleChunk(Base):
+    """One overlapping token window of an article's body, with its own embedding."""
+    __tablename__ = 'article_chunks'
+    id = Column(Integer, primary_key=True)
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    # Character span of the chunk in articles.body_text.
+    start_char = Column(Integer, nullable=False)
+    end_char = Column(Integer, nullable=False)
+    embedding = Column(Vector(EMBEDDING_DIMENSIONS), nullable=False)
+
+    article = relationship('Article', back_populates='chunks')
+
+    __table_args__ = (
+        UniqueConstraint('article_id', 'chunk_index'),
+        # Approximate nearest-neighbour index for chunk-ranked /search.
+        Index(
+            'ix_article_chunks_embedding_hnsw', 'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+        ),
+    )
+
+
+class EmbeddingVersion(Base):
+    """
+    An embedding model and pooling that article vectors are computed with.
+    /search queries the active version; the others are being built or kept
+    for switching back (see embedding_versions.py).
+    """
+    __tablename__ = 'embedding_versions'
+    name = Column(String, primary_key=True)
+    model = Column(String, nullable=False)
+    pooling = Column(String, nullable=False, default='mean') # 'mean' or 'cls'
+    dimensions = Column(Integer, nullable=False)
+    # The inline version is stored in articles.embedding and article_chunks,
+    # every other version in article_embeddings.
+    inline = Column(Boolean, nullable=False, default=False)
+    active = Column(Boolean, nullable=False, default=False)
+    # Re-embedding checkpoint: every article up to this id has a vector of this version.
+    backfilled_to_id = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    activated_at = Column(DateTime)
+
+    __table_args__ = (
+        # At most one version is active.
+        Index('ix_embedding_versions_active', 'active', unique=True, postgresql_where=active),
+    )
+
+    def vector(self):
+        """
+        article_embeddings.embedding as this version's own vector type. Its
+        HNSW index is on this expression, so searches have to compare it too.
+        """
+        return cast(ArticleEmbedding.embedding, Vector(self.dimensions))
+
+    def __repr__(self):
+        return f"<EmbeddingVersion(name='{self.name}')>"
+
+class ArticleEmbedding(Base):
+    """An article's vector under a non-inline embedding version."""
+    __tablename__ = 'article_embeddings'
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    version = Column(String, ForeignKey('embedding_versions.name', ondelete='CASCADE'), primary_key=True)
+    # No fixed dimension, since versions differ; each version gets its own
+    # partial HNSW index on embedding::vector(dimensions) (see embedding_versions.create_index).
+    embedding = Column(Vector(), nullable=False)
+
+class SentimentRollup(Base):
+    """
+    Article and sentiment counts per source and hour, added to as articles
+    are saved (see analytics.py), so /analytics never scans articles.
+    """
+    __tablename__ = 'sentiment_rollups'
+    source = Column(String, primary_key=True) # '' when the article's source isn't known
+    # The hour (UTC) of the articles' publication_date, or scraped_at when they have none.
+    hour = Column(DateTime, primary_key=True)
+    articles = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Date ranges over every source.
+        Index('ix_sentiment_rollups_hour', 'hour'),
+    )
 
 
 DATABASE_URL = os.getenv("DATABASE_URL") # Get the URL from the environment
 if not DATABASE_URL:
     raise ValueError("No DATABASE_URL set for Flask application")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+db_pool.patch_for_eventlet()
+engine = create_engine(DATABASE_URL, **db_pool.engine_options('sync'))
+db_pool.instrument(engine, 'sync')
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def create_async_db_engine():
+    """The asyncpg engine the API uses, with the same pool settings (DB_POOL_SIZE, ...)."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    url = make_url(DATABASE_URL).set(drivername='postgresql+asyncpg')
+    async_engine = create_async_engine(url, **db_pool.engine_options('async', is_async=True))
+    db_pool.instrument(async_engine, 'async')
+    return async_engine
@@ -0,0 +1,140 @@
+# neardup.py
+"""
+Near-duplicate detection for syndicated stories: the same wire story
+published under different URLs, often with a changed headline or an extra
+paragraph. dedup.py only catches the exact same URL.
+
+Each body is reduced to a MinHash signature of its word shingles. The
+signatures of canonical articles are kept in an LSH index in Redis (one set
+per band bucket, shared by every worker), so a new article is compared only
+with the few stored articles that share a band with it. When the estimated
+Jaccard similarity with one of them reaches NEARDUP_THRESHOLD, the new
+article is stored as a duplicate of it (canonical_id) and reuses its
+sentiment and embedding instead of running the models again.
+"""
+import hashlib
+import os
+import re
+import zlib
+import numpy as np
+import redis
+from celery_app import REDIS_URL
+
+# --- Near-Duplicate Settings ---
+ENABLED = os.getenv('NEARDUP_ENABLED', '1') == '1'
+# Estimated Jaccard similarity of two bodies' shingles at which they count as the same story.
+THRESHOLD = float(os.getenv('NEARDUP_THRESHOLD', '0.8'))
+SHINGLE_WORDS = int(os.getenv('NEARDUP_SHINGLE_WORDS', '5'))
+# Shorter bodies (stubs, paywall notices) are too alike to compare.
+MIN_WORDS = int(os.getenv('NEARDUP_MIN_WORDS', '50'))
+# 128 hash functions in 16 bands of 8 rows: pairs above ~0.7 similarity almost
+# always share a band, pairs below ~0.5 rarely do. Changing these means
+# rebuilding the index.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+BUCKET_KEY = 'neardup:bucket:{}:{}'
+SIGNATURES_KEY = 'neardup:signatures'
+BACKFILL_KEY = 'neardup:backfilled'
+# --------------------
+
+# Signatures are stored as raw bytes.
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+# Every process must use the same hash functions, so they come from a fixed seed.
+MERSENNE = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+_permutations = np.random.RandomState(1)
+A = _permutations.randint(1, MERSENNE, size=NUM_PERM, dtype=np.uint64)
+B = _permutations.randint(0, MERSENNE, size=NUM_PERM, dtype=np.uint64)
+
+# --- MinHash ---
+def shingles(text):
+    """Returns the 32-bit hashes of the text's overlapping SHINGLE_WORDS-word sequences."""
+    words = re.findall(r'\w+', (text or '').lower())
+    if len(words) < max(MIN_WORDS, SHINGLE_WORDS):
+        return np.empty(0, dtype=np.uint64)
+    unique = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode()) for shingle in unique), dtype=np.uint64, count=len(unique))
+
+def signature(text):
+    """Returns the MinHash signature (NUM_PERM uint32 values) of a body, or None if it is under MIN_WORDS words."""
+    hashes = shingles(text)
+    if not len(hashes):
+        return None
+    # One universal hash (a * x + b mod p) per permutation, for every shingle at once.
+    permuted = ((np.outer(hashes, A) + B) % MERSENNE) & MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.mean(np.asarray(first) == np.asarray(second)))
+
+def _bucket_keys(sig):
+    sig = np.asarray(sig, dtype=np.uint32)
+    return [
+        BUCKET_KEY.format(band, hashlib.blake2b(sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).hexdigest())
+        for band in range(BANDS)
+    ]
+
+# --- LSH Index ---
+def find(sig, exclude=None):
+    """
+    Returns (article_id, similarity) of the most similar indexed article at
+    or above THRESHOLD, other than `exclude` (an article's own id), or None.
+    """
+    if sig is None:
+        return None
+    pipe = redis_client.pipeline()
+    for key in _bucket_keys(sig):
+        pipe.smembers(key)
+    candidates = sorted({int(member) for members in pipe.execute() for member in members})
+    if not candidates:
+        return None
+
+    best = None
+    for article_id, raw in zip(candidates, redis_client.hmget(SIGNATURES_KEY, candidates)):
+        if raw is None or article_id == exclude:
+            continue
+        score = similarity(sig, np.frombuffer(raw, dtype=np.uint32)) #type:ignore
+        if score >= THRESHOLD and (best is None or score > best[1]):
+            best = (article_id, score)
+    return best
+
+def add(signatures):
+    """Indexes canonical articles, given {article_id: signature}."""
+    if not signatures:
+        return
+    pipe = redis_client.pipeline()
+    for article_id, sig in signatures.items():
+        sig = np.asarray(sig, dtype=np.uint32)
+        pipe.hset(SIGNATURES_KEY, article_id, sig.tobytes())
+        for key in _bucket_keys(sig):
+            pipe.sadd(key, article_id)
+    pipe.execute()
+
+def check(article):
+    """
+    Computes an article's signature and looks it up. Sets 'minhash' (a
+    JSON-safe list) and, for a near-duplicate, 'canonical_id'. Returns the
+    canonical article's id, or None.
+    """
+    if not ENABLED:
+        return None
+    sig = signature(article.get('body_text'))
+    if sig is None:
+        return None
+    article['minhash'] = sig.tolist()
+    match = find(sig)
+    if not match:
+        return None
+    article['canonical_id'] = match[0]
+    print(f"  -> Near-duplicate of article {match[0]} (similarity {match[1]:.2f})")
+    return match[0]
+
+def stats():
+    return {'indexed': redis_client.hlen(SIGNATURES_KEY), 'backfilled_to_id': int(redis_client.get(BACKFILL_KEY) or 0)}
+
+if __name__ == "__main__":
+    print(stats())
@@ -0,0 +1,133 @@
+# onnx_backend.py
+"""
+ONNX Runtime inference backend for the sentiment and embedding models, with
+optional dynamic int8 quantization. Select it with INFERENCE_BACKEND=onnx or
+INFERENCE_BACKEND=onnx-int8 (see inference.py).
+
+The models are exported from the PyTorch ones the first time they're needed,
+or ahead of time (e.g. while building the image) with:
+
+    python onnx_backend.py export
+"""
+import os
+import numpy as np
+from model_registry import registry, get_sentiment_analyzer, get_embedding_model, SENTIMENT_MODEL, EMBEDDING_MODEL
+
+# --- ONNX Settings ---
+MODEL_DIR = os.getenv('ONNX_MODEL_DIR', 'onnx_models')
+# Threads per inference call; 0 lets ONNX Runtime pick one per core.
+INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', '0'))
+OPSET = 17
+# --------------------
+
+def model_path(name, quantized=False):
+    return os.path.join(MODEL_DIR, f"{name}.int8.onnx" if quantized else f"{name}.onnx")
+
+# --- Export ---
+def _export(module, sample, input_names, output_name, path):
+    import torch
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes[output_name] = {0: 'batch'} if output_name == 'logits' else {0: 'batch', 1: 'sequence'}
+    torch.onnx.export(
+        module,
+        tuple(sample[name] for name in input_names),
+        path,
+        input_names=input_names,
+        output_names=[output_name],
+        dynamic_axes=dynamic_axes,
+        opset_version=OPSET,
+        dynamo=False,
+    )
+
+def export(quantize=True):
+    """Exports both models to ONNX and, with quantize, writes int8 copies next to them."""
+    import torch
+
+    class EmbeddingGraph(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    class SentimentGraph(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tokenizer, model = get_embedding_model()
+    sample = tokenizer(["An example sentence for export."], return_tensors='pt')
+    _export(EmbeddingGraph(model), sample, ['input_ids', 'attention_mask', 'token_type_ids'],
+            'last_hidden_state', model_path('embedding'))
+
+    pipeline = get_sentiment_analyzer()
+    sample = pipeline.tokenizer(["An example sentence for export."], return_tensors='pt')
+    _export(SentimentGraph(pipeline.model), sample, ['input_ids', 'attention_mask'],
+            'logits', model_path('sentiment'))
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        for name in ('embedding', 'sentiment'):
+            quantize_dynamic(model_path(name), model_path(name, quantized=True), weight_type=QuantType.QInt8)
+    print(f"Exported ONNX models to {MODEL_DIR}")
+
+# --- Loading ---
+def _session(name, quantized):
+    import onnxruntime
+    path = model_path(name, quantized)
+    if not os.path.exists(path):
+        print(f"{path} not found, exporting the models first...")
+        export(quantize=quantized)
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = INTRA_OP_THREADS
+    return onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+def _load_embedding(quantized):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMBEDDING_MODEL), _session('embedding', quantized)
+
+def _load_sentiment(quantized):
+    from transformers import AutoTokenizer, AutoConfig
+    labels = AutoConfig.from_pretrained(SENTIMENT_MODEL).id2label
+    return AutoTokenizer.from_pretrained(SENTIMENT_MODEL), _session('sentiment', quantized), labels
+
+registry.register('onnx-embedding', lambda: _load_embedding(False))
+registry.register('onnx-embedding-int8', lambda: _load_embedding(True))
+registry.register('onnx-sentiment', lambda: _load_sentiment(False))
+registry.register('onnx-sentiment-int8', lambda: _load_sentiment(True))
+
+def _feed(session, inputs):
+    # Only pass the inputs this graph was exported with, as int64 like PyTorch uses.
+    return {i.name: inputs[i.name].astype(np.int64) for i in session.get_inputs()}
+
+# --- Inference ---
+# Same output contract as the PyTorch backend in inference.py.
+def get_embeddings(texts, quantized=False):
+    """384-dim mean-pooled embeddings, computed with ONNX Runtime."""
+    tokenizer, session = registry.get('onnx-embedding-int8' if quantized else 'onnx-embedding')
+    inputs = tokenizer(texts, return_tensors='np', truncation=True, padding=True, max_length=512)
+    hidden = session.run(None, _feed(session, inputs))[0]
+    mask = inputs['attention_mask'][..., None].astype(hidden.dtype)
+    return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1, None)
+
+def get_sentiments(texts, quantized=False):
+    """POSITIVE/NEGATIVE labels, computed with ONNX Runtime."""
+    tokenizer, session, labels = registry.get('onnx-sentiment-int8' if quantized else 'onnx-sentiment')
+    # The model reads at most 512 tokens, so each text is truncated to its first 512 tokens.
+    inputs = tokenizer(list(texts), return_tensors='np', truncation=True, padding=True, max_length=512)
+    logits = session.run(None, _feed(session, inputs))[0]
+    return [labels[int(index)] for index in logits.argmax(axis=1)]
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ['export']:
+        export(quantize=True)
+    else:
+        print(__doc__)
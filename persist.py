@@ -0,0 +1,261 @@
+# persist.py
+"""
+Bulk writes of analyzed articles (and their chunks) to Postgres.
+
+Small batches go in as one multi-row INSERT ... ON CONFLICT (url) DO NOTHING,
+large ones are streamed with a binary COPY into a temporary table and moved
+into articles with the same upsert. Either way a batch costs one transaction
+and one commit, however many articles it holds. The new articles are added
+to the sentiment rollups (see analytics.py) in the same transaction.
+
+The staged pipeline's persist stage doesn't write at all: it buffers articles
+in Redis, and the buffer is flushed once it holds PERSIST_FLUSH_SIZE articles
+or every PERSIST_FLUSH_INTERVAL seconds (see the beat schedule in celery_app.py).
+"""
+import datetime
+import io
+import json
+import os
+import struct
+import time
+import redis
+from pgvector import Vector
+from sqlalchemy import insert, text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from celery_app import REDIS_URL
+from models import engine, Article, ArticleChunk
+from scrapers import find_domain
+import analytics
+import dedup
+import neardup
+import metrics
+import tracing
+
+# --- Persist Settings ---
+FLUSH_SIZE = int(os.getenv('PERSIST_FLUSH_SIZE', '200'))
+# Batches at least this big are written with COPY instead of INSERT.
+COPY_THRESHOLD = int(os.getenv('PERSIST_COPY_THRESHOLD', '500'))
+
+BUFFER_KEY = 'persist:buffer'
+# Buffered articles that can't be written even on their own, with the error.
+DEAD_LETTER_KEY = 'persist:dead_letter'
+# --------------------
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+# Errors that mean the database or Redis can't be reached, rather than that an article is bad.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, redis.exceptions.ConnectionError)
+
+ARTICLE_COLUMNS = ['title', 'body_text', 'publication_date', 'url', 'source', 'canonical_id', 'scraped_at', 'sentiment', 'embedding']
+CHUNK_COLUMNS = ['article_id', 'chunk_index', 'start_char', 'end_char', 'embedding']
+
+def _article_row(article, scraped_at):
+    row = {column: article.get(column) for column in ARTICLE_COLUMNS}
+    row['scraped_at'] = row['scraped_at'] or scraped_at
+    row['source'] = row['source'] or find_domain(row['url'])
+    return row
+
+def _chunk_rows(articles, ids):
+    return [
+        {**chunk, 'article_id': ids[article['url']]}
+        for article in articles if article['url'] in ids
+        for chunk in article.get('chunks', [])
+    ]
+
+# --- Binary COPY ---
+# Postgres' binary COPY format: a fixed header, then per row a field count and
+# each field as a length-prefixed value in network byte order.
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+COPY_TRAILER = struct.pack('!h', -1)
+PG_EPOCH = datetime.datetime(2000, 1, 1)
+
+def _encode(value, kind):
+    if value is None:
+        return struct.pack('!i', -1)
+    if kind == 'text':
+        data = value.encode('utf-8')
+    elif kind == 'int':
+        data = struct.pack('!i', value)
+    elif kind == 'timestamp':
+        # Aware values are stored as UTC, as INSERT does when it casts them from timestamptz.
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        delta = value - PG_EPOCH
+        data = struct.pack('!q', (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+    else:
+        data = Vector(value).to_binary()
+    return struct.pack('!i', len(data)) + data
+
+def copy_payload(rows, columns, kinds):
+    """Encodes row dicts as a binary COPY stream for the given columns."""
+    parts = [COPY_HEADER]
+    field_count = struct.pack('!h', len(columns))
+    for row in rows:
+        parts.append(field_count)
+        parts.extend(_encode(row[column], kinds[column]) for column in columns)
+    parts.append(COPY_TRAILER)
+    return b''.join(parts)
+
+ARTICLE_KINDS = {'title': 'text', 'body_text': 'text', 'publication_date': 'timestamp', 'url': 'text',
+                 'source': 'text', 'canonical_id': 'int', 'scraped_at': 'timestamp', 'sentiment': 'text', 'embedding': 'vector'}
+CHUNK_KINDS = {'article_id': 'int', 'chunk_index': 'int', 'start_char': 'int', 'end_char': 'int', 'embedding': 'vector'}
+
+def _copy(connection, table, rows, columns, kinds):
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)",
+                           io.BytesIO(copy_payload(rows, columns, kinds)))
+    finally:
+        cursor.close()
+
+# --- Writers ---
+def upsert_articles(connection, rows):
+    """One multi-row INSERT ... ON CONFLICT (url) DO NOTHING. Returns {url: id} of new rows."""
+    statement = (
+        pg_insert(Article.__table__).values(rows)
+        .on_conflict_do_nothing(index_elements=['url'])
+        .returning(Article.__table__.c.url, Article.__table__.c.id)
+    )
+    return dict(connection.execute(statement).all())
+
+def copy_articles(connection, rows):
+    """Binary COPY into a temp table, then the same upsert into articles. Returns {url: id} of new rows."""
+    columns = ', '.join(ARTICLE_COLUMNS)
+    connection.execute(text(
+        f"CREATE TEMP TABLE persist_staging ON COMMIT DROP AS SELECT {columns} FROM articles WITH NO DATA"
+    ))
+    _copy(connection, 'persist_staging', rows, ARTICLE_COLUMNS, ARTICLE_KINDS)
+    result = connection.execute(text(
+        f"INSERT INTO articles ({columns}) SELECT {columns} FROM persist_staging "
+        "ON CONFLICT (url) DO NOTHING RETURNING url, id"
+    ))
+    return dict(result.all())
+
+def insert_batch(articles, method=None):
+    """
+    Writes articles (dicts with Article's columns and optional 'chunks') in
+    one transaction, skipping URLs that are already stored. method is
+    'insert' or 'copy'; by default it is picked by batch size. Returns
+    {url: id} of the new articles.
+    """
+    method = method or ('copy' if len(articles) >= COPY_THRESHOLD else 'insert')
+    scraped_at = datetime.datetime.utcnow()
+    rows = [_article_row(article, scraped_at) for article in articles]
+
+    with metrics.DB_WRITE_SECONDS.labels(method).time(), \
+            tracing.span('db.insert_batch', method=method, articles=len(rows)), engine.begin() as connection:
+        if method == 'copy':
+            ids = copy_articles(connection, rows)
+            chunk_rows = _chunk_rows(articles, ids)
+            if chunk_rows:
+                _copy(connection, 'article_chunks', chunk_rows, CHUNK_COLUMNS, CHUNK_KINDS)
+        else:
+            ids = upsert_articles(connection, rows)
+            chunk_rows = _chunk_rows(articles, ids)
+            if chunk_rows:
+                connection.execute(insert(ArticleChunk.__table__), chunk_rows)
+        # Only the new articles are counted, in the same transaction as they are saved.
+        analytics.add(connection, [row for row in rows if row['url'] in ids])
+    metrics.ARTICLES_SAVED.inc(len(ids))
+    return ids
+
+def write_articles(articles, method=None):
+    """
+    Saves analyzed articles with insert_batch, records their URLs as known
+    and indexes the new canonical articles for near-duplicate lookups.
+    Returns the number of new articles.
+    """
+    # Keep the first copy of any URL that appears twice in the batch.
+    unique = {}
+    for article in articles:
+        unique.setdefault(article['url'], article)
+    if not unique:
+        return 0
+    ids = insert_batch(list(unique.values()), method)
+    dedup.mark_known(unique)
+    neardup.add({
+        ids[url]: article['minhash'] for url, article in unique.items()
+        if url in ids and article.get('minhash') and not article.get('canonical_id')
+    })
+    return len(ids)
+
+# --- Buffered Writes ---
+def buffer_articles(articles):
+    """
+    Queues JSON-safe articles for the next flush, each with the current trace
+    context under '_trace'. Returns how many are waiting.
+    """
+    carrier = {}
+    tracing.inject(carrier)
+    return redis_client.rpush(BUFFER_KEY, *(
+        json.dumps({**article, '_trace': carrier} if carrier else article) for article in articles
+    ))
+
+def _trace_contexts(raw):
+    """The trace contexts the buffered articles were queued in, to link the flush span to."""
+    if not tracing.ENABLED:
+        return []
+    return [json.loads(item).get('_trace') or {} for item in raw]
+
+def _decode(raw):
+    article = json.loads(raw)
+    article.pop('_trace', None)
+    if article.get('publication_date'):
+        article['publication_date'] = datetime.datetime.fromisoformat(article['publication_date'])
+    return article
+
+def _write_buffered(raw):
+    """
+    Writes buffered articles. A batch that fails is written again in halves,
+    down to single articles, so one bad article (e.g. a NUL byte in its
+    body) doesn't fail the others; an article that fails on its own goes to
+    DEAD_LETTER_KEY. Transient errors are raised. Returns the number of new articles.
+    """
+    try:
+        return write_articles([_decode(item) for item in raw])
+    except TRANSIENT_ERRORS:
+        raise
+    except Exception as e:
+        if len(raw) == 1:
+            print(f"ERROR: Buffered article could not be saved and was dead-lettered: {e}")
+            redis_client.rpush(DEAD_LETTER_KEY, json.dumps({'article': raw[0], 'error': str(e)[:1000]}))
+            return 0
+    middle = len(raw) // 2
+    return _write_buffered(raw[:middle]) + _write_buffered(raw[middle:])
+
+def flush(max_articles=None):
+    """
+    Writes buffered articles, max_articles (default COPY_THRESHOLD) per
+    transaction, until the buffer is empty. Each batch is popped atomically,
+    so concurrent flushes never write the same article. Articles that can't
+    be written are dead-lettered (see _write_buffered); when the database
+    can't be reached, the batch is put back for the next flush. Returns the
+    number of new articles.
+    """
+    max_articles = max_articles or COPY_THRESHOLD
+    saved = 0
+    while True:
+        raw = redis_client.lpop(BUFFER_KEY, max_articles)
+        if not raw:
+            return saved
+        started = time.perf_counter()
+        try:
+            # A batch holds articles from many traces, so it can't be a child of
+            # each; its span links to all of them instead.
+            with tracing.span('persist.flush', linked=_trace_contexts(raw), articles=len(raw)): #type:ignore
+                new = _write_buffered(raw)
+        except TRANSIENT_ERRORS as e:
+            print(f"ERROR: Could not save {len(raw)} buffered article(s) to DB: {e}") #type:ignore
+            redis_client.rpush(BUFFER_KEY, *raw) #type:ignore
+            return saved
+        saved += new
+        print(f"FLUSHED: {new} new of {len(raw)} buffered articles in {time.perf_counter() - started:.3f}s") #type:ignore
+
+def pending():
+    """Returns the number of articles waiting in the buffer."""
+    return redis_client.llen(BUFFER_KEY)
+
+def dead_lettered():
+    """Returns the number of articles that couldn't be saved."""
+    return redis_client.llen(DEAD_LETTER_KEY)
@@ -0,0 +1,134 @@
+# poller.py
+"""
+Continuous crawling. The beat service runs tasks.poll_sources every
+CRAWL_POLL_TICK seconds, and every source whose next poll is due gets its
+feed (or homepage) fetched by tasks.poll_source. Links that weren't on the
+source in earlier polls are deduplicated and queued in the crawl frontier.
+
+Each source is polled more often when new links appear quickly and less
+often when they don't: the interval aims for POLL_TARGET_NEW_LINKS new
+links per poll, based on a moving average of the rate new links appeared
+at. The interval, the next poll time and the recently seen links are kept
+in Redis, so a restarted beat or worker carries on where it stopped.
+"""
+import os
+import time
+import redis
+from celery_app import REDIS_URL
+from scrapers import SOURCES, engine
+import dedup
+
+# --- Polling Settings ---
+START_INTERVAL = float(os.getenv('POLL_START_INTERVAL', '600'))
+MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', '120'))
+MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', '3600'))
+TARGET_NEW_LINKS = float(os.getenv('POLL_TARGET_NEW_LINKS', '5'))
+# Weight of the latest poll in the moving average of the new-link rate.
+RATE_SMOOTHING = float(os.getenv('POLL_RATE_SMOOTHING', '0.3'))
+# How many recently seen links are remembered per source.
+SEEN_LIMIT = int(os.getenv('POLL_SEEN_LIMIT', '2000'))
+# crawl_frontier tasks kept running while the frontier has links in it.
+CRAWLERS = int(os.getenv('POLL_CRAWLERS', '2'))
+# A poll that takes longer than this is assumed to have died, and the source may be polled again.
+LOCK_TTL = 300
+
+STATE_KEY = 'poll:state:{}'
+SEEN_KEY = 'poll:seen:{}'
+LOCK_KEY = 'poll:lock:{}'
+# --------------------
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+def get_state(domain):
+    """Returns a source's crawl state: interval, next_poll, last_poll, rate, polls, new_links."""
+    state = {key: float(value) for key, value in redis_client.hgetall(STATE_KEY.format(domain)).items()}
+    state.setdefault('interval', START_INTERVAL)
+    state.setdefault('next_poll', 0.0)
+    return state
+
+def due_sources(now=None):
+    """Returns the domains whose next poll is due."""
+    now = now or time.time()
+    return [domain for domain in SOURCES if get_state(domain)['next_poll'] <= now]
+
+def next_interval(state, new_links, now):
+    """
+    Updates the moving average of new links per second with this poll and
+    returns the interval that would find TARGET_NEW_LINKS at that rate. The
+    first poll finds everything on the page, so it only sets a baseline.
+    """
+    last_poll = state.get('last_poll')
+    if not last_poll:
+        return START_INTERVAL, None
+    observed = new_links / max(now - last_poll, 1.0)
+    rate = state.get('rate')
+    rate = observed if rate is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * rate
+    interval = TARGET_NEW_LINKS / rate if rate > 0 else MAX_INTERVAL
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, interval)), rate
+
+def unseen(domain, links):
+    """Returns the links (canonicalized) that weren't seen on the source before, and records all of them as seen."""
+    unique = {}
+    for link in links:
+        url = dedup.canonicalize_url(link['url'])
+        unique.setdefault(url, {**link, 'url': url})
+    if not unique:
+        return []
+
+    key = SEEN_KEY.format(domain)
+    urls = list(unique)
+    new_links = [unique[url] for url, score in zip(urls, redis_client.zmscore(key, urls)) if score is None]
+
+    pipe = redis_client.pipeline()
+    pipe.zadd(key, {url: time.time() for url in urls})
+    # Keep only the most recently seen links.
+    pipe.zremrangebyrank(key, 0, -SEEN_LIMIT - 1)
+    pipe.execute()
+    return new_links
+
+def poll(domain):
+    """
+    Polls one source and schedules its next poll. Returns the links that are
+    new since the last poll, or None if the source is being polled already
+    or couldn't be fetched.
+    """
+    spec = SOURCES[domain]
+    lock = LOCK_KEY.format(domain)
+    if not redis_client.set(lock, 1, nx=True, ex=LOCK_TTL):
+        return None
+    try:
+        state = get_state(domain)
+        now = time.time()
+        links = engine.poll_links(spec)
+        if links is None:
+            # Try again after the current interval, without counting it as a quiet poll.
+            redis_client.hset(STATE_KEY.format(domain), 'next_poll', now + state['interval'])
+            return None
+
+        new_links = unseen(domain, links)
+        interval, rate = next_interval(state, len(new_links), now)
+        update = {
+            'interval': interval,
+            'next_poll': now + interval,
+            'last_poll': now,
+            'polls': state.get('polls', 0) + 1,
+            'new_links': state.get('new_links', 0) + len(new_links),
+        }
+        if rate is not None:
+            update['rate'] = rate
+        redis_client.hset(STATE_KEY.format(domain), mapping=update)
+        print(f"POLLED {spec.name}: {len(links)} links, {len(new_links)} new, next poll in {interval:.0f}s")
+        return new_links
+    finally:
+        redis_client.delete(lock)
+
+def stats():
+    """Returns every source's crawl state."""
+    return {domain: get_state(domain) for domain in SOURCES}
+
+if __name__ == "__main__":
+    now = time.time()
+    for domain, state in stats().items():
+        due = max(0.0, state['next_poll'] - now)
+        print(f"{domain}: every {state['interval']:.0f}s, next poll in {due:.0f}s, "
+              f"{state.get('polls', 0):.0f} polls, {state.get('new_links', 0):.0f} new links")
@@ -0,0 +1,177 @@
+# query_embedder.py
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+import metrics
+
+# --- Query Embedding Settings ---
+CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '2048'))
+CACHE_TTL = int(os.getenv('QUERY_CACHE_TTL', '3600'))
+# Optional second cache tier in Redis, shared by all API processes.
+REDIS_TIER = os.getenv('QUERY_CACHE_REDIS', '0') == '1'
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_KEY = 'qcache:{}'
+# Concurrent queries arriving within this window are embedded together.
+BATCH_WAIT_MS = float(os.getenv('EMBED_BATCH_WAIT_MS', '5'))
+MAX_BATCH = int(os.getenv('EMBED_MAX_BATCH', '32'))
+# --------------------
+
+def normalize_query(text, lowercase=True):
+    """
+    Cache key for a query; the model still embeds the query as it was typed.
+    Tokenizers split on whitespace, and the MiniLM one also lowercases, so
+    queries that only differ in spacing (and for it, case) embed the same.
+    """
+    return ' '.join((text.lower() if lowercase else text).split())
+
+class LRUCache:
+    """In-process LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, max_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class MicroBatcher:
+    """
+    Collects texts submitted concurrently over a few milliseconds and embeds
+    them in one batch on a worker thread, so the event loop never blocks on
+    the model and concurrent requests share a forward pass.
+    """
+
+    def __init__(self, embed_batch, max_batch=MAX_BATCH, max_wait_ms=BATCH_WAIT_MS, version='inline'):
+        self.embed_batch = embed_batch
+        self.version = version
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._timer = None
+        # The loop only keeps weak references to tasks, so running batches are kept here.
+        self._tasks = set()
+        self.batch_sizes = metrics.LocalHistogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_wait_ms = metrics.LocalHistogram([1, 2, 5, 10, 25, 50, 100, 250, 500, 1000])
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait_ms.observe((started - enqueued) * 1000)
+            metrics.QUERY_EMBEDDING_QUEUE_WAIT_SECONDS.labels(self.version).observe(started - enqueued)
+        # The same text can be queued twice by concurrent requests; embed it once.
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        self.batch_sizes.observe(len(texts))
+        metrics.QUERY_EMBEDDING_BATCH_SIZE.labels(self.version).observe(len(texts))
+        try:
+            vectors = await asyncio.to_thread(self.embed_batch, texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_text = dict(zip(texts, vectors))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+class QueryEmbedder:
+    """
+    Embeds search queries through the LRU cache, the optional Redis tier, then
+    the micro-batcher. An embedder for another embedding version than the
+    inline one gets a namespace, so the Redis tier keeps its vectors apart.
+    lowercase says whether the model's tokenizer lowercases, so that queries
+    differing only in case can share a cache entry.
+    """
+
+    def __init__(self, embed_batch, namespace=None, lowercase=True):
+        self.namespace = namespace
+        self.lowercase = lowercase
+        self.cache = LRUCache()
+        # The metrics label; the inline version has no namespace.
+        self.version = namespace or 'inline'
+        self.batcher = MicroBatcher(embed_batch, version=self.version)
+        self.redis = None
+        if REDIS_TIER:
+            import redis.asyncio
+            self.redis = redis.asyncio.Redis.from_url(REDIS_URL)
+        self.hits = {'memory': 0, 'redis': 0, 'miss': 0}
+
+    def _count(self, tier):
+        self.hits[tier] += 1
+        metrics.QUERY_EMBEDDING_LOOKUPS.labels(self.version, tier).inc()
+
+    async def embed(self, query):
+        key = normalize_query(query, self.lowercase)
+        vector = self.cache.get(key)
+        if vector is not None:
+            self._count('memory')
+            return vector
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        redis_key = REDIS_KEY.format(f'{self.namespace}:{digest}' if self.namespace else digest)
+        if self.redis is not None:
+            raw = await self.redis.get(redis_key)
+            if raw is not None:
+                vector = np.frombuffer(raw, dtype=np.float32)
+                self.cache.set(key, vector)
+                self._count('redis')
+                return vector
+
+        self._count('miss')
+        vector = np.asarray(await self.batcher.embed(query), dtype=np.float32)
+        self.cache.set(key, vector)
+        if self.redis is not None:
+            await self.redis.set(redis_key, vector.tobytes(), ex=CACHE_TTL)
+        return vector
+
+    def stats(self):
+        lookups = sum(self.hits.values())
+        return {
+            'cache_entries': len(self.cache),
+            'lookups': lookups,
+            'hits': dict(self.hits),
+            'hit_rate': round((lookups - self.hits['miss']) / lookups, 3) if lookups else 0.0,
+            'batch_size': self.batcher.batch_sizes.to_dict(),
+            'queue_wait_ms': self.batcher.queue_wait_ms.to_dict(),
+        }
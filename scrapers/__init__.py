@@ -0,0 +1,25 @@
+# scrapers/__init__.py
+from scrapers.sources import ALL_SOURCES
+from scrapers.fetcher import host_of
+
+# Maps each site's domain to its SourceSpec (see scrapers/sources.py).
+SOURCES = {spec.domain: spec for spec in ALL_SOURCES}
+
+def find_source(url):
+    """
+    Returns the SourceSpec for the site a URL belongs to, or None. The
+    hostname and its parent domains are looked up in SOURCES, so
+    'www.bbc.com' and 'edition.bbc.com' both find 'bbc.com'.
+    """
+    host = host_of(url)
+    while host:
+        spec = SOURCES.get(host)
+        if spec is not None:
+            return spec
+        host = host.partition('.')[2]
+    return None
+
+def find_domain(url):
+    """Returns the SOURCES domain a URL belongs to, or None."""
+    spec = find_source(url)
+    return spec.domain if spec else None
@@ -0,0 +1,114 @@
+# scrapers/cache.py
+import hashlib
+import os
+import time
+import zlib
+import redis
+
+# --- Cache Settings ---
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+ENABLED = os.getenv('HTML_CACHE_ENABLED', '1') == '1'
+# Entries expire after this many seconds without being fetched again...
+TTL = int(os.getenv('HTML_CACHE_TTL', str(7 * 24 * 3600)))
+# ...and once there are more than this many URLs, the least recently used are evicted.
+MAX_ENTRIES = int(os.getenv('HTML_CACHE_MAX_ENTRIES', '50000'))
+
+META_KEY = 'htmlcache:meta:{}'
+BLOB_KEY = 'htmlcache:blob:{}'
+LRU_KEY = 'htmlcache:lru'
+STATS_KEY = 'htmlcache:stats:{}'
+# --------------------
+
+# Raw bytes client: page bodies are stored compressed.
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+def site_of(url_host):
+    """Groups stats by site, e.g. 'www.bbc.com' -> 'bbc.com'."""
+    return url_host[4:] if url_host.startswith('www.') else url_host
+
+def validators(url):
+    """
+    Returns the If-None-Match / If-Modified-Since headers for a cached URL,
+    or {} if we have nothing usable (no entry, or its body was evicted).
+    """
+    if not ENABLED:
+        return {}
+    meta = redis_client.hgetall(META_KEY.format(url))
+    if not meta or not redis_client.exists(BLOB_KEY.format(meta[b'digest'].decode())):
+        return {}
+    headers = {}
+    if meta.get(b'etag'):
+        headers['If-None-Match'] = meta[b'etag'].decode()
+    if meta.get(b'last_modified'):
+        headers['If-Modified-Since'] = meta[b'last_modified'].decode()
+    return headers
+
+def load(url, site):
+    """
+    Returns the cached body for a URL after a 304 and counts the hit, or
+    None if the entry was evicted in the meantime.
+    """
+    meta = redis_client.hgetall(META_KEY.format(url))
+    if not meta:
+        return None
+    blob_key = BLOB_KEY.format(meta[b'digest'].decode())
+    blob = redis_client.get(blob_key)
+    if blob is None:
+        return None
+    content = zlib.decompress(blob) #type:ignore
+
+    pipe = redis_client.pipeline()
+    pipe.expire(META_KEY.format(url), TTL)
+    pipe.expire(blob_key, TTL)
+    pipe.zadd(LRU_KEY, {url: time.time()})
+    pipe.hincrby(STATS_KEY.format(site), 'hits', 1)
+    pipe.hincrby(STATS_KEY.format(site), 'bytes_saved', len(content))
+    pipe.execute()
+    return content
+
+def store(url, site, content, etag=None, last_modified=None):
+    """
+    Caches a freshly downloaded body and its validators, and counts the miss.
+    Bodies are stored once per content hash, so identical pages share storage.
+    """
+    if not ENABLED:
+        return
+    pipe = redis_client.pipeline()
+    pipe.hincrby(STATS_KEY.format(site), 'misses', 1)
+    pipe.hincrby(STATS_KEY.format(site), 'bytes_downloaded', len(content))
+    if etag or last_modified:
+        digest = hashlib.sha256(content).hexdigest()
+        pipe.set(BLOB_KEY.format(digest), zlib.compress(content), ex=TTL)
+        pipe.hset(META_KEY.format(url), mapping={
+            'digest': digest,
+            'etag': etag or '',
+            'last_modified': last_modified or '',
+        })
+        pipe.expire(META_KEY.format(url), TTL)
+        pipe.zadd(LRU_KEY, {url: time.time()})
+    pipe.execute()
+    evict()
+
+def evict():
+    """Drops the least recently used URLs beyond MAX_ENTRIES."""
+    overflow = redis_client.zcard(LRU_KEY) - MAX_ENTRIES
+    if overflow <= 0:
+        return
+    # Bodies are left to expire on their own, since another URL may share them.
+    for url, _ in redis_client.zpopmin(LRU_KEY, overflow): #type:ignore
+        redis_client.delete(META_KEY.format(url.decode()))
+
+def stats():
+    """Returns hit/miss counts and bytes saved per site."""
+    results = {}
+    for key in redis_client.scan_iter(STATS_KEY.format('*')):
+        site = key.decode().split(':', 2)[2]
+        values = {k.decode(): int(v) for k, v in redis_client.hgetall(key).items()}
+        hits, misses = values.get('hits', 0), values.get('misses', 0)
+        values['hit_rate'] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+        results[site] = values
+    return results
+
+if __name__ == "__main__":
+    for site, values in sorted(stats().items()):
+        print(f"{site:20} {values}")
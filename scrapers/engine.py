@@ -0,0 +1,293 @@
+# scrapers/engine.py
+"""
+The extraction engine every news source runs through. A source is a
+SourceSpec (see scrapers/sources.py): its homepage and feed, the CSS selectors
+for its links, body and date, and how its date is written. Selectors are compiled
+once, when the spec is created, and pages are fetched through the shared
+fetcher client and parsed with scrapers.parsing.
+"""
+import datetime
+import email.utils
+from xml.etree import ElementTree
+import soupsieve
+from scrapers import fetcher, parsing
+import metrics
+
+# --- Date Strategies ---
+class IsoDate:
+    """An ISO 8601 timestamp in an attribute, e.g. <time datetime="2025-07-14T09:31:12Z">."""
+
+    def __init__(self, selector, attribute='datetime'):
+        self.selector = selector
+        self.attribute = attribute
+        self.compiled = soupsieve.compile(selector)
+
+    def extract(self, soup):
+        tag = self.compiled.select_one(soup)
+        value = tag.get(self.attribute) if tag else None
+        if not value:
+            return None
+        value = str(value)
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            print(f"Could not parse date string: {value}")
+            return None
+
+class EpochDate:
+    """A unix timestamp in an attribute, in seconds divided by `scale` (1000 for milliseconds)."""
+
+    def __init__(self, selector, attribute, scale=1):
+        self.selector = selector
+        self.attribute = attribute
+        self.scale = scale
+        self.compiled = soupsieve.compile(selector)
+
+    def extract(self, soup):
+        tag = self.compiled.select_one(soup)
+        value = str(tag.get(self.attribute)) if tag else ''
+        if not value.isdigit():
+            return None
+        return datetime.datetime.fromtimestamp(int(value) / self.scale, tz=datetime.timezone.utc)
+
+class TextDate:
+    """
+    A date written out in a tag's text, parsed with strptime. Only the first
+    `words` words are kept, and with `contains` only tags whose text has it
+    are considered.
+    """
+
+    def __init__(self, selector, format, words=None, contains=None):
+        self.selector = selector
+        self.format = format
+        self.words = words
+        self.contains = contains
+        self.compiled = soupsieve.compile(selector)
+
+    def extract(self, soup):
+        for tag in self.compiled.select(soup):
+            if self.contains and self.contains not in (tag.string or ''):
+                continue
+            text = tag.get_text(strip=True)
+            if self.words:
+                text = ' '.join(text.split(' ')[:self.words])
+            try:
+                return datetime.datetime.strptime(text, self.format)
+            except ValueError:
+                print(f"Could not parse date string: {text}")
+                return None
+        return None
+# --------------------
+
+class SourceSpec:
+    """
+    Everything the engine needs to know about one news source.
+
+    feed_url:       RSS, Atom or news sitemap polled instead of the homepage, if the source has one
+    links:          selector for each link on the homepage (a card or the <a> itself)
+    link_url:       selector for the <a> inside a card; None means the card is the <a>
+    link_title:     selector(s) for the title inside a card, tried in order; None means the card's text
+    skip_urls:      links whose URL contains any of these are not articles
+    base_url:       prefix for relative links
+    body:           selector for the paragraphs of the article body
+    body_container: selector for the element the paragraphs are looked up in; None means the whole page
+    date:           one date strategy, or several tried in order
+    """
+
+    def __init__(self, domain, name, homepage_url, links, body, date, feed_url=None, link_url=None,
+                 link_title=None, skip_urls=(), base_url=None, body_container=None):
+        self.domain = domain
+        self.name = name
+        self.homepage_url = homepage_url
+        self.feed_url = feed_url
+        self.skip_urls = tuple(skip_urls)
+        self.base_url = base_url
+        self.dates = date if isinstance(date, (list, tuple)) else (date,)
+
+        self.links = soupsieve.compile(links)
+        self.link_url = soupsieve.compile(link_url) if link_url else None
+        titles = (link_title,) if isinstance(link_title, str) else (link_title or ())
+        self.link_titles = tuple(soupsieve.compile(title) for title in titles)
+        self.body = soupsieve.compile(body)
+        self.body_container = soupsieve.compile(body_container) if body_container else None
+
+        # The tags an article page is parsed down to: the body and every date's container.
+        self.article_parts = parsing.strain_parts(
+            [body_container or body] + [strategy.selector for strategy in self.dates]
+        )
+
+    def __repr__(self):
+        return f"SourceSpec({self.domain!r})"
+
+# --- Article Pages ---
+def parse_article(spec, markup):
+    """Extracts (body, publication date) from the HTML of one of the source's article pages."""
+    with metrics.PARSE_SECONDS.labels(spec.domain, 'article').time():
+        return _parse_article(spec, markup)
+
+def _parse_article(spec, markup):
+    soup = parsing.make_soup(markup, only=spec.article_parts)
+
+    article_body = None
+    container = spec.body_container.select_one(soup) if spec.body_container else soup
+    if container is not None:
+        paragraphs = spec.body.select(container)
+        if paragraphs:
+            article_body = '\n\n'.join(p.get_text(strip=True) for p in paragraphs)
+
+    publication_date = None
+    for strategy in spec.dates:
+        publication_date = strategy.extract(soup)
+        if publication_date:
+            break
+
+    return article_body, publication_date
+
+def scrape_article_page(spec, url):
+    """Fetches (through the HTML cache) and parses one article page. Returns (None, None) on errors."""
+    try:
+        response = fetcher.fetch(url, cache=True)
+        return parse_article(spec, response.content)
+    except fetcher.FetchError as e:
+        print(f"Error fetching {spec.name} article page URL: {e}")
+        return None, None
+
+# --- Homepages ---
+def parse_links(spec, markup):
+    """Extracts article links ({'title', 'url'} dicts) from the source's homepage HTML."""
+    with metrics.PARSE_SECONDS.labels(spec.domain, 'links').time():
+        return _parse_links(spec, markup)
+
+def _parse_links(spec, markup):
+    soup = parsing.make_soup(markup)
+
+    links_found = []
+    for card in spec.links.select(soup):
+        link_tag = spec.link_url.select_one(card) if spec.link_url else card
+        if link_tag is None:
+            continue
+        url = link_tag.get('href')
+        if not url:
+            continue
+        url = str(url)
+        if any(part in url for part in spec.skip_urls):
+            continue
+
+        title_tag = card
+        for selector in spec.link_titles:
+            title_tag = selector.select_one(card)
+            if title_tag is not None:
+                break
+        if title_tag is None:
+            continue
+        title = title_tag.get_text(strip=True)
+
+        if spec.base_url and not url.startswith('https://'):
+            url = spec.base_url + url
+        if title:
+            links_found.append({"title": title, "url": url})
+
+    print(f"Found {len(links_found)} {spec.name} article links.")
+    return links_found
+
+# --- Feeds ---
+def _local_name(element):
+    return element.tag.rpartition('}')[2]
+
+def _feed_date(text):
+    """Parses an RSS (RFC 822) or Atom / sitemap (ISO 8601) date into a unix timestamp, or None."""
+    text = (text or '').strip()
+    if not text:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        pass
+    try:
+        return email.utils.parsedate_to_datetime(text).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def parse_feed(spec, content):
+    """
+    Extracts article links from an RSS 2.0 or Atom feed, or a Google News
+    sitemap: {'title', 'url', 'published'} dicts, where 'published' is a unix
+    timestamp the frontier ranks by (omitted when the feed has no date).
+    """
+    with metrics.PARSE_SECONDS.labels(spec.domain, 'feed').time():
+        return _parse_feed(spec, content)
+
+def _parse_feed(spec, content):
+    links_found = []
+    for item in ElementTree.fromstring(content).iter():
+        if _local_name(item) not in ('item', 'entry', 'url'):
+            continue
+        title, url, published = None, None, None
+        for child in item.iter():
+            name = _local_name(child)
+            if name == 'title' and title is None:
+                title = (child.text or '').strip()
+            elif name == 'link' and url is None and child.get('rel', 'alternate') == 'alternate':
+                url = (child.text or '').strip() or child.get('href')
+            elif name == 'loc' and url is None:
+                url = (child.text or '').strip()
+            elif name in ('pubDate', 'published', 'updated', 'publication_date') and published is None:
+                published = _feed_date(child.text)
+
+        if not url or not title or any(part in url for part in spec.skip_urls):
+            continue
+        link = {"title": title, "url": url}
+        if published:
+            link['published'] = published
+        links_found.append(link)
+    return links_found
+
+def poll_links(spec):
+    """
+    Fetches the source's feed, or its homepage if it has no feed or the feed
+    can't be read, and returns the links on it: [] when it hasn't changed
+    since the last poll, None when neither could be fetched.
+    """
+    for url, parse in ((spec.feed_url, parse_feed), (spec.homepage_url, parse_links)):
+        if not url:
+            continue
+        try:
+            response = fetcher.fetch(url, cache=True)
+            if response.not_modified:
+                # Unlike find_links, the poller keeps its own state: this page's
+                # links were queued in the Redis crawl frontier when it last changed.
+                return []
+            return parse(spec, response.content)
+        except (fetcher.FetchError, ElementTree.ParseError) as e:
+            print(f"Error polling {spec.name} ({url}): {e}")
+    return None
+
+def find_links(spec):
+    """Finds article links on the source's homepage."""
+    print(f"--- Finding {spec.name} links ---")
+    try:
+        response = fetcher.fetch(spec.homepage_url, cache=True)
+        if response.not_modified:
+            # The last run may have stopped before dispatching these links, so
+            # they are found again from the cached page; dedup drops the known ones.
+            print(f"{spec.name} homepage has not changed since the last run; using the cached copy.")
+        return parse_links(spec, response.content)
+    except fetcher.FetchError as e:
+        print(f"Error fetching {spec.name} homepage: {e}")
+        return []
+
+async def find_links_async(spec, async_fetcher):
+    """Same as find_links, but downloads the homepage through a shared AsyncFetcher."""
+    print(f"--- Finding {spec.name} links ---")
+    try:
+        response = await async_fetcher.fetch(spec.homepage_url, cache=True)
+        if response.not_modified:
+            # The last run may have stopped before dispatching these links, so
+            # they are found again from the cached page; dedup drops the known ones.
+            print(f"{spec.name} homepage has not changed since the last run; using the cached copy.")
+        return parse_links(spec, response.content)
+    except fetcher.FetchError as e:
+        print(f"Error fetching {spec.name} homepage: {e}")
+        return []
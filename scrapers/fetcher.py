@@ -0,0 +1,193 @@
+# scrapers/fetcher.py
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+import httpx
+import metrics
+from scrapers import cache as page_cache
+from scrapers.parsing import decode_markup
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# --- Fetch Settings ---
+# How many requests may be in flight at once, in total and per host.
+MAX_CONCURRENCY = int(os.getenv('FETCH_MAX_CONCURRENCY', '20'))
+PER_HOST_CONCURRENCY = int(os.getenv('FETCH_PER_HOST_CONCURRENCY', '4'))
+TIMEOUT = httpx.Timeout(float(os.getenv('FETCH_TIMEOUT', '30')), connect=10.0)
+# Idle connections are kept open so later requests to the same host skip the TCP/TLS handshake.
+LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+# Benchmarks only: send every request to this server instead, as
+# <FETCH_BASE_URL>/<host><path> (see benchmarks/fixture_server.py). Pages keep
+# their real URLs everywhere else.
+BASE_URL = os.getenv('FETCH_BASE_URL', '').rstrip('/')
+
+# HTTP/2 is negotiated per server through ALPN and needs the optional 'h2' package.
+try:
+    import h2  # noqa: F401
+    HTTP2 = os.getenv('FETCH_HTTP2', '1') == '1'
+except ImportError:
+    HTTP2 = False
+
+# Scrapers catch this instead of depending on httpx directly.
+FetchError = httpx.HTTPError
+# --------------------
+
+def host_of(url):
+    """Returns the lowercase hostname of a URL."""
+    return (urlsplit(url).hostname or '').lower()
+
+def decode_html(content):
+    """Decodes raw page bytes the same way BeautifulSoup does."""
+    return decode_markup(content)
+
+def request_url(url):
+    """The URL a request for `url` is actually sent to."""
+    if not BASE_URL:
+        return url
+    parts = urlsplit(url)
+    return f"{BASE_URL}/{parts.hostname}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else '')
+
+def _client_options():
+    return dict(headers=HEADERS, http2=HTTP2, timeout=TIMEOUT, limits=LIMITS, follow_redirects=True)
+
+class Page:
+    """
+    A downloaded page. When a cached copy was revalidated with a 304,
+    not_modified is True and content holds the cached body.
+    """
+
+    def __init__(self, url, status_code, content, not_modified=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.not_modified = not_modified
+
+def _observe(url, started, page=None):
+    """Records a download's time and size (see metrics.py); page is None when it failed."""
+    site = page_cache.site_of(host_of(url))
+    outcome = 'error' if page is None else 'not_modified' if page.not_modified else 'ok'
+    metrics.FETCH_SECONDS.labels(site, outcome).observe(time.perf_counter() - started)
+    if outcome == 'ok':
+        metrics.FETCH_BYTES.labels(site).observe(len(page.content)) #type:ignore
+
+def _finish(url, response, use_cache, revalidating):
+    """
+    Turns an HTTP response into a Page, reading the cached body on a 304 and
+    caching fresh bodies. Returns None if the cached body is gone and the
+    page has to be requested again without validators.
+    """
+    site = page_cache.site_of(host_of(url))
+    if revalidating and response.status_code == 304:
+        content = page_cache.load(url, site)
+        if content is None:
+            return None
+        return Page(url, 304, content, not_modified=True)
+
+    response.raise_for_status()
+    if use_cache:
+        page_cache.store(url, site, response.content,
+                         etag=response.headers.get('etag'),
+                         last_modified=response.headers.get('last-modified'))
+    return Page(url, response.status_code, response.content)
+
+# --- Blocking Client ---
+# Used from Celery tasks. One client per process keeps a connection pool per host.
+_client = None
+
+def get_client():
+    """Returns the process-wide blocking HTTP client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.Client(**_client_options())
+    return _client
+
+def fetch(url, cache=False):
+    """
+    Downloads a URL with the shared client and raises FetchError on failure.
+    With cache=True the request is conditional (ETag / Last-Modified) and a
+    304 is answered from the HTML cache.
+    """
+    started = time.perf_counter()
+    validators = page_cache.validators(url) if cache else {}
+    try:
+        page = _finish(url, get_client().get(request_url(url), headers=validators), cache, bool(validators))
+        if page is None:
+            page = _finish(url, get_client().get(request_url(url)), cache, False)
+    except FetchError:
+        _observe(url, started)
+        raise
+    _observe(url, started, page)
+    return page
+
+def fetch_html(url):
+    """
+    Downloads a page and returns its HTML as text, decoded the same way
+    BeautifulSoup decodes the raw bytes, so it can be sent through the
+    task queue and parsed later with identical results.
+    """
+    return decode_html(fetch(url).content)
+
+# --- Async Client ---
+class AsyncFetcher:
+    """
+    Concurrent fetcher for discovery and bulk article downloads.
+
+    Shares one pooled AsyncClient across all requests and caps concurrency
+    both globally and per host, so many sites can be fetched at once without
+    opening too many connections to any one of them.
+
+        async with AsyncFetcher() as fetcher:
+            responses = await fetcher.fetch_many(urls)
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_host_concurrency=PER_HOST_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.client = None
+        self._global_limit = None
+        self._host_limits = {}
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(**_client_options())
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose() #type:ignore
+        self.client = None
+
+    def _host_limit(self, url):
+        host = host_of(url)
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_limits[host]
+
+    async def _get(self, url, headers=None):
+        async with self._global_limit, self._host_limit(url): #type:ignore
+            return await self.client.get(request_url(url), headers=headers) #type:ignore
+
+    async def fetch(self, url, cache=False):
+        """Downloads a URL and raises FetchError on failure. See fetch() for cache."""
+        started = time.perf_counter()
+        validators = page_cache.validators(url) if cache else {}
+        try:
+            page = _finish(url, await self._get(url, validators), cache, bool(validators))
+            if page is None:
+                page = _finish(url, await self._get(url), cache, False)
+        except FetchError:
+            _observe(url, started)
+            raise
+        _observe(url, started, page)
+        return page
+
+    async def fetch_html(self, url):
+        """Downloads a page and returns its decoded HTML (see fetch_html)."""
+        response = await self.fetch(url)
+        return decode_html(response.content)
+
+    async def fetch_many(self, urls, cache=False):
+        """Fetches all URLs concurrently. Failed fetches come back as exceptions."""
+        return await asyncio.gather(*(self.fetch(url, cache=cache) for url in urls), return_exceptions=True)
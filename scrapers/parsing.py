@@ -0,0 +1,101 @@
+# scrapers/parsing.py
+"""
+HTML parsing shared by the scrapers.
+
+Pages are parsed with lxml's C parser when it is installed (PARSER_ENGINE),
+and article pages only build the parts of the tree their source reads: the
+tags matched by the outermost part of its selectors, with everything inside them. The
+scrapers' extraction code is the same for every engine, so their output
+doesn't change; benchmarks/parse_throughput.py checks that on saved pages.
+"""
+import codecs
+import os
+import re
+from bs4 import BeautifulSoup, UnicodeDammit
+from bs4.dammit import EncodingDetector
+from bs4.filter import ElementFilter
+
+# --- Parser Settings ---
+try:
+    import lxml  # noqa: F401
+    ENGINE = os.getenv('PARSER_ENGINE', 'lxml')
+except ImportError:
+    ENGINE = 'html.parser'
+# Set to 0 to always build the full tree, e.g. when checking a scraper's selectors.
+STRAIN = os.getenv('PARSER_STRAIN', '1') == '1'
+# --------------------
+
+def decode_markup(markup):
+    """
+    Decodes page bytes to text. Pages with a byte order mark or a declared
+    charset are decoded with it straight away; only pages without one (or
+    whose declaration is wrong) go through UnicodeDammit's detection. Either
+    way the text is what BeautifulSoup would have decoded.
+    """
+    if isinstance(markup, str):
+        return markup
+    data, encoding = EncodingDetector.strip_byte_order_mark(markup)
+    if encoding is None:
+        encoding = EncodingDetector.find_declared_encoding(data, is_html=True, search_entire_document=False)
+    if encoding:
+        try:
+            return codecs.decode(data, encoding)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return UnicodeDammit(markup, is_html=True).unicode_markup
+
+# A compound selector made only of a tag name, classes and an id, e.g. 'div.entry-content' or 'div#storytext'.
+SIMPLE_SELECTOR = re.compile(r'^([\w-]*)((?:[.#][\w-]+)*)$')
+
+def strain_parts(selectors):
+    """
+    Returns the outermost compound of each CSS selector, e.g. 'div.body' for
+    'div.body > p', or None if one of them can't be used to strain a page
+    (sibling combinators, attribute selectors, pseudo-classes). Keeping those
+    tags and their contents keeps every tag the full selectors match.
+    """
+    parts = []
+    for selector in selectors:
+        for alternative in selector.split(','):
+            if '+' in alternative or '~' in alternative:
+                return None
+            first = re.split(r'\s*>\s*|\s+', alternative.strip())[0]
+            if not first or not SIMPLE_SELECTOR.match(first):
+                return None
+            parts.append(first)
+    return parts
+
+class AnyOf(ElementFilter):
+    """Parses only the tags matched by any of the given simple selectors, each with all of its contents."""
+
+    def __init__(self, selectors):
+        super().__init__()
+        self.rules = []
+        for selector in selectors:
+            name, qualifiers = SIMPLE_SELECTOR.match(selector).groups() #type:ignore
+            ids = re.findall(r'#([\w-]+)', qualifiers)
+            self.rules.append((name, ids[0] if ids else None, set(re.findall(r'\.([\w-]+)', qualifiers))))
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        attrs = attrs or {}
+        # Attributes arrive unsplit here, so class is still one string.
+        classes = set(attrs.get('class', '').split()) if isinstance(attrs.get('class'), str) else set()
+        for rule_name, rule_id, rule_classes in self.rules:
+            if (not rule_name or rule_name == name) and (rule_id is None or attrs.get('id') == rule_id) and rule_classes <= classes:
+                return True
+        return False
+
+    def allow_string_creation(self, string):
+        # Text outside every matched tag is never read.
+        return False
+
+def make_soup(markup, only=None):
+    """
+    Parses HTML (bytes or text) with the configured engine. `only` is a list
+    of simple selectors (see strain_parts); when given, the tree holds just
+    the tags they match.
+    """
+    parse_only = AnyOf(only) if only and STRAIN else None
+    return BeautifulSoup(decode_markup(markup), ENGINE, parse_only=parse_only)
+
+__all__ = ['ENGINE', 'decode_markup', 'make_soup', 'strain_parts']
@@ -0,0 +1,79 @@
+# scrapers/sources.py
+"""
+The news sources, one SourceSpec each. Adding a source only takes a spec
+here; the engine (scrapers/engine.py) does the fetching and parsing. Check
+new selectors with PARSER_STRAIN=0 first, then with straining on.
+"""
+from scrapers.engine import SourceSpec, IsoDate, EpochDate, TextDate
+
+BBC = SourceSpec(
+    domain='bbc.com',
+    name='BBC News',
+    homepage_url='https://www.bbc.com/news',
+    feed_url='https://feeds.bbci.co.uk/news/rss.xml',
+    links='a[data-testid="internal-link"]',
+    link_title='h2[data-testid="card-headline"]',
+    skip_urls=('/live/', '/videos/'),
+    base_url='https://www.bbc.com',
+    body='p.sc-9a00e533-0.hxuGS',
+    date=IsoDate('time.sc-801dd632-2.IvNnh'),
+)
+
+AP_NEWS = SourceSpec(
+    domain='apnews.com',
+    name='AP News',
+    homepage_url='https://apnews.com/',
+    links='div.PagePromo',
+    link_url='a.Link',
+    # The title can be in an h2 or a span
+    link_title=('h2.PagePromo-title', 'span.PagePromoContentIcons-text'),
+    body_container='div.RichTextStoryBody',
+    body='p',
+    date=EpochDate('bsp-timestamp', 'data-timestamp', scale=1000),
+)
+
+THE_GUARDIAN = SourceSpec(
+    domain='theguardian.com',
+    name='The Guardian',
+    homepage_url='https://www.theguardian.com/international',
+    feed_url='https://www.theguardian.com/international/rss',
+    links='div.dcr-199p3eh',
+    link_url='a',
+    link_title='h3.card-headline span.show-underline',
+    base_url='https://www.theguardian.com',
+    body_container='div.article-body-commercial-selector',
+    body='p.dcr-16w5gq9',
+    # e.g. "Mon 14 Jul 2025 10.31 BST"; the first 5 words include the time.
+    date=TextDate('summary.dcr-1ybxn6r span.dcr-u0h1qy', '%a %d %b %Y %H.%M', words=5),
+)
+
+TECHCRUNCH = SourceSpec(
+    domain='techcrunch.com',
+    name='TechCrunch',
+    homepage_url='https://techcrunch.com/',
+    feed_url='https://techcrunch.com/feed/',
+    links='a.loop-card__title-link',
+    body_container='div.entry-content',
+    body='p',
+    date=(
+        IsoDate('time.wp-block-post-date-posted'),
+        IsoDate('time'),
+        # Podcast pages only write the date out, e.g. "Jul 14, 2025".
+        TextDate('div.wp-block-techcrunch-podcast-single-hero__post-data > span', '%b %d, %Y', contains=','),
+    ),
+)
+
+NPR = SourceSpec(
+    domain='npr.org',
+    name='NPR',
+    homepage_url='https://www.npr.org/',
+    feed_url='https://feeds.npr.org/1001/rss.xml',
+    links='a:has(h3.title)',
+    link_title='h3.title',
+    body_container='div#storytext',
+    # Only paragraphs directly in the story, not the ones in captions and asides.
+    body=':scope > p',
+    date=IsoDate('time'),
+)
+
+ALL_SOURCES = [BBC, AP_NEWS, THE_GUARDIAN, TECHCRUNCH, NPR]
@@ -1,100 +1,453 @@
 # tasks.py
 from celery_app import celery
-from models import SessionLocal, Article
-from transformers import AutoTokenizer, AutoModel
-from transformers.pipelines import pipeline
-import torch
+from celery.signals import worker_process_init
+from models import SessionLocal, Article, ArticleChunk
+import time
+import uuid
+from sqlalchemy import update
+from sqlalchemy.orm import aliased
 
 # --- AI Model Setup ---
-# Load the models once when the worker starts, for efficiency.
-print("Loading AI models...")
-# 1. Sentiment analysis pipeline
-sentiment_analyzer = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english") #type:ignore
-# 2. All-purpose embedding model
-embedding_tokenizer = AutoTokenizer.from_pretrained('sentence-transformers/all-MiniLM-L6-v2') #Converts human language to language that the AI can understand
-embedding_model = AutoModel.from_pretrained('sentence-transformers/all-MiniLM-L6-v2') #The AI language converted into vector embedding.
-print("AI models loaded successfully.")
+# Models are loaded by model_registry the first time a task needs them, so
+# fetch, parse and persist workers never pay for them. Workers that will run
+# inference can load them up front with WORKER_WARMUP_MODELS=sentiment,embedding.
+from model_registry import warm_up, names_from_env
+from inference import get_sentiments, embed_articles
+
+@worker_process_init.connect
+def warm_up_models(**kwargs):
+    """Loads the models listed in WORKER_WARMUP_MODELS when a worker process starts."""
+    warm_up(names_from_env('WORKER_WARMUP_MODELS'))
 # --------------------
 
-# (Your SCRAPER_MAP and scraper imports stay the same)
-from scrapers import bbc_scraper, apnews_scraper, theguardian_scraper, techcrunch_scraper, npr_scraper
-SCRAPER_MAP = {
-    'bbc.com': bbc_scraper.scrape_bbc_article_page,
-    'apnews.com': apnews_scraper.scrape_ap_article_page,
-    'theguardian.com': theguardian_scraper.scrape_guardian_article_page,
-    'techcrunch.com': techcrunch_scraper.scrape_techcrunch_article_page,
-    'npr.org': npr_scraper.scrape_npr_article_page,
-}
-
-#Embedding the text
-def get_embedding(text):
-    """Generates a vector embedding for a given text."""
-    #Converts human language to AI language. 
-    inputs = embedding_tokenizer(text, return_tensors='pt', truncation=True, padding=True, max_length=512)
-    #Only reading, not learning.
-    with torch.no_grad():
-        outputs = embedding_model(**inputs)
-    # Mean pooling to get a single vector for the whole text
-    embedding = outputs.last_hidden_state.mean(dim=1).squeeze().numpy()
-    return embedding
-# ------------------------------------
+# Sources are declared in scrapers/sources.py and looked up by hostname
+from scrapers import find_source
+from scrapers.engine import parse_article as extract_article
+from scrapers.fetcher import fetch, decode_html, FetchError
+import frontier
+import dedup
+import persist
+import poller
+import neardup
+import embedding_versions
+
+def fetch_page(url):
+    """
+    Fetches an article page through the HTML cache. Returns None if the fetch
+    fails. On a 304 the page holds the cached body, which is processed like a
+    fresh one: the caller already knows the article isn't stored, so an
+    earlier attempt must have failed after the fetch.
+    """
+    try:
+        page = fetch(url, cache=True)
+    except FetchError as e:
+        print(f"ERROR: Could not fetch {url}: {e}")
+        return None
+    if page.not_modified:
+        print(f"CACHED: Article {url} has not changed since it was last fetched; using the cached page.")
+    return page
+
+def already_stored(url):
+    """Task-start dedup check, so known URLs never reach the scraper or the models."""
+    if dedup.is_known(url):
+        print(f"SKIPPED: Article {url} already exists.")
+        return True
+    return False
+
+def scrape_article(title, url, throttle=True):
+    """
+    Scrapes one article and returns its row data (without AI fields), or None.
+    Pass throttle=False if the caller already took a rate-limit token for it.
+    """
+    source = find_source(url)
+    if not source:
+        print(f"ERROR: No scraper found for URL {url}")
+        return None
+
+    # Wait for the site's rate limit so workers never burst against one host.
+    if throttle and not frontier.throttle(url):
+        return None
+
+    page = fetch_page(url)
+    if not page:
+        return None
+
+    body, date = extract_article(source, page.content)
+
+    if not body or not date:
+        print(f"ERROR: Failed to scrape content for {url}")
+        return None
+
+    return {'title': title, 'url': url, 'body_text': body, 'publication_date': date}
+
+def reuse_analysis(articles):
+    """
+    Gives each near-duplicate (an article with a 'canonical_id', see
+    neardup.py) its canonical article's sentiment and embedding, and no
+    chunks of its own. Returns the articles that still need the models,
+    including duplicates whose canonical article has since been deleted.
+    """
+    duplicates = [article for article in articles if article.get('canonical_id')]
+    if duplicates:
+        db = SessionLocal()
+        try:
+            canonical = {
+                row.id: row for row in
+                db.query(Article.id, Article.sentiment, Article.embedding)
+                .filter(Article.id.in_({article['canonical_id'] for article in duplicates}))
+            }
+        finally:
+            db.close()
+        for article in duplicates:
+            row = canonical.get(article['canonical_id'])
+            if row is None or row.embedding is None:
+                del article['canonical_id']
+                continue
+            article['sentiment'] = row.sentiment
+            article['embedding'] = row.embedding
+            article['chunks'] = []
+    return [article for article in articles if not article.get('canonical_id')]
+
+def save_articles(articles):
+    """
+    Saves analyzed articles with one bulk upsert and one commit (see
+    persist.py), skipping URLs that are already in the database. Returns the
+    number of new rows.
+    """
+    try:
+        saved = persist.write_articles(articles)
+    except Exception as e:
+        print(f"ERROR: Could not save {len(articles)} article(s) to DB: {e}")
+        return 0
+    if saved < len(articles):
+        print(f"SKIPPED: {len(articles) - saved} article(s) already exist.")
+    if saved:
+        print(f"SUCCESS: Saved {saved} article(s) with AI analysis.")
+    return saved
 
 @celery.task(name='tasks.process_article')
-def process_article(title, url):
+def process_article(title, url, throttle=True):
     """
-    A Celery task that scrapes an article, performs AI analysis, 
+    A Celery task that scrapes an article, performs AI analysis,
     and saves everything to the database.
     """
     print(f"TASK STARTED: Processing {url}")
-    
-    scraper_func = None
-    for domain, func in SCRAPER_MAP.items():
-        if domain in url:
-            scraper_func = func
-            break
-            
-    if not scraper_func:
-        print(f"ERROR: No scraper found for URL {url}")
+
+    url = dedup.canonicalize_url(url)
+    if already_stored(url):
         return
 
-    body, date = scraper_func(url)
+    article = scrape_article(title, url, throttle=throttle)
+    if not article:
+        return
 
-    if not body or not date:
-        print(f"ERROR: Failed to scrape content for {url}")
+    # A near-duplicate of a stored article (e.g. the same wire story) reuses its analysis
+    neardup.check(article)
+    if not reuse_analysis([article]):
+        print(f"  -> Reused the analysis of article {article['canonical_id']}")
+        save_articles([article])
         return
 
     # --- AI ANALYSIS ---
     # 1. Get sentiment
-    sentiment_result = sentiment_analyzer(body[:512]) # Analyze the first 512 characters
-    sentiment = sentiment_result[0]['label']
-    print(f"  -> Sentiment: {sentiment}")
+    article['sentiment'] = get_sentiments([article['body_text']])[0] # Analyzes the first 512 tokens
+    print(f"  -> Sentiment: {article['sentiment']}")
 
-    # 2. Get embedding
-    embedding_vector = get_embedding(body)
-    print(f"  -> Embedding generated successfully.")
+    # 2. Get embeddings for the article and each of its chunks
+    article['embedding'], article['chunks'] = embed_articles([article['body_text']])[0]
+    print(f"  -> Embedded {len(article['chunks'])} chunk(s) successfully.")
     # -----------------
 
     # Save the full article with AI data to the database
-    db = SessionLocal()
+    save_articles([article])
+
+@celery.task(name='tasks.process_articles_batch')
+def process_articles_batch(links):
+    """
+    A Celery task that scrapes a group of articles and analyzes them together:
+    one batched sentiment pass and one batched embedding pass for the whole
+    group, then a single database commit.
+    """
+    print(f"BATCH STARTED: Processing {len(links)} articles")
+
+    links = [{**link, 'url': dedup.canonicalize_url(link['url'])} for link in links]
+    links = [link for link in links if not already_stored(link['url'])]
+    articles = [scrape_article(link['title'], link['url']) for link in links]
+    articles = [article for article in articles if article]
+    if not articles:
+        print("ERROR: No articles in the batch could be scraped.")
+        return 0
+
+    # Near-duplicates of stored articles reuse their analysis
+    for article in articles:
+        neardup.check(article)
+    to_analyze = reuse_analysis(articles)
+    if len(to_analyze) < len(articles):
+        print(f"  -> Reused the analysis of {len(articles) - len(to_analyze)} near-duplicate(s)")
+
+    # --- AI ANALYSIS ---
+    if to_analyze:
+        started = time.perf_counter()
+        bodies = [article['body_text'] for article in to_analyze]
+        sentiments = get_sentiments(bodies)
+        embeddings = embed_articles(bodies)
+        elapsed = time.perf_counter() - started
+
+        for article, sentiment, (embedding, chunks) in zip(to_analyze, sentiments, embeddings):
+            article['sentiment'] = sentiment
+            article['embedding'] = embedding
+            article['chunks'] = chunks
+        print(f"  -> Analyzed {len(to_analyze)} articles in {elapsed:.2f}s ({len(to_analyze) / elapsed:.1f} articles/s)")
+    # -----------------
+
+    return save_articles(articles)
+
+@celery.task(name='tasks.crawl_frontier')
+def crawl_frontier():
+    """
+    A Celery task that keeps pulling the next URL whose site may be fetched
+    right now from the shared crawl frontier and processes it, until the
+    frontier is empty. Run several of these to crawl all sites in parallel
+    at their rate limits.
+    """
+    processed = 0
+    crawler_id = crawl_frontier.request.id or str(uuid.uuid4())
     try:
-        exists = db.query(Article).filter(Article.url == url).first()
-        if exists:
-            print(f"SKIPPED: Article {url} already exists.")
-            return
-
-        new_article = Article(
-            title=title,
-            url=url,
-            body_text=body,
-            publication_date=date,
-            sentiment=sentiment, # Add sentiment
-            embedding=embedding_vector # Add embedding
-        )
-        db.add(new_article)
-        db.commit()
-        print(f"SUCCESS: Saved article '{title}' with AI analysis.")
-    except Exception as e:
-        print(f"ERROR: Could not save article {url} to DB: {e}")
-        db.rollback()
+        while True:
+            frontier.heartbeat(crawler_id)
+            link, wait = frontier.pop()
+            if link:
+                # pop() already took this site's rate-limit token.
+                process_article(link['title'], link['url'], throttle=False)
+                processed += 1
+            elif frontier.pending():
+                time.sleep(wait or 0.1)
+            else:
+                break
     finally:
-        db.close()
\ No newline at end of file
+        frontier.retire(crawler_id)
+    print(f"FRONTIER DRAINED: processed {processed} articles")
+    return processed
+
+# --- Continuous Crawling ---
+# Run by the beat service (see beat_schedule in celery_app.py and poller.py).
+
+@celery.task(name='tasks.poll_sources')
+def poll_sources():
+    """Starts a poll_source task for every source whose next poll is due."""
+    due = poller.due_sources()
+    for domain in due:
+        poll_source.delay(domain) #type:ignore
+    return due
+
+@celery.task(name='tasks.poll_source')
+def poll_source(domain):
+    """
+    Polls one source, queues its new links in the crawl frontier and makes
+    sure POLL_CRAWLERS crawl_frontier tasks are draining it. Returns how many
+    links were queued.
+    """
+    links = poller.poll(domain)
+    if not links:
+        return 0
+    added = frontier.push(dedup.filter_new(links))
+    if frontier.pending():
+        for _ in range(max(0, poller.CRAWLERS - frontier.crawlers())):
+            crawl_frontier.delay() #type:ignore
+    print(f"QUEUED {added} new links from {domain} ({frontier.pending()} pending)")
+    return added
+
+@celery.task(name='tasks.backfill_chunks')
+def backfill_chunks(batch_size=100):
+    """
+    A Celery task that chunks and re-embeds articles saved before chunked
+    embeddings existed, batch_size articles per commit. Returns how many
+    articles were updated. Near-duplicates have no chunks of their own; they
+    are given their canonical article's new embedding instead.
+    """
+    updated = 0
+    while True:
+        db = SessionLocal()
+        try:
+            articles = (
+                db.query(Article)
+                .filter(~Article.chunks.any(), Article.body_text.isnot(None), Article.canonical_id.is_(None))
+                .order_by(Article.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not articles:
+                break
+            embeddings = embed_articles([article.body_text for article in articles])
+            for article, (embedding, chunks) in zip(articles, embeddings):
+                article.embedding = embedding
+                article.chunks = [ArticleChunk(**chunk) for chunk in chunks]
+            db.flush()
+            canonical = aliased(Article)
+            db.execute(
+                update(Article)
+                .where(Article.canonical_id == canonical.id, canonical.id.in_([article.id for article in articles]))
+                .values(embedding=canonical.embedding)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            updated += len(articles)
+            print(f"  -> Chunked {updated} articles so far")
+        finally:
+            db.close()
+    print(f"BACKFILL DONE: chunked {updated} articles")
+    return updated
+
+@celery.task(name='tasks.backfill_neardup')
+def backfill_neardup(batch_size=500):
+    """
+    A Celery task that runs the near-duplicate check over articles stored
+    before it existed, oldest first: each one is either linked to an earlier
+    near-duplicate (canonical_id) or indexed as canonical itself. Progress
+    is kept in Redis, so it resumes where it stopped. Returns how many
+    duplicates were linked.
+    """
+    linked = 0
+    while True:
+        last_id = int(neardup.redis_client.get(neardup.BACKFILL_KEY) or 0)
+        db = SessionLocal()
+        try:
+            articles = (
+                db.query(Article)
+                .filter(Article.id > last_id, Article.canonical_id.is_(None))
+                .order_by(Article.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not articles:
+                break
+            # Articles persist.write_articles already indexed are canonical; matching
+            # them would find their own signature.
+            indexed = neardup.redis_client.hmget(neardup.SIGNATURES_KEY, [article.id for article in articles])
+            for article, known in zip(articles, indexed):
+                if known is not None:
+                    continue
+                sig = neardup.signature(article.body_text)
+                match = neardup.find(sig, exclude=article.id)
+                if match:
+                    article.canonical_id = match[0]
+                    linked += 1
+                elif sig is not None:
+                    # Index each canonical article right away, so later ones in the batch can match it.
+                    neardup.add({article.id: sig})
+            db.commit()
+            neardup.redis_client.set(neardup.BACKFILL_KEY, articles[-1].id)
+            print(f"  -> Checked up to article {articles[-1].id}, {linked} duplicates linked so far")
+        finally:
+            db.close()
+    print(f"BACKFILL DONE: linked {linked} near-duplicates")
+    return linked
+
+@celery.task(name='tasks.reembed')
+def reembed(name, batch_size=embedding_versions.BATCH_SIZE, rate=embedding_versions.RATE):
+    """
+    A Celery task that re-embeds the corpus with an embedding version's model,
+    resuming from its checkpoint (see embedding_versions.py). Returns how
+    many articles were embedded, or None if it is being re-embedded already.
+    """
+    return embedding_versions.reembed(name, batch_size, rate)
+
+@celery.task(name='tasks.reembed_versions')
+def reembed_versions():
+    """
+    Catches every non-inline embedding version up with the articles saved
+    since its last run (run by celery beat every REEMBED_INTERVAL seconds).
+    """
+    for version in embedding_versions.all_versions():
+        if not version.inline:
+            reembed.delay(version.name) #type:ignore
+    return True
+
+# --- Staged Pipeline ---
+# The same work as process_article, split into four tasks that each run on
+# their own queue (see task_routes in celery_app.py). Each stage passes a
+# JSON-safe dict to the next one; a stage that fails returns None and the
+# stages after it skip the article.
+
+@celery.task(name='tasks.fetch_article')
+def fetch_article(title, url):
+    """Stage 1 (I/O): downloads the article page."""
+    print(f"FETCH STARTED: {url}")
+    url = dedup.canonicalize_url(url)
+    if already_stored(url) or not frontier.throttle(url):
+        return None
+    page = fetch_page(url)
+    if not page:
+        return None
+    return {'title': title, 'url': url, 'html': decode_html(page.content)}
+
+@celery.task(name='tasks.parse_article')
+def parse_article(page):
+    """Stage 2 (CPU, light): extracts the body text and publication date, and looks for a near-duplicate."""
+    if not page:
+        return None
+
+    source = find_source(page['url'])
+    if not source:
+        print(f"ERROR: No scraper found for URL {page['url']}")
+        return None
+
+    body, date = extract_article(source, page['html'])
+    if not body or not date:
+        print(f"ERROR: Failed to scrape content for {page['url']}")
+        return None
+
+    article = {
+        'title': page['title'],
+        'url': page['url'],
+        'body_text': body,
+        'publication_date': date.isoformat(),
+    }
+    neardup.check(article)
+    return article
+
+@celery.task(name='tasks.infer_article')
+def infer_article(article):
+    """Stage 3 (CPU, heavy): runs the sentiment and embedding models, unless the article is a near-duplicate."""
+    if not article:
+        return None
+
+    if not reuse_analysis([article]):
+        article['embedding'] = article['embedding'].tolist()
+        print(f"  -> Reused the analysis of article {article['canonical_id']} for {article['url']}")
+        return article
+
+    article['sentiment'] = get_sentiments([article['body_text']])[0]
+    embedding, chunks = embed_articles([article['body_text']])[0]
+    article['embedding'] = embedding.tolist()
+    article['chunks'] = [{**chunk, 'embedding': chunk['embedding'].tolist()} for chunk in chunks]
+    print(f"  -> Sentiment: {article['sentiment']}, {len(chunks)} chunk(s) embedded for {article['url']}")
+    return article
+
+@celery.task(name='tasks.persist_article')
+def persist_article(article):
+    """
+    Stage 4 (I/O): buffers the analyzed article for a bulk write, and writes
+    the buffer once it holds PERSIST_FLUSH_SIZE articles. flush_persist_buffer
+    writes whatever is left on a timer.
+    """
+    if not article:
+        return 0
+
+    if persist.buffer_articles([article]) >= persist.FLUSH_SIZE:
+        return persist.flush()
+    return 0
+
+@celery.task(name='tasks.flush_persist_buffer')
+def flush_persist_buffer():
+    """Writes every buffered article to the database (run by celery beat every PERSIST_FLUSH_INTERVAL seconds)."""
+    return persist.flush()
+
+def staged_pipeline(title, url):
+    """Builds the fetch -> parse -> infer -> persist chain for one article."""
+    return (
+        fetch_article.s(title, url) #type:ignore
+        | parse_article.s() #type:ignore
+        | infer_article.s() #type:ignore
+        | persist_article.s() #type:ignore
+    )
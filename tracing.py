@@ -0,0 +1,88 @@
+# tracing.py
+"""
+Optional OpenTelemetry tracing. With OTEL_TRACING=1 and the OpenTelemetry
+SDK and OTLP exporter installed, span() records spans and sends them to
+OTEL_EXPORTER_OTLP_ENDPOINT, and the trace context travels in Celery task
+headers, so one trace runs from main.py's dispatch through each task to
+the database write. Articles buffered for a bulk write carry their
+context too, and the span that writes them is linked to every one of their
+traces. Otherwise span() does nothing.
+"""
+import contextlib
+import os
+
+# --- Tracing Settings ---
+ENABLED = os.getenv('OTEL_TRACING', '0') == '1'
+SERVICE_NAME = os.getenv('OTEL_SERVICE_NAME', 'project-titan')
+# --------------------
+
+if ENABLED:
+    try:
+        from opentelemetry import context, propagate, trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        print("OTEL_TRACING=1 needs opentelemetry-sdk and opentelemetry-exporter-otlp; tracing is off.")
+        ENABLED = False
+
+_tracer = None
+_tracer_pid = None
+# Spans of the tasks running in this process, by task id.
+_task_spans = {}
+
+def get_tracer():
+    """
+    This process's tracer. The export thread doesn't survive a fork, so a
+    prefork pool process makes its own on first use.
+    """
+    global _tracer, _tracer_pid
+    if _tracer_pid != os.getpid():
+        provider = TracerProvider(resource=Resource.create({'service.name': SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        _tracer, _tracer_pid = provider.get_tracer('project_titan'), os.getpid()
+    return _tracer
+
+@contextlib.contextmanager
+def span(name, linked=(), **attributes):
+    """
+    Records the block as a span, a child of the current one, with a link to
+    the trace context in each of `linked` (header dicts from inject()).
+    Yields the span, or None when tracing is off.
+    """
+    if not ENABLED:
+        yield None
+        return
+    with get_tracer().start_as_current_span(name, attributes=attributes, links=_links(linked)) as current: #type:ignore
+        yield current
+
+def _links(carriers):
+    links = []
+    for carrier in carriers:
+        span_context = trace.get_current_span(propagate.extract(carrier)).get_span_context() #type:ignore
+        if span_context.is_valid:
+            links.append(trace.Link(span_context)) #type:ignore
+    return links
+
+# --- Celery Propagation ---
+def inject(headers):
+    """Adds the current trace context to outgoing task headers (or any dict of strings)."""
+    if ENABLED:
+        propagate.inject(headers)
+
+def start_task(task_id, task_name, headers):
+    """Starts a task's span as a child of the context in its headers, and makes it current."""
+    if not ENABLED:
+        return
+    current = get_tracer().start_span(f'task {task_name}', context=propagate.extract(headers)) #type:ignore
+    token = context.attach(trace.set_span_in_context(current))
+    _task_spans[task_id] = (current, token)
+
+def end_task(task_id, state):
+    if not ENABLED or task_id not in _task_spans:
+        return
+    current, token = _task_spans.pop(task_id)
+    current.set_attribute('celery.state', str(state))
+    context.detach(token)
+    current.end()
@@ -0,0 +1,139 @@
+# vector_indexes.py
+"""
+The optional compact HNSW indexes on articles.embedding, for
+SEARCH_QUANTIZATION=halfvec / binary (see models.as_halfvec and
+models.binary_quantized). They aren't part of the schema, because every index
+on articles is held in memory next to the full-precision one: build one only
+when search is switched to it, and drop the full-precision index once
+nothing searches on it.
+
+    python vector_indexes.py enable halfvec [--drop-full]
+    python vector_indexes.py disable halfvec
+    python vector_indexes.py status
+
+Indexes are built and dropped CONCURRENTLY, so workers keep inserting.
+disable rebuilds the full-precision index first if it was dropped, so search
+always has an index to fall back to. status prints the size of the articles
+table, of each of its indexes and of the whole (what the deployed schema
+actually occupies).
+"""
+import sys
+from sqlalchemy import text
+from models import engine, EMBEDDING_DIMENSIONS
+
+FULL_INDEX = 'ix_articles_embedding_hnsw'
+# Index name and definition per quantization; the expressions must match
+# what api.compact_distance orders by.
+INDEXES = {
+    'none': (FULL_INDEX, 'embedding vector_cosine_ops'),
+    'halfvec': ('ix_articles_embedding_halfvec_hnsw', f'(embedding::halfvec({EMBEDDING_DIMENSIONS})) halfvec_cosine_ops'),
+    'binary': ('ix_articles_embedding_bit_hnsw', f'(binary_quantize(embedding)::bit({EMBEDDING_DIMENSIONS})) bit_hamming_ops'),
+}
+COMPACT = ['halfvec', 'binary']
+
+# The names of the valid (fully built) indexes on articles.
+VALID_INDEXES = text(
+    "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE i.indrelid = 'articles'::regclass AND i.indisvalid"
+)
+
+def valid_indexes():
+    with engine.connect() as connection:
+        return set(connection.execute(VALID_INDEXES).scalars())
+
+def available(index_names):
+    """The quantizations whose index is among index_names."""
+    return {quantization for quantization, (name, _) in INDEXES.items() if name in index_names}
+
+def index_building(name):
+    """Whether a CREATE INDEX of the index is running right now."""
+    with engine.connect() as connection:
+        return connection.execute(text(
+            "SELECT 1 FROM pg_stat_progress_create_index p JOIN pg_class c ON c.oid = p.index_relid "
+            "WHERE c.relname = :name"
+        ), {'name': name}).first() is not None
+
+def build(quantization):
+    """
+    Builds a quantization's HNSW index, unless it exists. An invalid index
+    left behind by a failed build is dropped and started over, but not one
+    that another session is still building. Returns whether the index is built.
+    """
+    name, definition = INDEXES[quantization]
+    if name in valid_indexes():
+        return True
+    if index_building(name):
+        print(f"Index {name} is still being built by another session.")
+        return False
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        print(f"Building index {name}...")
+        connection.execute(text(
+            f"CREATE INDEX CONCURRENTLY {name} ON articles USING hnsw ({definition}) "
+            "WITH (m = 16, ef_construction = 64)"
+        ))
+    print(f"Index {name} built.")
+    return True
+
+def drop(quantization):
+    name = INDEXES[quantization][0]
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    print(f"Index {name} dropped.")
+
+def enable(quantization, drop_full=False):
+    """Builds a compact index, then drops the full-precision one if asked to."""
+    if not build(quantization):
+        return False
+    if drop_full:
+        # Searches with quantization 'none' fall back to a sequential scan from here on.
+        drop('none')
+    return True
+
+def disable(quantization):
+    """Drops a compact index, once the full-precision one is there to fall back to."""
+    if not build('none'):
+        return False
+    drop(quantization)
+    return True
+
+def footprint():
+    """Sizes in MB of the articles table (heap and TOAST), each of its indexes and the total."""
+    with engine.connect() as connection:
+        table = connection.execute(text("SELECT pg_table_size('articles'::regclass)")).scalar()
+        indexes = connection.execute(text(
+            "SELECT c.relname, pg_relation_size(c.oid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = 'articles'::regclass ORDER BY 2 DESC"
+        )).all()
+        total = connection.execute(text("SELECT pg_total_relation_size('articles'::regclass)")).scalar()
+    return {
+        'table_mb': round(table / 2**20, 2),
+        'indexes_mb': {name: round(size / 2**20, 2) for name, size in indexes},
+        'total_mb': round(total / 2**20, 2),
+    }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage the compact embedding indexes.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status')
+    command = commands.add_parser('enable')
+    command.add_argument('quantization', choices=COMPACT)
+    command.add_argument('--drop-full', action='store_true', help=f"Drop {FULL_INDEX} once the compact index is built.")
+    command = commands.add_parser('disable')
+    command.add_argument('quantization', choices=COMPACT)
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        built = available(valid_indexes())
+        for quantization, (name, _) in INDEXES.items():
+            print(f"{quantization}: {name} {'built' if quantization in built else 'missing'}")
+        sizes = footprint()
+        print(f"articles table: {sizes['table_mb']} MB")
+        for name, size in sizes['indexes_mb'].items():
+            print(f"  {name}: {size} MB")
+        print(f"total: {sizes['total_mb']} MB")
+    elif args.command == 'enable':
+        sys.exit(0 if enable(args.quantization, args.drop_full) else 1)
+    else:
+        sys.exit(0 if disable(args.quantization) else 1)